@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 
 import argparse
+import os
+import sys
 from src.error import *
 from src.lexer import Lexer
 from src.parser import Parser
 from src.environment import Environment
-from src.interpreter import Interpreter
+from src.interpreter import Interpreter, CALL_THRESHOLD, LOOP_THRESHOLD
+from src.language_object import BUILTINS
+from src.type_inferrer import TypeInferrer
+from src.bounds_analyzer import BoundsAnalyzer
+from src.output import Output
+from src.limits import Limits
+from src.batch import BatchRunner, annotate
+from src.client import SOCKET_PATH
+from src.server import Server
 
 def to_string(value: object) -> str:
     if value == None:
@@ -15,6 +25,29 @@ def to_string(value: object) -> str:
     else:
         return str(value)
 
+def run_each(statements: list,
+             interpreter: Interpreter,
+             path: str,
+             jobs: int) -> None:
+    annotate(statements, interpreter)
+    runner = BatchRunner(statements, interpreter)
+    runner.start()
+
+    if path == '-':
+        records = sys.stdin
+    else:
+        try:
+            records = open(path, 'r')
+        except OSError:
+            print(f"Error: Cannot open file '{path}'")
+            return
+
+    with records:
+        if jobs > 1:
+            runner.run_parallel(records, sys.stderr, jobs)
+        else:
+            runner.run(records, sys.stderr)
+
 def main() -> None:
     arg_parser = argparse.ArgumentParser(description='Interpret source code.')
     arg_parser.add_argument('file',
@@ -25,10 +58,90 @@ def main() -> None:
                             '--debug',
                             action='store_true',
                             help='enable debug output')
+    arg_parser.add_argument('--call-threshold',
+                            type=int,
+                            default=CALL_THRESHOLD,
+                            help='calls before a function is compiled')
+    arg_parser.add_argument('--loop-threshold',
+                            type=int,
+                            default=LOOP_THRESHOLD,
+                            help='iterations before a loop is compiled')
+    arg_parser.add_argument('--path',
+                            action='append',
+                            default=[],
+                            help='a directory to search for imported modules')
+    arg_parser.add_argument('-u',
+                            '--unbuffered',
+                            action='store_true',
+                            help='write each echoed line right away')
+    arg_parser.add_argument('-o',
+                            '--output',
+                            default=None,
+                            help='a file to write echoed lines to')
+    arg_parser.add_argument('--each',
+                            default=None,
+                            metavar='INPUT',
+                            help='run the file once per JSON line of INPUT, '
+                                 'or of standard input if INPUT is -')
+    arg_parser.add_argument('--serve',
+                            nargs='?',
+                            const=SOCKET_PATH,
+                            default=None,
+                            metavar='SOCKET',
+                            help='run programs sent to a Unix socket, '
+                                 f'{SOCKET_PATH} by default')
+    arg_parser.add_argument('-j',
+                            '--jobs',
+                            type=int,
+                            default=1,
+                            help='worker processes for --each or --serve')
+    arg_parser.add_argument('--files',
+                            default=None,
+                            metavar='DIRECTORY',
+                            help='let programs open files under DIRECTORY, '
+                                 'unless they run with limits')
+    arg_parser.add_argument('--max-steps',
+                            type=int,
+                            default=None,
+                            help='loop iterations and calls before a run fails')
+    arg_parser.add_argument('--timeout',
+                            type=float,
+                            default=None,
+                            help='seconds before a run fails')
+    arg_parser.add_argument('--max-depth',
+                            type=int,
+                            default=None,
+                            help='nested calls before a run fails')
+    arg_parser.add_argument('--max-size',
+                            type=int,
+                            default=None,
+                            help='elements, entries or characters in one value '
+                                 'before a run fails')
 
     args = arg_parser.parse_args()
+    limits = Limits(args.max_steps, args.timeout, args.max_depth, args.max_size)
+    if args.serve:
+        server = Server(args.serve,
+                        args.jobs,
+                        args.call_threshold,
+                        args.loop_threshold,
+                        limits,
+                        args.files)
+        print(f'Serving on {args.serve} with {args.jobs} worker(s).')
+        server.serve_forever()
+        return
+
     if args.debug:
         print('Debug output enabled.')
+
+    output_file = None
+    if args.output:
+        try:
+            output_file = open(args.output, 'w')
+        except OSError:
+            print(f"Error: Cannot open file '{args.output}'")
+            return
+    output = Output(output_file, buffered=not args.unbuffered)
     
     if args.file:
         source = ''
@@ -54,7 +167,23 @@ def main() -> None:
 
             if args.debug:
                 print('Output:')
-            interpreter = Interpreter()
+            interpreter = Interpreter(call_threshold=args.call_threshold,
+                                      loop_threshold=args.loop_threshold,
+                                      debug=args.debug,
+                                      output=output,
+                                      limits=limits,
+                                      file_root=args.files)
+            # Imports are relative to the script, then to the search path.
+            loader = interpreter.loader
+            loader.directory = os.path.dirname(os.path.abspath(args.file))
+            loader.search_path = args.path + loader.search_path
+            if args.each:
+                run_each(statements, interpreter, args.each, args.jobs)
+                return
+
+            inferrer = TypeInferrer(interpreter.environment, loader=loader)
+            inferrer.annotate(statements)
+            BoundsAnalyzer(inferrer).annotate(statements)
             interpreter.interpret(statements)
 
         except FileNotFoundError:
@@ -75,7 +204,7 @@ def main() -> None:
         
     else:
         print('Coffee Bean interpreter (version 0.1)')
-        environment = Environment()
+        environment = Environment(BUILTINS)
         
         while True:
             try:
@@ -99,7 +228,17 @@ def main() -> None:
 
                 if args.debug:
                     print('Output:')
-                interpreter = Interpreter(environment)
+                interpreter = Interpreter(environment,
+                                          call_threshold=args.call_threshold,
+                                          loop_threshold=args.loop_threshold,
+                                          debug=args.debug,
+                                          output=output,
+                                          file_root=args.files)
+                interpreter.loader.search_path = args.path + \
+                    interpreter.loader.search_path
+                # Later lines can assign any variable, so only types that
+                # don't depend on variables can be inferred.
+                TypeInferrer(environment, closed=False).annotate(statements)
                 interpreter.interpret(statements)
 
             except EOFError:
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+
+import argparse
+import os
+import sys
+from src.client import SOCKET_PATH, run
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(
+        description='Run source code on a server started with '
+                    '`coffee_bean.py --serve`.'
+    )
+    arg_parser.add_argument('file',
+                            nargs='?',
+                            default=None,
+                            help='a source file, or - to read standard input')
+    arg_parser.add_argument('-e',
+                            '--eval',
+                            default=None,
+                            metavar='SOURCE',
+                            help='source code to run instead of a file')
+    arg_parser.add_argument('-s',
+                            '--socket',
+                            default=SOCKET_PATH,
+                            help=f'the server\'s socket, {SOCKET_PATH} by default')
+
+    args = arg_parser.parse_args()
+    if args.eval is not None:
+        request = {'source': args.eval, 'directory': os.getcwd()}
+    elif args.file == '-':
+        request = {'source': sys.stdin.read(), 'directory': os.getcwd()}
+    elif args.file:
+        request = {'path': os.path.abspath(args.file)}
+    else:
+        arg_parser.error('expected a file or --eval')
+
+    try:
+        response = run(request, args.socket)
+    except OSError as error:
+        print(f"Error: Cannot reach the server at '{args.socket}': {error}",
+              file=sys.stderr)
+        sys.exit(2)
+
+    sys.stdout.write(response['output'])
+    sys.exit(response['status'])
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,271 @@
+from __future__ import annotations
+import collections
+import io
+import itertools
+import json
+import multiprocessing
+from typing import Iterable, List, Optional, TextIO, Tuple
+from src.error import *
+from src.statement import *
+from src.environment import *
+from src.type_inferrer import *
+from src.bounds_analyzer import *
+from src.interpreter import *
+from src.output import *
+from src.host import *
+
+# The variable each record is bound to.
+RECORD_NAME = 'record'
+
+# The number of records sent to a worker process at a time.
+CHUNK_SIZE = 256
+
+# The number of chunks in flight per worker process.
+CHUNKS_PER_JOB = 4
+
+# The runner in a worker process.
+_worker = None
+
+def annotate(statements: List[Statement], interpreter: Interpreter) -> None:
+    """Runs the analysis passes over a program that runs once per record.
+
+    Each run starts from the same globals, so the program is still the whole
+    program, with the record as a variable it doesn't define.
+
+    Args:
+        statements: The program's statements.
+        interpreter: The interpreter that will run them, with its loader set
+            up to find the program's imports.
+    """
+    environment = Environment(interpreter.globals)
+    environment.values[RECORD_NAME] = None
+    inferrer = TypeInferrer(environment, loader=interpreter.loader)
+    inferrer.annotate(statements)
+    BoundsAnalyzer(inferrer).annotate(statements)
+
+class BatchRunner:
+    """Defines a runner for one program over a stream of JSON records.
+
+    The program is parsed once. Each record runs it in a new environment
+    enclosed by the shared globals, with the record bound to `record`, so one
+    record's variables never leak into the next. The globals only hold the
+    imports, and the built-in functions are read-only, so assignments always
+    stay in the record's environment. Transpiled loops are kept
+    between records, while functions are declared again and tier up again in
+    each record.
+
+    Attributes:
+        interpreter: The interpreter running the program.
+        statements: The program's statements, without its imports.
+        imports: The program's imports, which run once in the globals.
+    """
+    def __init__(self,
+                 statements: List[Statement],
+                 interpreter: Interpreter) -> None:
+        """Constructor.
+
+        Args:
+            statements: The program's annotated statements.
+            interpreter: The interpreter to run them with.
+        """
+        self.interpreter = interpreter
+        self.statements = [statement for statement in statements
+                           if type(statement) != Import]
+        self.imports = [statement for statement in statements
+                        if type(statement) == Import]
+
+    def start(self) -> None:
+        """Imports the program's modules into the globals.
+        """
+        self.interpreter._execute_block(self.imports, self.interpreter.globals)
+
+    def run_record(self, number: int, line: str) -> Optional[str]:
+        """Runs the program over one record.
+
+        A `return` outside of a function ends the record early, and its value
+        is echoed unless it is null. Each record has its own budget under the
+        interpreter's limits.
+
+        Args:
+            number: The record's line number in the input.
+            line: The record as a line of JSON.
+
+        Returns:
+            An error message, or None if the record ran without errors.
+        """
+        try:
+            value = to_value(json.loads(line))
+        except ValueError:
+            return f'Record {number}\nError: Invalid JSON.'
+
+        interpreter = self.interpreter
+        interpreter._start_budget()
+        environment = Environment(interpreter.globals)
+        environment.values[RECORD_NAME] = value
+        try:
+            interpreter._execute_block(self.statements, environment)
+            interpreter._finish_tasks()
+        except ReturnError as return_error:
+            if return_error.value is not None:
+                interpreter._echo(return_error.value)
+        except RuntimeError as error:
+            return f'Record {number}\n{error}'
+        finally:
+            interpreter._stop_tasks()
+
+        return None
+
+    def run(self, lines: Iterable[str], errors: TextIO) -> int:
+        """Runs the program over every record. A record with an error is
+        reported and skipped. Blank lines are skipped too.
+
+        Args:
+            lines: The input, one JSON record per line.
+            errors: The file to report errors to.
+
+        Returns:
+            The number of records with errors.
+        """
+        failures = 0
+        output = self.interpreter.output
+        try:
+            for number, line in enumerate(lines, 1):
+                if not line.strip():
+                    continue
+
+                error = self.run_record(number, line)
+                if error:
+                    # Flushing first keeps errors in order with echoed lines.
+                    output.flush()
+                    print(error, file=errors)
+                    failures += 1
+        finally:
+            output.flush()
+
+        return failures
+
+    def run_parallel(self,
+                     lines: Iterable[str],
+                     errors: TextIO,
+                     jobs: int) -> int:
+        """Runs the program over every record in a pool of processes.
+
+        Records are sent to the workers in chunks, and only a few chunks per
+        worker are read ahead, so the input is still streamed. Each worker
+        buffers what a chunk echoes and sends it back, and chunks are written
+        out in input order.
+
+        Args:
+            lines: The input, one JSON record per line.
+            errors: The file to report errors to.
+            jobs: The number of worker processes.
+
+        Returns:
+            The number of records with errors.
+        """
+        interpreter = self.interpreter
+        options = (interpreter.call_threshold,
+                   interpreter.loop_threshold,
+                   interpreter.loader.directory,
+                   interpreter.loader.search_path,
+                   interpreter.limits,
+                   interpreter.file_root)
+        records = ((number, line) for number, line in enumerate(lines, 1)
+                   if line.strip())
+        chunks = iter(lambda: list(itertools.islice(records, CHUNK_SIZE)), [])
+
+        failures = 0
+        window = jobs * CHUNKS_PER_JOB
+        with multiprocessing.Pool(jobs,
+                                  _start_worker,
+                                  (self.statements, self.imports, options)) \
+             as pool:
+            pending = collections.deque()
+            for chunk in chunks:
+                pending.append(pool.apply_async(_run_chunk, (chunk,)))
+                if len(pending) >= window:
+                    failures += self._write_chunk(pending.popleft().get(),
+                                                  errors)
+
+            while pending:
+                failures += self._write_chunk(pending.popleft().get(), errors)
+
+        interpreter.output.flush()
+        return failures
+
+    def _write_chunk(self,
+                     result: Tuple[str, List[str]],
+                     errors: TextIO) -> int:
+        """Writes out what a worker process sent back for a chunk of records.
+
+        Args:
+            result: The echoed text and the error messages.
+            errors: The file to report errors to.
+
+        Returns:
+            The number of records with errors.
+        """
+        text, messages = result
+        output = self.interpreter.output
+        if text:
+            # The text already ends in a line break.
+            output.write_line(text[:-1])
+        if messages:
+            output.flush()
+            for message in messages:
+                print(message, file=errors)
+
+        return len(messages)
+
+def _start_worker(statements: List[Statement],
+                  imports: List[Statement],
+                  options: Tuple[int,
+                                 int,
+                                 Optional[str],
+                                 List[str],
+                                 Optional[Limits],
+                                 Optional[str]]) -> None:
+    """Sets up the runner in a worker process.
+
+    Args:
+        statements: The program's statements, without its imports.
+        imports: The program's imports.
+        options: The call threshold, loop threshold, module directory, module
+            search path, limits and file root of the parent's interpreter.
+    """
+    global _worker
+
+    call_threshold, loop_threshold, directory, search_path, limits, \
+        file_root = options
+    interpreter = Interpreter(call_threshold=call_threshold,
+                              loop_threshold=loop_threshold,
+                              output=Output(io.StringIO()),
+                              limits=limits,
+                              file_root=file_root)
+    interpreter.loader.directory = directory
+    interpreter.loader.search_path = search_path
+
+    _worker = BatchRunner(imports + statements, interpreter)
+    _worker.start()
+
+def _run_chunk(chunk: List[Tuple[int, str]]) -> Tuple[str, List[str]]:
+    """Runs the program over a chunk of records in a worker process.
+
+    Args:
+        chunk: Records and their line numbers.
+
+    Returns:
+        The echoed text and the error messages.
+    """
+    output = _worker.interpreter.output
+    messages = []
+    for number, line in chunk:
+        error = _worker.run_record(number, line)
+        if error:
+            messages.append(error)
+
+    output.flush()
+    text = output.file.getvalue()
+    output.file.seek(0)
+    output.file.truncate()
+    return text, messages
@@ -0,0 +1,414 @@
+from __future__ import annotations
+from typing import List, Optional, Set, Tuple
+from src.token import *
+from src.expression import *
+from src.statement import *
+from src.type_inferrer import *
+
+class BoundsAnalyzer(ExpressionVisitor, StatementVisitor):
+    """Defines a pass that removes bounds checks from array accesses in loops.
+
+    In the body of a loop like `while i < len(a)`, the access `a[i]` is in range
+    as long as nothing since the condition could have changed `i` or `a`. Such
+    accesses are marked `in_bounds` so the executor skips their checks.
+
+    This needs `i` to always be a non-negative integer, `a` to always be an
+    array and `len` to be the built-in function, which are checked over the
+    whole program. It must run after type inference on a closed program.
+
+    Attributes:
+        inferrer: The type inference pass that annotated the program.
+        non_negative: Variables that are always non-negative integers.
+        facts: The index and array names proven in range at the current point.
+    """
+    def __init__(self, inferrer: TypeInferrer) -> None:
+        """Constructor.
+
+        Args:
+            inferrer: The type inference pass that annotated the program.
+        """
+        self.inferrer = inferrer
+        self.non_negative = set()
+        self.facts = set()
+
+        self._assignments = {}
+        self._unknown = set()
+
+    def _collect(self, node: object) -> None:
+        """Collects the values assigned to each variable.
+
+        Args:
+            node: A statement, expression or list of them.
+        """
+        if isinstance(node, list):
+            for item in node:
+                self._collect(item)
+        elif isinstance(node, Assignment):
+            self._assignments.setdefault(node.name.symbol, []).append(
+                node.value
+            )
+            self._collect(node.value)
+        elif isinstance(node, Function):
+            self._unknown.add(node.name.symbol)
+            self._unknown.update(p.symbol for p in node.parameters)
+            self._collect(node.body)
+        elif isinstance(node, For):
+            # The loop variable of `range(a, b)` is never less than `a`.
+            if self.inferrer.is_builtin_call(node.iterable, 'range') and \
+               len(node.iterable.arguments) == 2:
+                self._assignments.setdefault(node.name.symbol, []).append(
+                    node.iterable.arguments[0]
+                )
+            else:
+                self._unknown.add(node.name.symbol)
+            self._collect([node.iterable, node.body])
+        elif isinstance(node, (Expression, Statement)):
+            for child in vars(node).values():
+                if isinstance(child, (list, Expression, Statement)):
+                    self._collect(child)
+
+    def _is_non_negative(self, expression: Expression) -> bool:
+        """Checks if an expression is always a non-negative integer.
+
+        Args:
+            expression: An expression.
+
+        Returns:
+            If the expression is built from non-negative integers with `+` and
+            `*`.
+        """
+        if isinstance(expression, Literal):
+            if expression.value.token_type == TokenType.INTEGER:
+                return True
+
+            return expression.value.token_type == TokenType.IDENTIFIER and \
+                expression.value.symbol in self.non_negative
+        elif isinstance(expression, Grouping):
+            return self._is_non_negative(expression.expression)
+        elif isinstance(expression, Assignment):
+            return self._is_non_negative(expression.value)
+        elif isinstance(expression, Binary):
+            return expression.operator.token_type in [TokenType.PLUS,
+                                                      TokenType.MULTIPLY] and \
+                self._is_non_negative(expression.left) and \
+                self._is_non_negative(expression.right)
+
+        return False
+
+    def _find_non_negative(self) -> None:
+        """Finds the variables that are always non-negative integers.
+        """
+        self.non_negative = set(self._assignments) - self._unknown - \
+            self.inferrer.external
+        changed = True
+        while changed:
+            changed = False
+            for name in list(self.non_negative):
+                if not all(self._is_non_negative(value)
+                           for value in self._assignments[name]):
+                    self.non_negative.remove(name)
+                    changed = True
+
+    def _is_length(self, expression: Expression) -> Optional[str]:
+        """Checks if an expression is `len(a)` of an array variable `a`.
+
+        Args:
+            expression: An expression.
+
+        Returns:
+            The array's name, or None.
+        """
+        if not self.inferrer.is_builtin_call(expression, 'len') or \
+           len(expression.arguments) != 1:
+            return None
+
+        argument = expression.arguments[0]
+        if not isinstance(argument, Literal) or \
+           argument.value.token_type != TokenType.IDENTIFIER:
+            return None
+
+        name = argument.value.symbol
+        if name in self.inferrer.external or \
+           self.inferrer.variables.get(name) != {'array'}:
+            return None
+
+        return name
+
+    def _loop_fact(self, condition: Expression) -> Optional[Tuple[str, str]]:
+        """Finds the index and array a condition proves are in range.
+
+        Args:
+            condition: A loop condition.
+
+        Returns:
+            The index and array names, or None.
+        """
+        if isinstance(condition, Grouping):
+            return self._loop_fact(condition.expression)
+        elif isinstance(condition, Logical) and \
+             condition.operator.token_type == TokenType.AND:
+            fact = self._loop_fact(condition.left)
+            names, calls = self._kills(condition.right)
+            if fact and not calls and not set(fact) & names:
+                return fact
+
+            return self._loop_fact(condition.right)
+        elif not isinstance(condition, Binary):
+            return None
+
+        operator_type = condition.operator.token_type
+        if operator_type == TokenType.LESS:
+            index, length = condition.left, condition.right
+        elif operator_type == TokenType.GREATER:
+            index, length = condition.right, condition.left
+        else:
+            return None
+
+        array = self._is_length(length)
+        if array and isinstance(index, Literal) and \
+           index.value.symbol in self.non_negative:
+            return (index.value.symbol, array)
+
+        return None
+
+    def _kills(self, node: object) -> Tuple[Set[str], bool]:
+        """Finds what could invalidate facts while running code.
+
+        Args:
+            node: A statement, expression or list of them.
+
+        Returns:
+            The assigned variable names, and if there are any calls.
+        """
+        names = set()
+        calls = False
+        if isinstance(node, list):
+            for item in node:
+                item_names, item_calls = self._kills(item)
+                names |= item_names
+                calls = calls or item_calls
+            return names, calls
+        elif isinstance(node, Assignment):
+            names.add(node.name.symbol)
+        elif isinstance(node, Function):
+            names.add(node.name.symbol)
+            return names, calls
+        elif isinstance(node, For):
+            names.add(node.name.symbol)
+            calls = self._is_lazy(node)
+        elif isinstance(node, Yield):
+            calls = True
+        elif isinstance(node, Call) and self._is_length(node) is None:
+            calls = True
+
+        if isinstance(node, (Expression, Statement)):
+            for child in vars(node).values():
+                if isinstance(child, (list, Expression, Statement)):
+                    child_names, child_calls = self._kills(child)
+                    names |= child_names
+                    calls = calls or child_calls
+
+        return names, calls
+
+    def _is_lazy(self, _for: For) -> bool:
+        """Checks if a for loop may run functions to get each value.
+
+        Args:
+            _for: A for statement.
+
+        Returns:
+            If the loop may be over a sequence.
+        """
+        return not self.inferrer.is_builtin_call(_for.iterable, 'range') and \
+            _for.iterable.static_type not in ['array', 'map', 'string']
+
+    def _kill(self, names: Set[str], calls: bool) -> None:
+        """Removes facts that may no longer hold.
+
+        Args:
+            names: Assigned variable names.
+            calls: If a function may have been called.
+        """
+        if calls:
+            self.facts = set()
+        else:
+            self.facts = {fact for fact in self.facts if not set(fact) & names}
+
+    def analyze(self, expression: Expression) -> None:
+        """Analyzes an expression.
+
+        Args:
+            expression: An expression.
+        """
+        expression.accept(self)
+
+    def visit_literal(self, literal: Literal) -> None:
+        pass
+
+    def visit_array(self, array: Array) -> None:
+        for expression in array.expressions:
+            self.analyze(expression)
+
+    def visit_map(self, _map: Map) -> None:
+        for key, value in zip(_map.keys, _map.values):
+            self.analyze(key)
+            self.analyze(value)
+
+    def visit_binary(self, binary: Binary) -> None:
+        self.analyze(binary.left)
+        self.analyze(binary.right)
+
+    def visit_unary(self, unary: Unary) -> None:
+        self.analyze(unary.right)
+
+    def visit_grouping(self, grouping: Grouping) -> None:
+        self.analyze(grouping.expression)
+
+    def visit_assignment(self, assignment: Assignment) -> None:
+        self.analyze(assignment.value)
+        self._kill({assignment.name.symbol}, False)
+
+    def visit_logical(self, logical: Logical) -> None:
+        self.analyze(logical.left)
+        facts = self.facts
+
+        # The right side of `i < len(a) and ...` only runs if it is true.
+        fact = None
+        if logical.operator.token_type == TokenType.AND:
+            fact = self._loop_fact(logical.left)
+        if fact:
+            self.facts = self.facts | {fact}
+        self.analyze(logical.right)
+        self.facts &= facts
+
+    def visit_call(self, call: Call) -> None:
+        self.analyze(call.callee)
+        for argument in call.arguments:
+            self.analyze(argument)
+        if self._is_length(call) is None:
+            self._kill(set(), True)
+
+    def _mark(self, index: Index) -> None:
+        """Marks an array access that is proven to be in range.
+
+        Args:
+            index: An array index expression.
+        """
+        if isinstance(index.index, Literal) and \
+           (index.index.value.symbol, index.name.symbol) in self.facts:
+            index.in_bounds = True
+
+    def visit_index(self, index: Index) -> None:
+        if index.is_slice:
+            for expression in [index.index, index.end]:
+                if expression:
+                    self.analyze(expression)
+            return
+
+        self.analyze(index.index)
+        self._mark(index)
+
+    def visit_array_assignment(self,
+                               array_assignment: ArrayAssignment) -> None:
+        self.analyze(array_assignment.value)
+        self.analyze(array_assignment.index.index)
+        self._mark(array_assignment.index)
+
+    def visit_expression(self, expression: ExpressionStatement) -> None:
+        self.analyze(expression.expression)
+
+    def visit_echo(self, echo: Echo) -> None:
+        self.analyze(echo.expression)
+
+    def visit_block(self, block: Block) -> None:
+        for statement in block.statements:
+            statement.accept(self)
+
+    def visit_if(self, _if: If) -> None:
+        self.analyze(_if.condition)
+        facts = self.facts
+        _if.then.accept(self)
+        then = self.facts
+
+        self.facts = facts
+        if _if._else:
+            _if._else.accept(self)
+        self.facts &= then
+
+    def visit_while(self, _while: While) -> None:
+        # Facts must hold at the start of every iteration, so anything the
+        # loop might change is forgotten first.
+        self._kill(*self._kills([_while.condition, _while.body]))
+        facts = self.facts
+
+        self.analyze(_while.condition)
+        fact = self._loop_fact(_while.condition)
+        if fact:
+            self.facts = self.facts | {fact}
+        _while.body.accept(self)
+
+        self.facts = facts
+
+    def _range_fact(self, _for: For) -> Optional[Tuple[str, str]]:
+        """Finds the index and array a `for i in range(a, len(b))` loop
+        proves are in range.
+
+        Args:
+            _for: A for statement.
+
+        Returns:
+            The index and array names, or None.
+        """
+        if not self.inferrer.is_builtin_call(_for.iterable, 'range') or \
+           len(_for.iterable.arguments) != 2 or \
+           _for.name.symbol not in self.non_negative:
+            return None
+
+        array = self._is_length(_for.iterable.arguments[1])
+        return (_for.name.symbol, array) if array else None
+
+    def visit_for(self, _for: For) -> None:
+        self.analyze(_for.iterable)
+
+        # The length is only read once, so the fact needs a body that can't
+        # change the index or the array at all.
+        names, calls = self._kills(_for.body)
+        calls = calls or self._is_lazy(_for)
+        self._kill(names | {_for.name.symbol}, calls)
+        facts = self.facts
+
+        fact = self._range_fact(_for)
+        if fact and not calls and not set(fact) & names:
+            self.facts = self.facts | {fact}
+        _for.body.accept(self)
+
+        self.facts = facts
+
+    def visit_function(self, function: Function) -> None:
+        # A function can be called from anywhere, so its body starts without
+        # any facts.
+        facts = self.facts
+        self.facts = set()
+        for statement in function.body:
+            statement.accept(self)
+        self.facts = facts
+        self._kill({function.name.symbol}, False)
+
+    def visit_return(self, _return: Return) -> None:
+        self.analyze(_return.value)
+
+    def visit_yield(self, _yield: Yield) -> None:
+        # The caller runs while the function is paused.
+        self.analyze(_yield.value)
+        self._kill(set(), True)
+
+    def annotate(self, statements: List[Statement]) -> None:
+        """Marks array accesses that are proven to be in range.
+
+        Args:
+            statements: The program's statements, annotated with types.
+        """
+        self._collect(statements)
+        self._find_non_negative()
+        for statement in statements:
+            statement.accept(self)
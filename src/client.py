@@ -0,0 +1,64 @@
+from __future__ import annotations
+# Clients only import this module, so it must only use the standard library.
+import json
+import socket
+from typing import BinaryIO, Dict, Optional
+
+# The socket a server listens on if no other path is given.
+SOCKET_PATH = '/tmp/coffee_bean.sock'
+
+def write_message(file: BinaryIO, message: Dict[str, object]) -> None:
+    """Writes a message as one line of JSON.
+
+    Args:
+        file: A socket file opened for writing.
+        message: The message.
+    """
+    file.write(json.dumps(message).encode() + b'\n')
+    file.flush()
+
+def read_message(file: BinaryIO) -> Optional[Dict[str, object]]:
+    """Reads a message written by `write_message`.
+
+    Args:
+        file: A socket file opened for reading.
+
+    Returns:
+        The message, or None if the other side closed the connection or sent
+        something that isn't a JSON object.
+    """
+    line = file.readline()
+    try:
+        message = json.loads(line)
+    except ValueError:
+        return None
+
+    return message if isinstance(message, dict) else None
+
+def run(request: Dict[str, object],
+        path: str = SOCKET_PATH) -> Dict[str, object]:
+    """Sends a program to a server and waits for it to run.
+
+    Args:
+        request: Either `path`, the absolute path of a source file, or
+            `source`, source code, with `directory` for its imports to be
+            relative to.
+        path: The path of the server's socket.
+
+    Returns:
+        The response, with the echoed lines and any error message as `output`
+        and 0, or 1 after an error, as `status`.
+
+    Raises:
+        OSError: The server isn't running or closed the connection.
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(path)
+        with connection.makefile('rwb') as file:
+            write_message(file, request)
+            response = read_message(file)
+
+    if response is None:
+        raise ConnectionError('The server closed the connection.')
+
+    return response
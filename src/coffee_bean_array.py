@@ -0,0 +1,289 @@
+from __future__ import annotations
+import array
+import itertools
+from typing import Iterator, List, Optional, Union
+from src.persistent_vector import *
+
+# The `array.array` type codes for element types that can be stored compactly.
+TYPE_CODES = {
+    int: 'q',
+    float: 'd',
+}
+
+ELEMENT_TYPES = {code: element_type
+                 for element_type, code in TYPE_CODES.items()}
+
+Storage = Union[array.array,
+                memoryview,
+                'ListView',
+                PersistentVector,
+                List[object]]
+
+def pack(values: Storage) -> Storage:
+    """Chooses the storage for array elements.
+
+    Args:
+        values: The elements, or an `array.array` or view to use as is.
+
+    Returns:
+        An `array.array` if the elements are all ints or all floats, or a list.
+    """
+    if type(values) in [array.array, memoryview, ListView, PersistentVector]:
+        return values
+    elif values:
+        element_type = type(values[0])
+        if element_type in TYPE_CODES and \
+           all(type(value) is element_type for value in values):
+            try:
+                return array.array(TYPE_CODES[element_type], values)
+            except OverflowError:
+                pass
+
+    return list(values)
+
+def type_code(values: Storage) -> Optional[str]:
+    """Gets the type code of compact elements.
+
+    Args:
+        values: An array's elements.
+
+    Returns:
+        `q` or `d` for an `array.array` or a view of one, or None.
+    """
+    values_type = type(values)
+    if values_type == array.array:
+        return values.typecode
+    elif values_type == memoryview:
+        return values.format
+
+    return None
+
+class ListView:
+    """Defines a read-only window into a list, without copying it.
+
+    Attributes:
+        values: The list.
+        start: The index of the first element in the window.
+        stop: The index after the last element in the window.
+    """
+    __slots__ = ['values', 'start', 'stop']
+
+    def __init__(self, values: List[object], start: int, stop: int) -> None:
+        """Constructor.
+
+        Args:
+            values: The list.
+            start: The index of the first element in the window.
+            stop: The index after the last element in the window.
+        """
+        self.values = values
+        self.start = start
+        self.stop = stop
+
+    def __getitem__(self, index: int) -> object:
+        return self.values[self.start + index]
+
+    def __len__(self) -> int:
+        return self.stop - self.start
+
+    def __iter__(self) -> Iterator[object]:
+        return itertools.islice(self.values, self.start, self.stop)
+
+    def tolist(self) -> List[object]:
+        return list(self)
+
+class CoffeeBeanArray:
+    """Defines a Coffee Bean array.
+
+    Arrays whose elements are all ints or all floats are stored in a compact
+    `array.array` buffer instead of a list of boxed objects. Storing any other
+    value, or an int too big for 64 bits, switches the array to a list for good.
+
+    Slices are views that share elements with the array they came from. Both
+    are marked as shared, and whichever is changed first copies its elements.
+
+    Snapshots switch the elements to a `PersistentVector`, which is never
+    changed in place. Copying it is free and changing an element only copies
+    the path to it, so snapshots and the original stay cheap to change.
+
+    Attributes:
+        values: The elements, in an `array.array`, a list, a
+            `PersistentVector`, or a `memoryview` or `ListView` of another
+            array's elements.
+        shared: If the elements may be seen by another array, so they must be
+            copied before they are changed.
+    """
+    def __init__(self, values: Storage, shared: bool = False) -> None:
+        """Constructor.
+
+        Args:
+            values: The elements.
+            shared: If the elements belong to another array.
+        """
+        self.values = pack(values)
+        self.shared = shared
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[object]:
+        return iter(self.values)
+
+    def items(self) -> Iterator[object]:
+        """Iterates over the elements, seeing changes made while iterating.
+
+        Yields:
+            The elements, read by index.
+        """
+        index = 0
+        while index < len(self.values):
+            yield self.values[index]
+            index += 1
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) != CoffeeBeanArray:
+            return False
+        elif type(self.values) == type(other.values) and \
+             type(self.values) in [array.array, list]:
+            return self.values == other.values
+
+        return list(self.values) == list(other.values)
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(list(self.values))
+
+    def _own(self) -> None:
+        """Copies shared elements so they can be changed.
+        """
+        code = type_code(self.values)
+        if code:
+            values = array.array(code)
+            values.frombytes(memoryview(self.values).cast('B'))
+            self.values = values
+        else:
+            self.values = list(self.values)
+
+        self.shared = False
+
+    def slice(self, start: int, stop: int) -> CoffeeBeanArray:
+        """Gets a view of a range of elements.
+
+        Args:
+            start: The index of the first element, in range.
+            stop: The index after the last element, in range.
+
+        Returns:
+            An array sharing the elements.
+        """
+        values = self.values
+        if type_code(values):
+            view = memoryview(values)[start:stop]
+        elif type(values) == ListView:
+            view = ListView(values.values,
+                            values.start + start,
+                            values.start + stop)
+        else:
+            view = ListView(values, start, stop)
+
+        self.shared = True
+        return CoffeeBeanArray(view, True)
+
+    def snapshot(self) -> CoffeeBeanArray:
+        """Copies the array in O(1) after the first snapshot.
+
+        Returns:
+            An array sharing the elements.
+        """
+        if type(self.values) != PersistentVector:
+            self.values = PersistentVector.from_values(self.values)
+            self.shared = False
+
+        return CoffeeBeanArray(self.values)
+
+    def set(self, index: int, value: object) -> None:
+        """Stores an element.
+
+        Args:
+            index: An index in range.
+            value: The new element.
+        """
+        if self.values.__class__ is PersistentVector:
+            self.values = self.values.set(index, value)
+            return
+        elif self.shared:
+            self._own()
+
+        values = self.values
+        if values.__class__ is not list:
+            if type(value) is ELEMENT_TYPES[values.typecode]:
+                try:
+                    values[index] = value
+                    return
+                except OverflowError:
+                    pass
+
+            values = self.values = values.tolist()
+
+        values[index] = value
+
+    def append(self, value: object) -> None:
+        """Adds an element to the end.
+
+        Args:
+            value: The new element.
+        """
+        if self.values.__class__ is PersistentVector:
+            self.values = self.values.append(value)
+            return
+        elif self.shared:
+            self._own()
+
+        values = self.values
+        if values.__class__ is not list:
+            if type(value) is ELEMENT_TYPES[values.typecode]:
+                try:
+                    values.append(value)
+                    return
+                except OverflowError:
+                    pass
+
+            values = self.values = values.tolist()
+        elif not values:
+            # An empty array can still become compact.
+            self.values = pack([value])
+            return
+
+        values.append(value)
+
+    def pop(self) -> object:
+        """Removes the last element.
+
+        Returns:
+            The element.
+        """
+        if self.shared or self.values.__class__ is PersistentVector:
+            self._own()
+
+        return self.values.pop()
+
+    def replace(self, values: Storage) -> None:
+        """Replaces all elements, leaving views of the old ones unchanged.
+
+        Args:
+            values: The new elements.
+        """
+        self.values = pack(values)
+        self.shared = False
+
+    def reverse(self) -> None:
+        """Reverses the elements in place.
+        """
+        if self.shared or self.values.__class__ is PersistentVector:
+            self._own()
+
+        self.values.reverse()
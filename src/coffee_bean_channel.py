@@ -0,0 +1,20 @@
+from __future__ import annotations
+import collections
+
+class CoffeeBeanChannel:
+    """Defines a Coffee Bean channel, a queue that tasks send values through.
+
+    Attributes:
+        items: The values sent but not received yet.
+        receivers: The tasks waiting for a value.
+        closed: If no more values can be sent.
+    """
+    def __init__(self) -> None:
+        """Constructor.
+        """
+        self.items = collections.deque()
+        self.receivers = collections.deque()
+        self.closed = False
+
+    def __str__(self) -> str:
+        return '<channel>'
@@ -0,0 +1,35 @@
+from __future__ import annotations
+import threading
+from typing import TextIO
+
+# The size of the buffer between a file and the disk.
+FILE_BUFFER_SIZE = 1 << 16
+
+# The modes files can be opened in.
+FILE_MODES = ['r', 'w', 'a']
+
+class CoffeeBeanFile:
+    """Defines a Coffee Bean file opened for reading or writing.
+
+    Attributes:
+        path: The path the file was opened with.
+        mode: `r` to read, `w` to write or `a` to append.
+        file: The Python file object.
+        lock: The lock held while reading, so tasks that read while others run
+            never read at the same time.
+    """
+    def __init__(self, path: str, mode: str, file: TextIO) -> None:
+        """Constructor.
+
+        Args:
+            path: The path the file was opened with.
+            mode: The mode the file was opened in.
+            file: A Python file object.
+        """
+        self.path = path
+        self.mode = mode
+        self.file = file
+        self.lock = threading.Lock()
+
+    def __str__(self) -> str:
+        return f'<file {self.path}>'
@@ -0,0 +1,36 @@
+from __future__ import annotations
+from typing import Dict, Iterator
+
+# The types of values that can be map keys.
+KEY_TYPES = [type(None), bool, int, float, str]
+
+class CoffeeBeanMap:
+    """Defines a Coffee Bean map from keys to values.
+
+    Attributes:
+        values: Keys and their values, in insertion order.
+    """
+    def __init__(self, values: Dict[object, object]) -> None:
+        """Constructor.
+
+        Args:
+            values: Keys and their values.
+        """
+        self.values = values
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def __iter__(self) -> Iterator[object]:
+        return iter(self.values)
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) == CoffeeBeanMap and self.values == other.values
+
+    def __ne__(self, other: object) -> bool:
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return repr(self.values)
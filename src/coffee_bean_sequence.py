@@ -0,0 +1,26 @@
+from __future__ import annotations
+from typing import Iterator
+
+class CoffeeBeanSequence:
+    """Defines a Coffee Bean lazy sequence.
+
+    Values are only computed when something asks for the next one, so a
+    pipeline of sequences holds one value at a time instead of a whole array.
+    A sequence can only be looped over once.
+
+    Attributes:
+        iterator: The Python iterator producing the values.
+    """
+    def __init__(self, iterator: Iterator[object]) -> None:
+        """Constructor.
+
+        Args:
+            iterator: A Python iterator producing the values.
+        """
+        self.iterator = iterator
+
+    def __iter__(self) -> Iterator[object]:
+        return self.iterator
+
+    def __str__(self) -> str:
+        return '<sequence>'
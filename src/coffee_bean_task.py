@@ -0,0 +1,37 @@
+from __future__ import annotations
+import threading
+from typing import List, Optional
+from src.language_object import *
+
+class CoffeeBeanTask:
+    """Defines a Coffee Bean task, a function call running alongside the rest
+    of the program.
+
+    Attributes:
+        function: The function the task calls, or None for the main program.
+        thread: The thread holding the task's call stack.
+        event: Set when the task may run.
+        done: If the task has finished.
+        joined: If anything waited for the task.
+        result: The function's return value.
+        error: The error the function raised, if any.
+        waiters: The tasks waiting for this one to finish.
+    """
+    def __init__(self, function: Optional[CoffeeBeanCallable]) -> None:
+        """Constructor.
+
+        Args:
+            function: The function the task calls, or None for the main
+                program.
+        """
+        self.function = function
+        self.thread = None
+        self.event = threading.Event()
+        self.done = False
+        self.joined = False
+        self.result = None
+        self.error = None
+        self.waiters = []
+
+    def __str__(self) -> str:
+        return f'<task {self.function}>'
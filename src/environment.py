@@ -9,7 +9,14 @@ class Environment:
     Attributes:
         enclosing: The enclosing environment.
         values: Variable names and their values.
+        imports: Names defined by imported modules and their modules, which
+            are looked up if no environment has the variable.
+        read_only: If `add` never creates or changes variables here, like in
+            the environment of built-in functions.
     """
+    imports = None
+    read_only = False
+
     def __init__(self, enclosing: Optional[Environment] = None) -> None:
         """Constructor.
 
@@ -31,7 +38,8 @@ class Environment:
         if not self.enclosing:
             return False
 
-        if name.symbol in self.enclosing.values:
+        if name.symbol in self.enclosing.values and \
+           not self.enclosing.read_only:
             return True
 
         return self.enclosing._in_enclosing(name)
@@ -49,6 +57,39 @@ class Environment:
         
         self.values[name.symbol] = value
 
+    def values_for(self, name: Token) -> dict:
+        """Finds the dictionary `add` stores a variable in.
+
+        Args:
+            name: An identifier token with a variable name.
+
+        Returns:
+            The outermost enclosing dictionary with the variable that isn't
+            read-only, or this environment's.
+        """
+        values = self.values
+        environment = self.enclosing
+        while environment:
+            if name.symbol in environment.values and \
+               not environment.read_only:
+                values = environment.values
+            environment = environment.enclosing
+
+        return values
+
+    def add_import(self, module: Module) -> None:
+        """Makes the names a module defines visible, without loading it.
+
+        Args:
+            module: An imported module. If several modules define a name, the
+                first one imported is used.
+        """
+        if self.imports is None:
+            self.imports = {}
+
+        for name in module.exports:
+            self.imports.setdefault(name, module)
+
     def get(self, name: Token) -> object:
         """Gets the value of a variable.
         
@@ -58,10 +99,17 @@ class Environment:
         Returns:
             The variable's value.
         """
-        if name.symbol in self.values:
-            return self.values[name.symbol]
+        environment = self
+        while environment:
+            if name.symbol in environment.values:
+                return environment.values[name.symbol]
+            environment = environment.enclosing
 
-        if self.enclosing:
-            return self.enclosing.get(name)
+        # Imported names are only used if nothing else defines them.
+        environment = self
+        while environment:
+            if environment.imports and name.symbol in environment.imports:
+                return environment.imports[name.symbol].get(name)
+            environment = environment.enclosing
 
         raise RuntimeError(f"Line {name.line}\nError: Undefined variable '{name.symbol}'.")
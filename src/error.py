@@ -8,6 +8,11 @@ class ParserError(Exception):
     """
     pass
 
+class TranspilerError(Exception):
+    """Defines an error while transpiling a function to Python.
+    """
+    pass
+
 class RuntimeError(Exception):
     """Defines a error during runtime.
     """
@@ -18,3 +23,9 @@ class ReturnError(RuntimeError):
     """
     def __init__(self, value: object) -> None:
         self.value = value
+
+class CancelledError(BaseException):
+    """Defines a pseudo-error that unwinds a task when its program ends before
+    the task does. Nothing in the interpreter handles it.
+    """
+    pass
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from typing import List, Optional
 from src.token import *
 
 class ExpressionVisitor:
@@ -10,6 +11,9 @@ class ExpressionVisitor:
     def visit_array(self, array: Array):
         pass
 
+    def visit_map(self, _map: Map):
+        pass
+
     def visit_binary(self, binary: Binary):
         pass
 
@@ -36,7 +40,12 @@ class ExpressionVisitor:
 
 class Expression:
     """Defines an expression base class.
+
+    Attributes:
+        static_type: The type inferred for the expression, or None if unknown.
     """
+    static_type = None
+
     def accept(self, visitor: ExpressionVisitor):
         pass
 
@@ -76,6 +85,29 @@ class Array(Expression):
     def accept(self, visitor: ExpressionVisitor):
         return visitor.visit_array(self)
 
+class Map(Expression):
+    """Defines a container for a map expression.
+
+    Attributes:
+        keys: The key expressions.
+        values: The value expressions, in the same order as the keys.
+    """
+    def __init__(self,
+                 keys: List[Expression],
+                 values: List[Expression]) -> None:
+        self.keys = keys
+        self.values = values
+
+    def __str__(self) -> str:
+        if not self.keys:
+            return '{:}'
+
+        return '{' + ', '.join(f'{key}: {value}' for key, value
+                               in zip(self.keys, self.values)) + '}'
+
+    def accept(self, visitor: ExpressionVisitor):
+        return visitor.visit_map(self)
+
 class Binary(Expression):
     """Defines a container for a binary expression.
 
@@ -83,6 +115,7 @@ class Binary(Expression):
         left: The expression on the left side of the operator.
         operator: The binary operator.
         right: The expression on the right side of the operator.
+        numeric: If both operands are known to be numbers.
     """
     def __init__(self,
                  left: Expression,
@@ -98,6 +131,7 @@ class Binary(Expression):
         self.left = left
         self.operator = operator
         self.right = right
+        self.numeric = False
 
     def __str__(self) -> str:
         """Formats the binary expression as a string.
@@ -116,6 +150,7 @@ class Unary(Expression):
     Attributes:
         operator: A unary operator.
         right: The right hand side of the unary expression.
+        numeric: If the operand is known to be a number.
     """
     def __init__(self, operator: Token, right: Expression) -> None:
         """Constructor.
@@ -126,6 +161,7 @@ class Unary(Expression):
         """
         self.operator = operator
         self.right = right
+        self.numeric = False
 
     def __str__(self) -> str:
         """Formats the unary expression as a string.
@@ -265,20 +301,42 @@ class Call(Expression):
         Returns:
             The callee expression and the arguments.
         """
-        return f'{self.callee}({", ".join(self.arguments)})'
+        arguments = ', '.join(str(argument) for argument in self.arguments)
+        return f'{self.callee}({arguments})'
 
     def accept(self, visitor: ExpressionVisitor):
         return visitor.visit_call(self)
 
 class Index(Expression):
     """Defines a container for an array index expression.
-    
+
+    A slice like `a[2:10]` gets a view of a range of elements instead.
+
+    Attributes:
+        name: The array's name.
+        index: The index, or the start of a slice, which may be None.
+        end: The end of a slice, or None.
+        is_slice: If the expression is a slice.
+        in_bounds: If the index is proven to be an int in range, so it needs no
+            runtime checks.
     """
-    def __init__(self, name: Token, index: Expression) -> None:
+    def __init__(self,
+                 name: Token,
+                 index: Optional[Expression],
+                 end: Optional[Expression] = None,
+                 is_slice: bool = False) -> None:
         self.name = name
         self.index = index
+        self.end = end
+        self.is_slice = is_slice
+        self.in_bounds = False
 
     def __str__(self) -> str:
+        if self.is_slice:
+            start = '' if self.index is None else self.index
+            end = '' if self.end is None else self.end
+            return f'{self.name}[{start}:{end}]'
+
         return f'{self.name}[{self.index}]'
     
     def accept(self, visitor: ExpressionVisitor):
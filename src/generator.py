@@ -0,0 +1,217 @@
+from __future__ import annotations
+from typing import Callable, Iterator, List
+from src.error import *
+from src.expression import *
+from src.statement import *
+from src.environment import *
+from src.transpiler import *
+
+class GeneratorRunner(StatementVisitor):
+    """Defines a visitor to run the body of a generator function one value at
+    a time.
+
+    Statements that can reach a `yield` become Python generators, which pause
+    the body between values. Everything else, including loops that never
+    yield, runs in the interpreter as usual. Hot loops that yield tier up to
+    Python generators, which the body then delegates to.
+
+    The interpreter's environment is swapped back to the caller's while the
+    body is paused, and restored by the `yield` when it resumes.
+
+    Attributes:
+        interpreter: The interpreter running the program.
+        yields: Statements and if they can reach a `yield`.
+    """
+    def __init__(self, interpreter: Interpreter) -> None:
+        """Constructor.
+
+        Args:
+            interpreter: The interpreter running the program.
+        """
+        self.interpreter = interpreter
+        self.yields = {}
+
+    def _yields(self, statement: Statement) -> bool:
+        """Checks if a statement can reach a `yield`.
+
+        Args:
+            statement: A statement in a generator function's body.
+
+        Returns:
+            If the statement is or contains a `yield`, outside of nested
+            functions.
+        """
+        if statement not in self.yields:
+            if isinstance(statement, Yield):
+                result = True
+            elif isinstance(statement, Block):
+                result = any(self._yields(s) for s in statement.statements)
+            elif isinstance(statement, If):
+                result = self._yields(statement.then) or \
+                    (statement._else is not None and
+                     self._yields(statement._else))
+            elif isinstance(statement, (While, For)):
+                result = self._yields(statement.body)
+            else:
+                result = False
+            self.yields[statement] = result
+
+        return self.yields[statement]
+
+    def _run(self, statement: Statement) -> Iterator[object]:
+        """Runs a statement, producing the values it yields.
+
+        Args:
+            statement: A statement in a generator function's body.
+
+        Yields:
+            The yielded values.
+        """
+        if self._yields(statement):
+            yield from statement.accept(self)
+        else:
+            statement.accept(self.interpreter)
+
+    def _resume(self, body: Iterator[object]) -> Iterator[object]:
+        """Runs a paused body until its next value, and then hands the
+        interpreter back to the caller.
+
+        Args:
+            body: The running body.
+
+        Yields:
+            The yielded values.
+        """
+        interpreter = self.interpreter
+        while True:
+            environment = interpreter.environment
+            try:
+                value = next(body)
+            except StopIteration:
+                return
+            finally:
+                interpreter.environment = environment
+
+            yield value
+
+    def _run_compiled(self,
+                      code: Callable,
+                      arguments: List[object]) -> Iterator[object]:
+        """Runs a loop transpiled to a Python generator.
+
+        Args:
+            code: The transpiled loop.
+            arguments: Arguments after the interpreter and environment.
+
+        Yields:
+            The yielded values.
+
+        Returns:
+            The loop's result, which is ``FALLBACK`` if it can't run.
+        """
+        interpreter = self.interpreter
+        environment = interpreter.environment
+        result = yield from code(interpreter, environment, *arguments)
+        interpreter.environment = environment
+
+        return result
+
+    def start(self,
+              function: CoffeeBeanFunction,
+              arguments: List[object]) -> Iterator[object]:
+        """Creates the values of a call to a generator function. The body
+        doesn't run until the first value is needed.
+
+        Args:
+            function: A generator function.
+            arguments: Argument values.
+
+        Returns:
+            The values the body yields.
+        """
+        def body() -> Iterator[object]:
+            environment = Environment(function.closure)
+            for parameter, argument in zip(function.declaration.parameters,
+                                           arguments):
+                environment.values[parameter.symbol] = argument
+
+            self.interpreter.environment = environment
+            try:
+                for statement in function.declaration.body:
+                    yield from self._run(statement)
+            except ReturnError:
+                return
+
+        return self._resume(body())
+
+    def visit_block(self, block: Block) -> Iterator[object]:
+        interpreter = self.interpreter
+        enclosing = interpreter.environment
+        interpreter.environment = Environment(enclosing)
+        for statement in block.statements:
+            yield from self._run(statement)
+        interpreter.environment = enclosing
+
+    def visit_if(self, _if: If) -> Iterator[object]:
+        interpreter = self.interpreter
+        if interpreter._to_boolean(interpreter.evaluate(_if.condition)):
+            yield from self._run(_if.then)
+        elif _if._else:
+            yield from self._run(_if._else)
+
+    def visit_while(self, _while: While) -> Iterator[object]:
+        interpreter = self.interpreter
+        code = interpreter.loops.get(_while)
+        if code and (yield from self._run_compiled(code, [])) is not FALLBACK:
+            return
+
+        budget = interpreter.budget
+        back_edges = interpreter.back_edges.get(_while, 0)
+        while interpreter.evaluate(_while.condition):
+            if budget:
+                budget.step(interpreter, _while.keyword.line)
+            yield from self._run(_while.body)
+
+            back_edges += 1
+            if back_edges == interpreter.loop_threshold:
+                interpreter.back_edges[_while] = back_edges
+                code = interpreter._compile_loop(_while)
+                if code and \
+                   (yield from self._run_compiled(code, [])) is not FALLBACK:
+                    return
+        interpreter.back_edges[_while] = back_edges
+
+    def visit_for(self, _for: For) -> Iterator[object]:
+        interpreter = self.interpreter
+        iterator = interpreter._iterate(interpreter.evaluate(_for.iterable))
+        code = interpreter.loops.get(_for)
+        if code and \
+           (yield from self._run_compiled(code, [iterator])) is not FALLBACK:
+            return
+
+        values = interpreter.environment.values_for(_for.name)
+        name = _for.name.symbol
+        budget = interpreter.budget
+        back_edges = interpreter.back_edges.get(_for, 0)
+        for item in iterator:
+            if budget:
+                budget.step(interpreter, _for.keyword.line)
+            values[name] = item
+            yield from self._run(_for.body)
+
+            back_edges += 1
+            if back_edges == interpreter.loop_threshold:
+                interpreter.back_edges[_for] = back_edges
+                code = interpreter._compile_loop(_for)
+                if code and (yield from self._run_compiled(code, [iterator])) \
+                   is not FALLBACK:
+                    return
+        interpreter.back_edges[_for] = back_edges
+
+    def visit_yield(self, _yield: Yield) -> Iterator[object]:
+        interpreter = self.interpreter
+        value = interpreter.evaluate(_yield.value)
+
+        environment = interpreter.environment
+        yield value
+        interpreter.environment = environment
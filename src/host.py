@@ -0,0 +1,22 @@
+from __future__ import annotations
+from src.coffee_bean_array import *
+from src.coffee_bean_map import *
+
+def to_value(value: object) -> object:
+    """Converts a Python value, like one decoded from JSON, to a Coffee Bean
+    value.
+
+    Args:
+        value: None, a bool, int, float or str, or a list, tuple or dict of
+            them.
+
+    Returns:
+        The value, with lists and tuples as arrays and dicts as maps.
+    """
+    if isinstance(value, (list, tuple)):
+        return CoffeeBeanArray([to_value(item) for item in value])
+    elif isinstance(value, dict):
+        return CoffeeBeanMap({key: to_value(item)
+                              for key, item in value.items()})
+
+    return value
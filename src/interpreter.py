@@ -1,34 +1,179 @@
 from __future__ import annotations
-from typing import Union, Optional, List
+import copy
+from typing import Callable, Iterator, Union, Optional, List
 from src.error import *
 from src.token import *
 from src.expression import *
 from src.statement import *
 from src.environment import *
 from src.language_object import *
+from src.library import *
+from src.coffee_bean_array import *
+from src.coffee_bean_map import *
+from src.coffee_bean_sequence import *
+from src.vector import *
+from src.rope import *
+from src.transpiler import *
+from src.generator import *
+from src.module import *
+from src.output import *
+from src.scheduler import *
+from src.limits import *
+
+ARITHMETIC_TYPES = [
+    TokenType.PLUS,
+    TokenType.MINUS,
+    TokenType.MULTIPLY,
+    TokenType.DIVIDE,
+]
+
+# The default number of calls before a function is transpiled to Python.
+CALL_THRESHOLD = 50
+
+# The default number of iterations before a loop is transpiled to Python.
+LOOP_THRESHOLD = 1000
 
 class Interpreter(ExpressionVisitor, StatementVisitor):
     """Defines a visitor to evaluate an expression.
 
+    Code starts running in the tree walker. Functions and loops are counted,
+    and once they cross a threshold they are transpiled to Python.
+
+    An interpreter is the context of one execution. It holds the current
+    environment and line, so threads must each use their own. Statements are
+    never changed while they run, so any number of interpreters can run the
+    same statements at once.
+
     Attributes:
         environment: The interpreter's runtime environment.
         line: The current line number in the source code.
+        call_threshold: The number of calls before a function tiers up.
+        loop_threshold: The number of iterations before a loop tiers up.
+        debug: If tier-up events are printed.
+        output: The buffer echoed lines are written to.
+        back_edges: The number of iterations of each loop.
+        loops: Transpiled loops.
+        generators: The runner for the bodies of generator functions.
+        loader: The loader for imported modules.
+        scheduler: The scheduler for spawned tasks, or None until the program
+            uses tasks, channels or `sleep`.
+        task: The task the interpreter runs, or None without a scheduler.
+        limits: The limits on each run, or None.
+        budget: What the current run has used of the limits, or None.
+        depth: The number of function calls in progress.
+        file_root: The directory the program can open files in, or None if
+            it can't open files.
     """
-    def __init__(self, environment: Optinal[Environment] = None) -> None:
+    def __init__(self,
+                 environment: Optional[Environment] = None,
+                 call_threshold: int = CALL_THRESHOLD,
+                 loop_threshold: int = LOOP_THRESHOLD,
+                 debug: bool = False,
+                 output: Optional[Output] = None,
+                 limits: Optional[Limits] = None,
+                 file_root: Optional[str] = None) -> None:
         """Constructor.
 
         Args:
-            environment: 
+            environment: An environment to run code in instead of the globals.
+            call_threshold: A number of calls before a function tiers up.
+            loop_threshold: A number of iterations before a loop tiers up.
+            debug: If tier-up events are printed.
+            output: A buffer to write echoed lines to instead of a buffer for
+                standard output.
+            limits: Limits on the steps, time, call depth and value sizes of
+                the program.
+            file_root: A directory the program can open files in. Programs
+                with limits can't open files.
         """
-        self.globals = Environment()
-        self.globals.values = {
-            'clock': CoffeeBeanClock(),
-        }
+        self.globals = Environment(BUILTINS)
 
         self.environment = environment or self.globals 
         
         self.line = 1
 
+        self.call_threshold = call_threshold
+        self.loop_threshold = loop_threshold
+        self.debug = debug
+        self.output = output or Output()
+        self.back_edges = {}
+        self.loops = {}
+        self.generators = GeneratorRunner(self)
+        self.loader = ModuleLoader(self)
+        self.scheduler = None
+        self.task = None
+        self.limits = limits or None
+        self.budget = None
+        self.depth = 0
+        self.file_root = file_root
+        self._start_budget()
+
+    def _start_budget(self) -> None:
+        """Starts a new budget for the next run, if there are limits.
+        """
+        if self.limits:
+            self.budget = Budget(self.limits)
+
+    def _check_size(self, size: int, unit: str = 'elements') -> None:
+        """Checks the size of a value that grew against the size limit.
+
+        Args:
+            size: The number of elements, entries or characters.
+            unit: What the size counts.
+        """
+        if self.budget:
+            self.budget.check_size(self, size, unit)
+
+    def _fork(self) -> Interpreter:
+        """Creates an interpreter for another task of the same program.
+
+        Returns:
+            An interpreter sharing everything but the current environment,
+            line, generator runner and call depth.
+        """
+        interpreter = copy.copy(self)
+        interpreter.generators = GeneratorRunner(interpreter)
+        interpreter.depth = 0
+        return interpreter
+
+    def _scheduler(self) -> Scheduler:
+        """Gets the scheduler for tasks, creating it on first use.
+
+        Returns:
+            The scheduler.
+        """
+        if self.scheduler is None:
+            self.scheduler = Scheduler()
+            self.task = self.scheduler.main
+
+        return self.scheduler
+
+    def _finish_tasks(self) -> None:
+        """Waits for the tasks the program spawned.
+        """
+        if self.scheduler:
+            self.scheduler.finish(self)
+
+    def _stop_tasks(self) -> None:
+        """Unwinds the tasks that are still running and removes the
+        scheduler.
+        """
+        if self.scheduler:
+            self.scheduler.stop()
+            self.scheduler = None
+            self.task = None
+
+    def _debug(self, message: str) -> None:
+        """Prints a debug message.
+
+        Args:
+            message: A debug message.
+        """
+        if self.debug:
+            # Flushing first keeps messages in order with echoed lines.
+            self.output.flush()
+            print(message)
+
     def _error(self, message: str) -> None:
         """Raises a runtime error.
 
@@ -75,6 +220,8 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
             return value
         elif value_type == str:
             return value != ''
+        elif value_type == Rope or value_type == StringView:
+            return value.length != 0
         elif value_type == int:
             return value != 0
         elif value_type == float:
@@ -122,12 +269,20 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
 
         return None
 
-    def visit_array(self, array: Array) -> List[object]:
+    def visit_array(self, array: Array) -> CoffeeBeanArray:
         values = []
         for expression in array.expressions:
             values.append(self.evaluate(expression))
 
-        return values
+        return CoffeeBeanArray(values)
+
+    def visit_map(self, _map: Map) -> CoffeeBeanMap:
+        values = {}
+        for key, value in zip(_map.keys, _map.values):
+            key_value = self._check_key(self.evaluate(key))
+            values[key_value] = self.evaluate(value)
+
+        return CoffeeBeanMap(values)
 
     def visit_binary(self, binary: Binary) -> object:
         """Evaluates a binary expression.
@@ -142,15 +297,29 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
         left_value = self.evaluate(binary.left)
         right_value = self.evaluate(binary.right)
 
+        # Operands inferred to be numbers don't need to be checked.
+        if not binary.numeric:
+            if operator_type in ARITHMETIC_TYPES:
+                return self._arithmetic(operator_type, left_value, right_value)
+            elif operator_type in VECTOR_OPERATORS and \
+                 (type(left_value) == CoffeeBeanArray or \
+                  type(right_value) == CoffeeBeanArray):
+                return vector_binary(self,
+                                     operator_type,
+                                     left_value,
+                                     right_value)
+
         # Arithmetic operations.
         if operator_type == TokenType.PLUS:
-            return self._to_number(left_value) + self._to_number(right_value)
+            return left_value + right_value
         elif operator_type == TokenType.MINUS:
-            return self._to_number(left_value) - self._to_number(right_value)
+            return left_value - right_value
         elif operator_type == TokenType.MULTIPLY:
-            return self._to_number(left_value) * self._to_number(right_value)
+            return left_value * right_value
         elif operator_type == TokenType.DIVIDE:
-            return self._to_number(left_value) / self._to_number(right_value)
+            if right_value == 0:
+                self._error('Cannot divide by zero.')
+            return left_value / right_value
 
         # Logic operations.
         elif operator_type == TokenType.EQUAL_EQUAL:
@@ -168,6 +337,44 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
 
         return None
 
+    def _arithmetic(self,
+                    operator_type: TokenType,
+                    left: object,
+                    right: object) -> object:
+        """Applies an arithmetic operator to operands that may not be numbers.
+
+        Arrays apply the operator to each element, and `+` joins strings.
+
+        Args:
+            operator_type: An arithmetic operator.
+            left: The left operand.
+            right: The right operand.
+
+        Returns:
+            The result.
+        """
+        if type(left) == CoffeeBeanArray or type(right) == CoffeeBeanArray:
+            return vector_binary(self, operator_type, left, right)
+        elif operator_type == TokenType.PLUS and \
+             type(left) in STRING_TYPES and type(right) in STRING_TYPES:
+            value = concatenate(left, right)
+            if self.budget:
+                self.budget.check_size(self, len(value), 'characters')
+            return value
+
+        left = self._to_number(left)
+        right = self._to_number(right)
+        if operator_type == TokenType.PLUS:
+            return left + right
+        elif operator_type == TokenType.MINUS:
+            return left - right
+        elif operator_type == TokenType.MULTIPLY:
+            return left * right
+        elif right == 0:
+            self._error('Cannot divide by zero.')
+
+        return left / right
+
     def visit_unary(self, unary: Unary) -> object:
         """Evaluates a unary expression.
         
@@ -181,9 +388,11 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
         right_value = self.evaluate(unary.right)
 
         if operator_type == TokenType.PLUS:
-            return +self._to_number(right_value)
+            return +(right_value if unary.numeric
+                     else self._to_number(right_value))
         elif operator_type == TokenType.MINUS:
-            return -self._to_number(right_value)
+            return -(right_value if unary.numeric
+                     else self._to_number(right_value))
         elif operator_type == TokenType.BANG:
             return not self._to_boolean(right_value)
         elif operator_type == TokenType.NOT:
@@ -231,42 +440,169 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
 
     def visit_call(self, call: Call) -> object:
         callee_value = self.evaluate(call.callee)
+        if type(callee_value) == CoffeeBeanNative and \
+           callee_value.argument_count == len(call.arguments):
+            return callee_value.function(
+                self,
+                *[self.evaluate(argument) for argument in call.arguments]
+            )
         
         argument_values = []
         for argument in call.arguments:
             argument_values.append(self.evaluate(argument))
 
-        if not isinstance(callee_value, CoffeeBeanCallable):
+        return self._call(callee_value, argument_values)
+
+    def _call(self, callee: object, arguments: List[object]) -> object:
+        """Calls a callable value.
+
+        Args:
+            callee: The value being called.
+            arguments: Argument values.
+
+        Returns:
+            The function's return value.
+        """
+        if not isinstance(callee, CoffeeBeanCallable):
             self._error('Can only call functions.')
 
-        function = callee_value
-        if len(call.arguments) != function.argument_count:
+        function = callee
+        if len(arguments) != function.argument_count:
             self._error(
                 f'Expected {function.argument_count} ' \
-                f'arguments but got {len(call.arguments)}.'
+                f'arguments but got {len(arguments)}.'
             )
 
-        return function.call(self, argument_values)
+        return function.call(self, arguments)
 
     def visit_index(self, index: Index) -> object:
         array = self.environment.get(index.name)
-        if type(array) != list:
-            self._error('Can only index arrays.')
+        if index.is_slice:
+            start = None if index.index is None else self.evaluate(index.index)
+            end = None if index.end is None else self.evaluate(index.end)
+            return self._slice(array, start, end)
+        elif index.in_bounds:
+            return array.values[self.evaluate(index.index)]
+        elif type(array) not in INDEXABLE_TYPES:
+            self._error('Can only index arrays, maps and strings.')
 
-        index_value = self.evaluate(index.index)
-        if type(index_value) != int:
-            self._error('Can only index with type int.')
-        elif index_value >= len(array):
-            self._error('Index out of range.')
-
-        return array[index_value]
+        return self._index(array, self.evaluate(index.index))
 
     def visit_array_assignment(self,
                                array_assignment: ArrayAssignment) -> object:
         value = self.evaluate(array_assignment.value)
         array = self.environment.get(array_assignment.index.name)
         index = self.evaluate(array_assignment.index.index)
-        array[index] = value
+        if type(array) == CoffeeBeanMap:
+            array.values[self._check_key(index)] = value
+            if self.budget:
+                self.budget.check_size(self, len(array.values), 'entries')
+            return
+        elif not array_assignment.index.in_bounds:
+            if type(array) != CoffeeBeanArray:
+                self._error('Can only index arrays and maps.')
+            self._check_index(array, index)
+
+        array.set(index, value)
+
+    def _index(self, value: object, index: object) -> object:
+        """Gets an array element, a map value or a character of a string.
+
+        Args:
+            value: An array, map or string.
+            index: The index or key.
+
+        Returns:
+            The element, value or character.
+        """
+        if type(value) == CoffeeBeanArray:
+            self._check_index(value, index)
+            return value.values[index]
+        elif type(value) == CoffeeBeanMap:
+            return self._get_key(value, index)
+
+        if type(index) != int:
+            self._error('Can only index with type int.')
+        elif not 0 <= index < len(value):
+            self._error('Index out of range.')
+
+        return character(value, index)
+
+    def _slice(self,
+               array: object,
+               start: Optional[object],
+               end: Optional[object]) -> object:
+        """Gets a view of a range of an array's elements or a string.
+
+        Args:
+            array: An array or string.
+            start: The index of the first element, or None for the first.
+            end: The index after the last element, or None for the length.
+
+        Returns:
+            An array sharing the elements, or the substring.
+        """
+        if type(array) in STRING_TYPES:
+            length = len(array)
+        elif type(array) == CoffeeBeanArray:
+            length = len(array.values)
+        else:
+            self._error('Can only slice arrays and strings.')
+
+        start = 0 if start is None else start
+        end = length if end is None else end
+        if type(start) != int or type(end) != int:
+            self._error('Can only index with type int.')
+        elif not 0 <= start <= end <= length:
+            self._error('Index out of range.')
+
+        if type(array) != CoffeeBeanArray:
+            return substring(array, start, end)
+
+        return array.slice(start, end)
+
+    def _check_index(self, array: CoffeeBeanArray, index: object) -> None:
+        """Checks that an array index is an int in range.
+
+        Args:
+            array: An array.
+            index: The index.
+        """
+        if type(index) != int:
+            self._error('Can only index with type int.')
+        elif not 0 <= index < len(array.values):
+            self._error('Index out of range.')
+
+    def _check_key(self, key: object) -> object:
+        """Checks that a value can be a map key.
+
+        Args:
+            key: A value.
+
+        Returns:
+            The key, with ropes joined into strings.
+        """
+        if type(key) == Rope or type(key) == StringView:
+            return str(key)
+        elif type(key) not in KEY_TYPES:
+            self._error('Map keys must be null, booleans, numbers or strings.')
+
+        return key
+
+    def _get_key(self, _map: CoffeeBeanMap, key: object) -> object:
+        """Gets the value of a map key.
+
+        Args:
+            _map: A map.
+            key: The key.
+
+        Returns:
+            The key's value.
+        """
+        try:
+            return _map.values[self._check_key(key)]
+        except KeyError:
+            self._error('Key not found.')
 
     def evaluate(self, expression: Expression) -> object:
         """Evaluates an expression.
@@ -284,11 +620,36 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
 
     def visit_echo(self, echo: Echo) -> None:
         value = self.evaluate(echo.expression)
-        if type(value) == list:
-            print('{' + ', '.join(self._to_string(item) for item in value) + '}')
-            return
+        self._echo(value)
+
+    def _echo(self, value: object) -> None:
+        """Prints a value.
+
+        Args:
+            value: An expression value.
+        """
+        self.output.write_line(self._format(value))
+
+    def _format(self, value: object) -> str:
+        """Formats a value the way it is echoed.
+
+        Args:
+            value: An expression value.
+
+        Returns:
+            The formatted value.
+        """
+        if type(value) == CoffeeBeanArray:
+            return '{' + ', '.join(map(self._to_string, value.values)) + '}'
+        elif type(value) == CoffeeBeanMap:
+            if not value.values:
+                return '{:}'
+
+            return '{' + ', '.join(f'{self._to_string(key)}: ' \
+                                   f'{self._to_string(item)}'
+                                   for key, item in value.values.items()) + '}'
         
-        print(self._to_string(value))
+        return self._to_string(value)
 
     def visit_if(self, _if: If) -> None:
         if self._to_boolean(self.evaluate(_if.condition)):
@@ -296,20 +657,120 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
         elif _if._else:
             _if._else.accept(self)
             
+    def _compile_loop(self, loop: Union[While, For]) -> Optional[Callable]:
+        """Transpiles a hot loop to Python.
+
+        Args:
+            loop: A while or for statement.
+
+        Returns:
+            The transpiled loop, or None if it is unsupported.
+        """
+        keyword = 'for' if type(loop) == For else 'while'
+        description = f'{keyword} loop at line {loop.keyword.line}'
+        try:
+            code = LoopTranspiler(loop,
+                                  self.environment,
+                                  self.limits is not None).compile()
+        except TranspilerError as error:
+            self._debug(f'Cannot tier up {description}: {error}')
+            code = None
+        else:
+            self._debug(f'Tier up: {description} ' \
+                        f'after {self.back_edges[loop]} iterations.')
+
+        self.loops[loop] = code
+        return code
+
     def visit_while(self, _while: While) -> None:
-        while self.evaluate(_while.condition):
-            _while.body.accept(self)
+        code = self.loops.get(_while)
+        if code and code(self, self.environment) is not FALLBACK:
+            return
+
+        budget = self.budget
+        back_edges = self.back_edges.get(_while, 0)
+        try:
+            while self.evaluate(_while.condition):
+                if budget:
+                    budget.step(self, _while.keyword.line)
+                _while.body.accept(self)
+
+                back_edges += 1
+                if back_edges == self.loop_threshold:
+                    self.back_edges[_while] = back_edges
+                    code = self._compile_loop(_while)
+                    if code and code(self, self.environment) is not FALLBACK:
+                        return
+        finally:
+            self.back_edges[_while] = back_edges
+
+    def _iterate(self, value: object) -> Iterator[object]:
+        """Gets the values a for loop binds.
+
+        Args:
+            value: An array, map, string, range or sequence.
+
+        Returns:
+            The elements of an array, the keys of a map, the characters of a
+            string, the numbers in a range or the values of a sequence,
+            produced one at a time.
+        """
+        if type(value) == CoffeeBeanArray:
+            return value.items()
+        elif type(value) == range:
+            return iter(value)
+        elif type(value) in STRING_TYPES:
+            return iter(str(value))
+        elif type(value) == CoffeeBeanMap:
+            # Copy the keys, since the loop may add or remove some.
+            return iter(list(value.values))
+        elif type(value) == CoffeeBeanSequence:
+            return iter(value)
+
+        self._error(
+            'Can only loop over arrays, maps, strings, ranges and sequences.'
+        )
+
+    def visit_for(self, _for: For) -> None:
+        iterator = self._iterate(self.evaluate(_for.iterable))
+        code = self.loops.get(_for)
+        if code and code(self, self.environment, iterator) is not FALLBACK:
+            return
+
+        # The loop variable is stored straight into the environment that owns
+        # it, instead of being resolved again on every iteration.
+        values = self.environment.values_for(_for.name)
+        name = _for.name.symbol
+        budget = self.budget
+        back_edges = self.back_edges.get(_for, 0)
+        try:
+            for item in iterator:
+                if budget:
+                    budget.step(self, _for.keyword.line)
+                values[name] = item
+                _for.body.accept(self)
+
+                back_edges += 1
+                if back_edges == self.loop_threshold:
+                    self.back_edges[_for] = back_edges
+                    code = self._compile_loop(_for)
+                    if code and \
+                       code(self, self.environment, iterator) is not FALLBACK:
+                        return
+        finally:
+            self.back_edges[_for] = back_edges
 
     def _execute_block(self,
                        statements: List[Statement],
                        environment: Environment) -> None:
         enclosing = self.environment
         
-        for statement in statements:
+        try:
             self.environment = environment
-            statement.accept(self)
-
-        self.environment = enclosing
+            for statement in statements:
+                statement.accept(self)
+        finally:
+            self.environment = enclosing
 
     def visit_block(self, block: Block) -> None:
         self._execute_block(block.statements, Environment(self.environment))
@@ -323,6 +784,18 @@ class Interpreter(ExpressionVisitor, StatementVisitor):
 
         raise ReturnError(value)
 
+    def visit_import(self, _import: Import) -> None:
+        # The module is parsed now, but only runs once a name from it is used.
+        self.line = _import.keyword.line
+        self.environment.add_import(self.loader.module(_import.path))
+
     def interpret(self, statements: List[Statement]) -> None:
-        for statement in statements:
-            statement.accept(self)
+        # Spawned tasks finish before the program does. Echoed lines are
+        # written out even if the program fails, before the error is reported.
+        try:
+            for statement in statements:
+                statement.accept(self)
+            self._finish_tasks()
+        finally:
+            self._stop_tasks()
+            self.output.flush()
@@ -1,9 +1,10 @@
 from __future__ import annotations
-from typing import List
+from typing import Callable, List, Union
 from src.interpreter import *
 from src.statement import *
 from src.environment import *
-import time
+from src.transpiler import *
+from src.coffee_bean_sequence import *
 
 class CoffeeBeanCallable:
     """Defines a Coffee Bean callable object (a function).
@@ -16,40 +17,171 @@ class CoffeeBeanCallable:
              arguments: List[object]) -> object:
         pass
 
-class CoffeeBeanClock(CoffeeBeanCallable):
-    """Defines a callable object for the built-in clock function.
+class CoffeeBeanNative(CoffeeBeanCallable):
+    """Defines a callable object for a built-in function written in Python.
+
+    Calls with the right number of arguments pass them straight to the Python
+    function, without building an environment or an argument list.
+
+    Attributes:
+        name: The function's name in the globals.
+        function: The Python function, which takes the interpreter and then the
+            arguments.
     """
-    def __init__(self) -> None:
-        super().__init__(0)
+    def __init__(self,
+                 name: str,
+                 argument_count: int,
+                 function: Callable) -> None:
+        super().__init__(argument_count)
+        self.name = name
+        self.function = function
 
     def __str__(self) -> str:
-        return f'<built-in function clock>'
-        
+        return f'<built-in function {self.name}>'
+
     def call(self,
              interpreter: Interpreter,
-             arguments: List[object]) -> float:
-        return time.time()
+             arguments: List[object]) -> object:
+        return self.function(interpreter, *arguments)
+
+# Built-in functions by name.
+NATIVE_FUNCTIONS = {}
+
+# The environment of built-in functions, which encloses the globals of every
+# interpreter and module. It is read-only, so a variable with the name of a
+# built-in function is created in the globals or the function that assigns it.
+BUILTINS = Environment()
+BUILTINS.values = NATIVE_FUNCTIONS
+BUILTINS.read_only = True
+
+def native(name: str, argument_count: int) -> Callable:
+    """Registers a Python function as a built-in function.
+
+    Args:
+        name: The function's name in the built-in functions.
+        argument_count: The number of arguments it takes.
+
+    Returns:
+        A decorator that registers the function and returns it unchanged.
+    """
+    def register(function: Callable) -> Callable:
+        NATIVE_FUNCTIONS[name] = CoffeeBeanNative(name,
+                                                  argument_count,
+                                                  function)
+        return function
+
+    return register
+
+class CoffeeBeanCompiledFunction(CoffeeBeanCallable):
+    """Defines a callable object for a user-defined function transpiled to
+    Python.
+
+    Attributes:
+        function: The user-defined function.
+        code: The Python function.
+    """
+    def __init__(self, function: CoffeeBeanFunction, code: Callable) -> None:
+        super().__init__(function.argument_count)
+        self.function = function
+        self.code = code
+
+    def __str__(self) -> str:
+        return f'{self.function}'
+
+    def call(self,
+             interpreter: Interpreter,
+             arguments: List[object]) -> object:
+        return self.code(interpreter, *arguments)
 
 class CoffeeBeanFunction(CoffeeBeanCallable):
     """Defines a callable object for user-defined functions.
     
     Attributes:
         declaration: The user-defined function declaration.
+        closure: The environment the function was declared in.
+        call_count: The number of times the function was called.
+        compiled: The function transpiled to Python, if it is hot.
     """
     def __init__(self, declaration: Function, closure: Environment) -> None:
         super().__init__(len(declaration.parameters))
         self.declaration = declaration
         self.closure = closure
+        self.call_count = 0
+        self.compiled = None
 
     def __str__(self) -> str:
         return f'<function {self.declaration.name}>'
 
+    def _compile(self, interpreter: Interpreter) -> None:
+        """Transpiles the function to Python. Functions using unsupported
+        constructs keep running in the tree-walk interpreter.
+
+        Args:
+            interpreter: The interpreter calling the function.
+        """
+        try:
+            code = Transpiler(self.declaration,
+                              self.closure,
+                              interpreter.limits is not None).compile()
+        except TranspilerError as error:
+            interpreter._debug(f'Cannot tier up {self}: {error}')
+            return
+
+        interpreter._debug(f'Tier up: {self} after {self.call_count} calls.')
+        self.compiled = CoffeeBeanCompiledFunction(self, code)
+
     def call(self,
              interpreter: Interpreter,
              arguments: List[object]) -> object:
+        # Under limits, each call is a step and is one level deeper. If
+        # Python's stack runs out first, the outermost call reports it, since
+        # it has room to spare.
+        budget = interpreter.budget
+        if budget:
+            budget.enter(interpreter)
+            try:
+                return self._call(interpreter, arguments)
+            except RecursionError:
+                if interpreter.depth > 1:
+                    raise
+                interpreter._error('Exceeded the maximum call depth.')
+            finally:
+                interpreter.depth -= 1
+
+        return self._call(interpreter, arguments)
+
+    def _call(self,
+              interpreter: Interpreter,
+              arguments: List[object]) -> object:
+        """Runs the function, transpiled if it is hot.
+
+        Args:
+            interpreter: The interpreter calling the function.
+            arguments: Argument values.
+
+        Returns:
+            The function's return value.
+        """
+        self.call_count += 1
+        if self.call_count == interpreter.call_threshold:
+            self._compile(interpreter)
+
+        is_generator = self.declaration.is_generator
+        if self.compiled:
+            value = self.compiled.call(interpreter, arguments)
+            if value is not FALLBACK:
+                return CoffeeBeanSequence(value) if is_generator else value
+
+        # A generator function's body runs as its values are needed.
+        if is_generator:
+            return CoffeeBeanSequence(
+                interpreter.generators.start(self, arguments)
+            )
+
+        # Parameters are always local, even if the closure has the name.
         environment = Environment(self.closure)
         for parameter, argument in zip(self.declaration.parameters, arguments):
-            environment.add(parameter, argument)
+            environment.values[parameter.symbol] = argument
 
         try:
             interpreter._execute_block(self.declaration.body, environment)
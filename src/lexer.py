@@ -45,8 +45,10 @@ KEYWORD_TYPES = {
     'else': TokenType.ELSE,
     'while': TokenType.WHILE,
     'for': TokenType.FOR,
+    'in': TokenType.IN,
     'function': TokenType.FUNCTION,
     'return': TokenType.RETURN,
+    'yield': TokenType.YIELD,
     'do': TokenType.DO,
     'end': TokenType.END,
     'echo': TokenType.ECHO,
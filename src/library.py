@@ -0,0 +1,675 @@
+from __future__ import annotations
+import bisect
+import functools
+import itertools
+import math
+import os
+import time
+from typing import Callable, Iterator, List, TextIO, Union
+from src.language_object import *
+from src.coffee_bean_array import *
+from src.coffee_bean_map import *
+from src.coffee_bean_sequence import *
+from src.coffee_bean_file import *
+from src.coffee_bean_task import *
+from src.coffee_bean_channel import *
+from src.parallel import *
+from src.vector import *
+from src.rope import *
+from src.module import EXTENSION, CACHE_DIRECTORY
+
+# The built-in functions. Each is registered in `NATIVE_FUNCTIONS` by the
+# `native` decorator and called with the interpreter, to report errors from,
+# followed by its arguments.
+
+def _check_strings(interpreter: Interpreter, values: List[object]) -> None:
+    """Checks that arguments are strings.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        values: Argument values.
+    """
+    for value in values:
+        if type(value) not in STRING_TYPES:
+            interpreter._error('Expected type string')
+
+def _check_array(interpreter: Interpreter, value: object) -> CoffeeBeanArray:
+    """Checks that an argument is an array.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        value: An argument value.
+
+    Returns:
+        The array.
+    """
+    if type(value) != CoffeeBeanArray:
+        interpreter._error('Expected type array')
+
+    return value
+
+def _check_function(interpreter: Interpreter,
+                    value: object,
+                    argument_count: int) -> CoffeeBeanCallable:
+    """Checks that an argument is a function taking some number of arguments.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        value: An argument value.
+        argument_count: The number of arguments the function must take.
+
+    Returns:
+        The function.
+    """
+    if not isinstance(value, CoffeeBeanCallable) or \
+       value.argument_count != argument_count:
+        plural = '' if argument_count == 1 else 's'
+        interpreter._error(
+            f'Expected a function taking {argument_count} argument{plural}.'
+        )
+
+    return value
+
+@native('clock', 0)
+def _clock(interpreter: Interpreter) -> float:
+    return time.time()
+
+@native('flush', 0)
+def _flush(interpreter: Interpreter) -> None:
+    interpreter.output.flush()
+
+@native('len', 1)
+def _length(interpreter: Interpreter, value: object) -> int:
+    if type(value) in STRING_TYPES:
+        return len(value)
+    elif type(value) not in [CoffeeBeanArray, CoffeeBeanMap]:
+        interpreter._error(
+            'Can only get the length of arrays, maps and strings.'
+        )
+
+    return len(value.values)
+
+# Math.
+
+@native('sqrt', 1)
+def _sqrt(interpreter: Interpreter, value: object) -> float:
+    value = interpreter._to_number(value)
+    if value < 0:
+        interpreter._error('Cannot get the square root of a negative number.')
+
+    return math.sqrt(value)
+
+@native('floor', 1)
+def _floor(interpreter: Interpreter, value: object) -> int:
+    value = interpreter._to_number(value)
+    if type(value) == float and not math.isfinite(value):
+        interpreter._error('Cannot convert infinity or NaN to int.')
+
+    return math.floor(value)
+
+@native('abs', 1)
+def _absolute(interpreter: Interpreter, value: object) -> Number:
+    return abs(interpreter._to_number(value))
+
+# Conversions.
+
+@native('str', 1)
+def _to_string(interpreter: Interpreter, value: object) -> str:
+    string = interpreter._format(value)
+    interpreter._check_size(len(string), 'characters')
+    return string
+
+@native('int', 1)
+def _to_int(interpreter: Interpreter, value: object) -> int:
+    if type(value) == int:
+        return value
+    elif type(value) == float:
+        if not math.isfinite(value):
+            interpreter._error('Cannot convert infinity or NaN to int.')
+        return int(value)
+    elif type(value) in STRING_TYPES:
+        try:
+            return int(str(value))
+        except ValueError:
+            interpreter._error(f'Cannot convert "{value}" to int.')
+
+    interpreter._error('Can only convert numbers and strings to int.')
+
+@native('float', 1)
+def _to_float(interpreter: Interpreter, value: object) -> float:
+    if type(value) in [int, float]:
+        return float(value)
+    elif type(value) in STRING_TYPES:
+        try:
+            return float(str(value))
+        except ValueError:
+            interpreter._error(f'Cannot convert "{value}" to float.')
+
+    interpreter._error('Can only convert numbers and strings to float.')
+
+# Arrays.
+
+@native('range', 2)
+def _range(interpreter: Interpreter, start: object, end: object) -> range:
+    if type(start) != int or type(end) != int:
+        interpreter._error('Expected type int')
+
+    return range(start, end)
+
+@native('push', 2)
+def _push(interpreter: Interpreter, array: object, value: object) -> None:
+    array = _check_array(interpreter, array)
+    array.append(value)
+    interpreter._check_size(len(array))
+
+@native('pop', 1)
+def _pop(interpreter: Interpreter, array: object) -> object:
+    array = _check_array(interpreter, array)
+    if not array.values:
+        interpreter._error('Cannot pop from an empty array.')
+
+    return array.pop()
+
+def _check_sortable(interpreter: Interpreter, values: List[object]) -> None:
+    """Checks that values can be ordered.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        values: Elements or sort keys.
+    """
+    if all(type(value) in [int, float] for value in values) or \
+       all(type(value) in STRING_TYPES for value in values):
+        return
+
+    interpreter._error('Can only sort numbers or strings.')
+
+@native('sort', 1)
+def _sort(interpreter: Interpreter, array: object) -> None:
+    array = _check_array(interpreter, array)
+    if type_code(array.values) is None:
+        _check_sortable(interpreter, array.values)
+
+    array.replace(sorted(array.values))
+
+@native('sort_by', 2)
+def _sort_by(interpreter: Interpreter,
+             array: object,
+             function: object) -> None:
+    array = _check_array(interpreter, array)
+    if not isinstance(function, CoffeeBeanCallable) or \
+       function.argument_count not in [1, 2]:
+        interpreter._error('Expected a key function or a comparator.')
+
+    values = list(array.values)
+    if function.argument_count == 1:
+        keys = [interpreter._call(function, [value]) for value in values]
+        _check_sortable(interpreter, keys)
+
+        # Sorting indices keeps equal keys in order without comparing values.
+        order = sorted(range(len(values)), key=keys.__getitem__)
+        array.replace([values[index] for index in order])
+        return
+
+    def compare(left: object, right: object) -> Union[int, float]:
+        result = interpreter._call(function, [left, right])
+        if type(result) not in [int, float]:
+            interpreter._error('A comparator must return a number.')
+        return result
+
+    array.replace(sorted(values, key=functools.cmp_to_key(compare)))
+
+@native('bsearch', 2)
+def _binary_search(interpreter: Interpreter,
+                   array: object,
+                   value: object) -> int:
+    values = _check_array(interpreter, array).values
+    _check_sortable(interpreter, [value])
+    try:
+        index = bisect.bisect_left(values, value)
+    except TypeError:
+        interpreter._error('Can only search arrays of numbers or strings.')
+
+    return index if index < len(values) and values[index] == value else -1
+
+@native('reverse', 1)
+def _reverse(interpreter: Interpreter, array: object) -> None:
+    _check_array(interpreter, array).reverse()
+
+@native('snapshot', 1)
+def _snapshot(interpreter: Interpreter, array: object) -> CoffeeBeanArray:
+    if type(array) != CoffeeBeanArray:
+        interpreter._error('Can only snapshot arrays.')
+
+    return array.snapshot()
+
+def _reduction(name: str) -> Callable:
+    """Creates a built-in function reducing arrays of numbers.
+
+    Args:
+        name: `sum`, `min`, `max` or `mean`.
+
+    Returns:
+        The function.
+    """
+    def reduce(interpreter: Interpreter, value: object) -> Number:
+        return vector_reduce(interpreter, name, value)
+
+    return reduce
+
+for _name in REDUCTIONS:
+    native(_name, 1)(_reduction(_name))
+
+# Maps.
+
+@native('has', 2)
+def _has(interpreter: Interpreter, _map: object, key: object) -> bool:
+    if type(_map) != CoffeeBeanMap:
+        interpreter._error('Can only check keys of maps.')
+
+    return interpreter._check_key(key) in _map.values
+
+@native('keys', 1)
+def _keys(interpreter: Interpreter, _map: object) -> CoffeeBeanArray:
+    if type(_map) != CoffeeBeanMap:
+        interpreter._error('Can only get the keys of maps.')
+
+    return CoffeeBeanArray(list(_map.values))
+
+@native('values', 1)
+def _values(interpreter: Interpreter, _map: object) -> CoffeeBeanArray:
+    if type(_map) != CoffeeBeanMap:
+        interpreter._error('Can only get the values of maps.')
+
+    return CoffeeBeanArray(list(_map.values.values()))
+
+@native('remove', 2)
+def _remove(interpreter: Interpreter, _map: object, key: object) -> object:
+    if type(_map) != CoffeeBeanMap:
+        interpreter._error('Can only remove keys from maps.')
+
+    key = interpreter._check_key(key)
+    value = interpreter._get_key(_map, key)
+    del _map.values[key]
+    return value
+
+# Sequences. These take anything a for loop can loop over, and `map`,
+# `filter` and `take` only compute each value when it is needed.
+
+@native('map', 2)
+def _map(interpreter: Interpreter,
+         values: object,
+         function: object) -> CoffeeBeanSequence:
+    iterator = interpreter._iterate(values)
+    function = _check_function(interpreter, function, 1)
+
+    def mapped() -> Iterator[object]:
+        for value in iterator:
+            yield interpreter._call(function, [value])
+
+    return CoffeeBeanSequence(mapped())
+
+@native('filter', 2)
+def _filter(interpreter: Interpreter,
+            values: object,
+            function: object) -> CoffeeBeanSequence:
+    iterator = interpreter._iterate(values)
+    function = _check_function(interpreter, function, 1)
+
+    def filtered() -> Iterator[object]:
+        for value in iterator:
+            if interpreter._to_boolean(interpreter._call(function, [value])):
+                yield value
+
+    return CoffeeBeanSequence(filtered())
+
+@native('take', 2)
+def _take(interpreter: Interpreter,
+          values: object,
+          count: object) -> CoffeeBeanSequence:
+    iterator = interpreter._iterate(values)
+    if type(count) != int or count < 0:
+        interpreter._error('Expected a non-negative int.')
+
+    return CoffeeBeanSequence(itertools.islice(iterator, count))
+
+@native('reduce', 3)
+def _reduce(interpreter: Interpreter,
+            values: object,
+            function: object,
+            initial: object) -> object:
+    iterator = interpreter._iterate(values)
+    function = _check_function(interpreter, function, 2)
+
+    result = initial
+    for value in iterator:
+        result = interpreter._call(function, [result, value])
+
+    return result
+
+@native('collect', 1)
+def _collect(interpreter: Interpreter, values: object) -> CoffeeBeanArray:
+    items = interpreter._iterate(values)
+    if interpreter.budget:
+        items = interpreter.budget.bound(items)
+    array = CoffeeBeanArray(list(items))
+    interpreter._check_size(len(array))
+    return array
+
+@native('pmap', 2)
+def _pmap(interpreter: Interpreter,
+          values: object,
+          function: object) -> CoffeeBeanArray:
+    function = _check_function(interpreter, function, 1)
+    return parallel_map(interpreter, function, values)
+
+@native('preduce', 3)
+def _preduce(interpreter: Interpreter,
+             values: object,
+             function: object,
+             initial: object) -> object:
+    function = _check_function(interpreter, function, 2)
+    return parallel_reduce(interpreter, function, values, initial)
+
+# Files. Reads and writes go through a large buffer, and `lines` reads one
+# line at a time, so files don't need to fit in memory.
+
+def _check_file(interpreter: Interpreter,
+                value: object,
+                reading: bool) -> CoffeeBeanFile:
+    """Checks that an argument is a file open for reading or writing.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        value: An argument value.
+        reading: If the file must be open for reading instead of writing.
+
+    Returns:
+        The file.
+    """
+    if type(value) != CoffeeBeanFile:
+        interpreter._error('Expected type file')
+    elif value.file.closed:
+        interpreter._error('File is closed.')
+    elif reading != (value.mode == 'r'):
+        action = 'reading' if reading else 'writing'
+        interpreter._error(f'File is not open for {action}.')
+
+    return value
+
+def _file_path(interpreter: Interpreter, path: str, mode: str) -> str:
+    """Finds the file a program asks for, if it is allowed to open it.
+
+    Programs can only open files under the interpreter's file root, and
+    never with limits, since those run code that isn't trusted. Module
+    caches can't be opened, and module sources can't be written.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        path: A file path, relative to the file root.
+        mode: `r`, `w` or `a`.
+
+    Returns:
+        The real path of the file.
+    """
+    root = interpreter.file_root
+    if root is None or interpreter.limits:
+        interpreter._error('File access is disabled.')
+
+    root = os.path.realpath(root)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if os.path.commonpath([root, full_path]) != root:
+        interpreter._error(f'Cannot open file "{path}" outside of {root}.')
+
+    parts = os.path.relpath(full_path, root).split(os.sep)
+    if CACHE_DIRECTORY in parts or \
+       (mode != 'r' and full_path.endswith(EXTENSION)):
+        interpreter._error(f'Cannot open file "{path}".')
+
+    return full_path
+
+def _blocking(interpreter: Interpreter,
+              function: Callable,
+              *arguments: object) -> object:
+    """Calls a Python function that may wait for a file, letting other tasks
+    run meanwhile.
+
+    Args:
+        interpreter: The interpreter making the call.
+        function: The function, which must not use the interpreter.
+        arguments: The arguments to call it with.
+
+    Returns:
+        What the function returns.
+    """
+    if interpreter.scheduler is None:
+        return function(*arguments)
+
+    return interpreter.scheduler.call_blocking(function, *arguments)
+
+def _open_file(interpreter: Interpreter, path: str, mode: str) -> TextIO:
+    """Opens a Python file. Opening a pipe waits for the other end, so other
+    tasks run meanwhile.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        path: A file path.
+        mode: `r`, `w` or `a`.
+
+    Returns:
+        The Python file object.
+    """
+    full_path = _file_path(interpreter, path, mode)
+    try:
+        return _blocking(interpreter,
+                         open,
+                         full_path,
+                         mode,
+                         FILE_BUFFER_SIZE,
+                         'utf-8')
+    except (OSError, ValueError):
+        interpreter._error(f'Cannot open file "{path}".')
+
+@native('open', 2)
+def _open(interpreter: Interpreter,
+          path: object,
+          mode: object) -> CoffeeBeanFile:
+    _check_strings(interpreter, [path, mode])
+    path = str(path)
+    mode = str(mode)
+    if mode not in FILE_MODES:
+        interpreter._error('File mode must be "r", "w" or "a".')
+
+    return CoffeeBeanFile(path, mode, _open_file(interpreter, path, mode))
+
+@native('lines', 1)
+def _lines(interpreter: Interpreter, source: object) -> CoffeeBeanSequence:
+    # A path is opened here and closed once every line has been read.
+    if type(source) in STRING_TYPES:
+        file = CoffeeBeanFile(str(source),
+                              'r',
+                              _open_file(interpreter, str(source), 'r'))
+    else:
+        file = _check_file(interpreter, source, True)
+
+    def read_line() -> str:
+        with file.lock:
+            return next(file.file, '')
+
+    # Once tasks are spawned, each line is read while other tasks run.
+    def read_lines() -> Iterator[str]:
+        try:
+            while True:
+                if interpreter.scheduler is None:
+                    line = next(file.file, '')
+                else:
+                    line = _blocking(interpreter, read_line)
+                if not line:
+                    break
+                yield line[:-1] if line.endswith('\n') else line
+        except ValueError:
+            interpreter._error('File is closed.')
+        if type(source) in STRING_TYPES:
+            file.file.close()
+
+    return CoffeeBeanSequence(read_lines())
+
+@native('read', 2)
+def _read(interpreter: Interpreter, file: object, count: object) -> str:
+    file = _check_file(interpreter, file, True)
+    if type(count) != int or count <= 0:
+        interpreter._error('Expected a positive int.')
+
+    interpreter._check_size(count, 'characters')
+
+    def read() -> str:
+        with file.lock:
+            return file.file.read(count)
+
+    try:
+        return _blocking(interpreter, read)
+    except ValueError:
+        interpreter._error('File is closed.')
+
+@native('write', 2)
+def _write(interpreter: Interpreter, file: object, value: object) -> None:
+    _check_file(interpreter, file, False).file.write(interpreter._format(value))
+
+@native('write_line', 2)
+def _write_line(interpreter: Interpreter, file: object, value: object) -> None:
+    file = _check_file(interpreter, file, False)
+    file.file.write(interpreter._format(value) + '\n')
+
+@native('close', 1)
+def _close(interpreter: Interpreter, value: object) -> None:
+    if type(value) == CoffeeBeanChannel:
+        interpreter._scheduler().close(value)
+        return
+    elif type(value) != CoffeeBeanFile:
+        interpreter._error('Expected type file')
+
+    with value.lock:
+        value.file.close()
+
+# Tasks. A task calls a function with its own call stack, and tasks take turns
+# running whenever one of them sleeps or waits.
+
+def _check_channel(interpreter: Interpreter,
+                   value: object) -> CoffeeBeanChannel:
+    """Checks that an argument is a channel.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        value: An argument value.
+
+    Returns:
+        The channel.
+    """
+    if type(value) != CoffeeBeanChannel:
+        interpreter._error('Expected type channel')
+
+    return value
+
+@native('spawn', 2)
+def _spawn(interpreter: Interpreter,
+           function: object,
+           arguments: object) -> CoffeeBeanTask:
+    arguments = list(_check_array(interpreter, arguments).items())
+    function = _check_function(interpreter, function, len(arguments))
+    return interpreter._scheduler().spawn(interpreter, function, arguments)
+
+@native('wait', 1)
+def _wait(interpreter: Interpreter, task: object) -> object:
+    if type(task) != CoffeeBeanTask:
+        interpreter._error('Expected type task')
+
+    return interpreter._scheduler().wait(interpreter, task)
+
+@native('sleep', 1)
+def _sleep(interpreter: Interpreter, seconds: object) -> None:
+    if type(seconds) not in [int, float] or seconds < 0:
+        interpreter._error('Expected a non-negative number.')
+
+    # A sleep that would end after the time limit fails right away.
+    if interpreter.budget:
+        interpreter.budget.check_time(interpreter, seconds)
+    interpreter._scheduler().sleep(interpreter, seconds)
+
+@native('channel', 0)
+def _channel(interpreter: Interpreter) -> CoffeeBeanChannel:
+    return CoffeeBeanChannel()
+
+@native('send', 2)
+def _send(interpreter: Interpreter, channel: object, value: object) -> None:
+    channel = _check_channel(interpreter, channel)
+    interpreter._scheduler().send(interpreter, channel, value)
+
+@native('receive', 1)
+def _receive(interpreter: Interpreter, channel: object) -> object:
+    channel = _check_channel(interpreter, channel)
+    return interpreter._scheduler().receive(interpreter, channel)
+
+# Strings.
+
+@native('substr', 3)
+def _substring(interpreter: Interpreter,
+               string: object,
+               start: object,
+               end: object) -> Union[str, StringView]:
+    _check_strings(interpreter, [string])
+    return interpreter._slice(string, start, end)
+
+@native('find', 2)
+def _find(interpreter: Interpreter, string: object, target: object) -> int:
+    _check_strings(interpreter, [string, target])
+    return find(string, target)
+
+@native('split', 2)
+def _split(interpreter: Interpreter,
+           string: object,
+           separator: object) -> CoffeeBeanArray:
+    _check_strings(interpreter, [string, separator])
+    string = str(string)
+    separator = str(separator)
+    if not separator:
+        return CoffeeBeanArray(list(string))
+
+    return CoffeeBeanArray(string.split(separator))
+
+@native('join', 2)
+def _join(interpreter: Interpreter, array: object, separator: object) -> str:
+    if type(array) != CoffeeBeanArray:
+        interpreter._error('Can only join arrays of strings.')
+
+    _check_strings(interpreter, [separator])
+    parts = []
+    for value in array.values:
+        if type(value) not in STRING_TYPES:
+            interpreter._error('Can only join arrays of strings.')
+        parts.append(str(value))
+
+    separator = str(separator)
+    if interpreter.budget and parts:
+        size = sum(len(part) for part in parts) + \
+            len(separator) * (len(parts) - 1)
+        interpreter._check_size(size, 'characters')
+    return separator.join(parts)
+
+@native('upper', 1)
+def _upper(interpreter: Interpreter, string: object) -> str:
+    _check_strings(interpreter, [string])
+    return str(string).upper()
+
+@native('replace', 3)
+def _replace(interpreter: Interpreter,
+             string: object,
+             old: object,
+             new: object) -> str:
+    _check_strings(interpreter, [string, old, new])
+    string, old, new = str(string), str(old), str(new)
+    # The size is checked before the string is built, since it can grow
+    # with each replacement.
+    if interpreter.budget and len(new) > len(old):
+        count = string.count(old)
+        interpreter._check_size(len(string) + count * (len(new) - len(old)),
+                                'characters')
+    return string.replace(old, new)
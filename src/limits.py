@@ -0,0 +1,207 @@
+from __future__ import annotations
+import time
+from typing import Iterator, Optional
+
+# The number of steps between checks of the step count and the clock.
+CHECK_INTERVAL = 1024
+
+class Limits:
+    """Defines limits on what one run of a program may use, for running code
+    that isn't trusted. A limit of None means there is no limit.
+
+    Attributes:
+        steps: The number of loop iterations and function calls.
+        time: The number of seconds of wall-clock time.
+        depth: The number of function calls in progress at once.
+        size: The number of elements in an array, entries in a map or
+            characters in a string.
+    """
+    def __init__(self,
+                 steps: Optional[int] = None,
+                 time: Optional[float] = None,
+                 depth: Optional[int] = None,
+                 size: Optional[int] = None) -> None:
+        """Constructor.
+
+        Args:
+            steps: A number of loop iterations and function calls.
+            time: A number of seconds.
+            depth: A number of nested function calls.
+            size: A number of elements, entries or characters.
+        """
+        self.steps = steps
+        self.time = time
+        self.depth = depth
+        self.size = size
+
+    def __bool__(self) -> bool:
+        return any(limit is not None
+                   for limit in [self.steps, self.time, self.depth, self.size])
+
+class Budget:
+    """Defines what one run of a program has used of its limits.
+
+    Steps are counted down in `countdown`, and the step count and the clock
+    are only checked when it runs out, so a step costs one subtraction. Tasks
+    share their program's budget, and worker processes start from a copy of
+    it and charge the steps they take back to it.
+
+    Attributes:
+        limits: The limits.
+        steps: The number of steps taken before the current countdown.
+        countdown: The number of steps left before the next check, which is
+            negative once it runs out.
+        interval: The number of steps the current countdown started with.
+        deadline: The time from `time.monotonic` the run must end by, or None.
+    """
+    def __init__(self,
+                 limits: Limits,
+                 steps: int = 0,
+                 deadline: Optional[float] = None) -> None:
+        """Constructor.
+
+        Args:
+            limits: The limits.
+            steps: A number of steps already taken.
+            deadline: A time to end by, instead of the time limit from now.
+        """
+        self.limits = limits
+        self.steps = steps
+        self.deadline = deadline
+        if deadline is None and limits.time is not None:
+            self.deadline = time.monotonic() + limits.time
+        self._start_countdown()
+
+    def _start_countdown(self) -> None:
+        """Starts counting down the steps until the next check.
+        """
+        interval = CHECK_INTERVAL
+        if self.limits.steps is not None:
+            interval = max(min(interval, self.limits.steps - self.steps), 0)
+        self.interval = interval
+        self.countdown = interval
+
+    def step(self,
+             interpreter: Interpreter,
+             line: Optional[int] = None) -> None:
+        """Counts one step.
+
+        Args:
+            interpreter: The interpreter to report errors from.
+            line: The line number to report errors at, if not the current one.
+        """
+        self.countdown -= 1
+        if self.countdown < 0:
+            if line is not None:
+                interpreter.line = line
+            self.check(interpreter)
+
+    def check(self, interpreter: Interpreter) -> None:
+        """Checks the step count and the clock once the countdown runs out.
+
+        Args:
+            interpreter: The interpreter to report errors from.
+        """
+        self.steps += self.interval - self.countdown
+        limit = self.limits.steps
+        if limit is not None and self.steps > limit:
+            interpreter._error(f'Exceeded the limit of {limit} steps.')
+        self.check_time(interpreter)
+        self._start_countdown()
+
+    def used(self) -> int:
+        """Gets the number of steps taken.
+
+        Returns:
+            The number of steps.
+        """
+        return self.steps + self.interval - self.countdown
+
+    def charge(self, interpreter: Interpreter, steps: int) -> None:
+        """Adds steps taken somewhere else, like in a worker process, and
+        checks the limits.
+
+        Args:
+            interpreter: The interpreter to report errors from.
+            steps: The number of steps.
+        """
+        self.steps += steps
+        self.check(interpreter)
+
+    def time_left(self) -> Optional[float]:
+        """Gets the time left before the deadline.
+
+        Returns:
+            The number of seconds, or None without a time limit.
+        """
+        if self.deadline is None:
+            return None
+
+        return max(self.deadline - time.monotonic(), 0)
+
+    def check_time(self, interpreter: Interpreter, wait: float = 0) -> None:
+        """Checks the clock.
+
+        Args:
+            interpreter: The interpreter to report errors from.
+            wait: A number of seconds the program is about to wait for.
+        """
+        if self.deadline is not None and \
+           time.monotonic() + wait > self.deadline:
+            self.time_out(interpreter)
+
+    def time_out(self, interpreter: Interpreter) -> None:
+        """Reports that the run went past its time limit.
+
+        Args:
+            interpreter: The interpreter to report the error from.
+        """
+        interpreter._error(
+            f'Exceeded the time limit of {self.limits.time:g} seconds.'
+        )
+
+    def enter(self, interpreter: Interpreter) -> None:
+        """Counts a function call as a step and as one more call in progress.
+        The caller lowers the interpreter's depth when the call returns.
+
+        Args:
+            interpreter: The interpreter making the call.
+        """
+        self.countdown -= 1
+        if self.countdown < 0:
+            self.check(interpreter)
+        limit = self.limits.depth
+        if limit is not None and interpreter.depth >= limit:
+            interpreter._error(f'Exceeded the maximum call depth of {limit}.')
+        interpreter.depth += 1
+
+    def check_size(self,
+                   interpreter: Interpreter,
+                   size: int,
+                   unit: str = 'elements') -> None:
+        """Checks the size of a value that grew.
+
+        Args:
+            interpreter: The interpreter to report errors from.
+            size: The number of elements, entries or characters.
+            unit: What the size counts, for the error message.
+        """
+        limit = self.limits.size
+        if limit is not None and size > limit:
+            interpreter._error(f'Exceeded the size limit of {limit} {unit}.')
+
+    def bound(self, items: Iterator[object]) -> Iterator[object]:
+        """Stops values one past the size limit, so they can be checked before
+        building an array that may not fit in memory.
+
+        Args:
+            items: The values.
+
+        Returns:
+            The values, up to one more than the size limit.
+        """
+        limit = self.limits.size
+        if limit is None:
+            return items
+
+        return (item for _, item in zip(range(limit + 1), items))
@@ -0,0 +1,395 @@
+from __future__ import annotations
+import json
+import os
+import threading
+from typing import Dict, List, Optional, Set, Tuple
+from src.error import *
+from src.token import *
+from src.expression import *
+from src.statement import *
+from src.environment import *
+from src.lexer import *
+from src.parser import *
+from src.type_inferrer import *
+from src.language_object import *
+
+# The file extension of Coffee Bean source files.
+EXTENSION = '.cb'
+
+# The directory next to a module that holds its parsed statements.
+CACHE_DIRECTORY = '__cbcache__'
+
+# Changes whenever cached statements can no longer be read back the same way.
+CACHE_VERSION = 2
+
+# The environment variable listing extra directories to search for modules.
+PATH_VARIABLE = 'COFFEE_BEAN_PATH'
+
+# Parsed modules by absolute path, shared by every interpreter in the process.
+# Each has the modification time and size of the source it was parsed from.
+_parsed = {}
+
+# Held while a module is parsed, so threads parse each module only once.
+_parse_lock = threading.Lock()
+
+def _defined_names(node: object, names: Set[str]) -> None:
+    """Collects the names a module may define outside of functions. This can
+    include names that end up in a block's environment instead.
+
+    Args:
+        node: A statement, expression or list of them.
+        names: The names found so far.
+    """
+    if isinstance(node, list):
+        for item in node:
+            _defined_names(item, names)
+        return
+    elif isinstance(node, Function):
+        names.add(node.name.symbol)
+        return
+    elif isinstance(node, (Assignment, For)):
+        names.add(node.name.symbol)
+
+    if isinstance(node, (Expression, Statement)):
+        for child in vars(node).values():
+            if isinstance(child, (list, Expression, Statement)):
+                _defined_names(child, names)
+
+def _node_types() -> Dict[str, type]:
+    """Gets the classes a cache file can hold.
+
+    Returns:
+        The expression and statement classes by name.
+    """
+    return {node_type.__name__: node_type
+            for base in [Expression, Statement]
+            for node_type in base.__subclasses__()}
+
+def _encode(node: object) -> object:
+    """Converts parsed statements to plain JSON values.
+
+    Args:
+        node: A statement, expression, token, list or attribute value.
+
+    Returns:
+        The JSON value.
+    """
+    if isinstance(node, list):
+        return [_encode(item) for item in node]
+    elif isinstance(node, Token):
+        return {'token': [node.token_type.name, node.line, node.symbol]}
+    elif isinstance(node, (Expression, Statement)):
+        return {'node': type(node).__name__,
+                'fields': {name: _encode(value)
+                           for name, value in vars(node).items()}}
+
+    return node
+
+def _decode(value: object, node_types: Dict[str, type]) -> object:
+    """Rebuilds parsed statements from JSON values. Only expressions,
+    statements and tokens are created, so a cache file can't run code.
+
+    Args:
+        value: A JSON value from `_encode`.
+        node_types: The classes that can be created, by name.
+
+    Returns:
+        The statement, expression, token, list or attribute value.
+
+    Raises:
+        ValueError: The value isn't one `_encode` creates.
+    """
+    if isinstance(value, list):
+        return [_decode(item, node_types) for item in value]
+    elif not isinstance(value, dict):
+        return value
+    elif 'token' in value:
+        token_type, line, symbol = value['token']
+        return Token(TokenType[token_type], line, symbol)
+
+    node_type = node_types.get(value.get('node'))
+    if node_type is None:
+        raise ValueError(f'Unknown node {value.get("node")!r}.')
+
+    # The constructor is skipped, since the fields include annotations.
+    node = object.__new__(node_type)
+    for name, field in value['fields'].items():
+        if name.startswith('__'):
+            raise ValueError(f'Invalid field {name!r}.')
+        setattr(node, name, _decode(field, node_types))
+    return node
+
+def _cache_path(path: str) -> str:
+    """Gets the path of a module's cached statements.
+
+    Args:
+        path: The module's absolute path.
+
+    Returns:
+        The path of the cache file.
+    """
+    directory, name = os.path.split(path)
+    return os.path.join(directory, CACHE_DIRECTORY, name + 'c')
+
+def _read_cache(path: str,
+                key: Tuple[int, int]) -> Optional[Tuple[List[Statement],
+                                                        Set[str]]]:
+    """Reads a module's statements from its cache file.
+
+    Args:
+        path: The module's absolute path.
+        key: The modification time and size of the source.
+
+    Returns:
+        The statements and defined names, or None if the cache is missing,
+        out of date or invalid.
+    """
+    try:
+        with open(_cache_path(path), 'r') as file:
+            cache = json.load(file)
+        if cache['version'] != CACHE_VERSION or cache['key'] != list(key):
+            return None
+
+        statements = _decode(cache['statements'], _node_types())
+        names = set(cache['names'])
+    except (OSError, ValueError, TypeError, KeyError, AttributeError,
+            RecursionError):
+        return None
+
+    if not isinstance(statements, list) or \
+       not all(isinstance(statement, Statement) for statement in statements):
+        return None
+
+    return statements, names
+
+def _write_cache(path: str,
+                 key: Tuple[int, int],
+                 statements: List[Statement],
+                 names: Set[str]) -> None:
+    """Writes a module's statements to its cache file. Failing to write it,
+    like in a read-only directory, only makes the next run parse again.
+
+    Args:
+        path: The module's absolute path.
+        key: The modification time and size of the source.
+        statements: The parsed and annotated statements.
+        names: The names the module defines.
+    """
+    cache_path = _cache_path(path)
+    temporary = f'{cache_path}.{os.getpid()}.{threading.get_ident()}'
+    try:
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        cache = {
+            'version': CACHE_VERSION,
+            'key': list(key),
+            'statements': _encode(statements),
+            'names': sorted(names),
+        }
+        with open(temporary, 'w') as file:
+            json.dump(cache, file)
+        # Renaming means other processes never read a partly written file.
+        os.replace(temporary, cache_path)
+    except (OSError, TypeError, ValueError, RecursionError):
+        try:
+            os.remove(temporary)
+        except OSError:
+            pass
+
+def parse_module(path: str) -> Tuple[List[Statement], Set[str]]:
+    """Parses a module once per process, or reads it from its cache file.
+
+    Modules can be used by any program, so types are inferred as for an open
+    program.
+
+    Args:
+        path: The module's absolute path.
+
+    Returns:
+        The annotated statements and the names the module defines.
+    """
+    status = os.stat(path)
+    key = (status.st_mtime_ns, status.st_size)
+    parsed = _parsed.get(path)
+    if parsed and parsed[0] == key:
+        return parsed[1], parsed[2]
+
+    with _parse_lock:
+        parsed = _parsed.get(path)
+        if parsed and parsed[0] == key:
+            return parsed[1], parsed[2]
+
+        return _parse_module(path, key)
+
+def _parse_module(path: str,
+                  key: Tuple[int, int]) -> Tuple[List[Statement], Set[str]]:
+    """Parses a module, or reads it from its cache file, and remembers it.
+
+    Args:
+        path: The module's absolute path.
+        key: The modification time and size of the source.
+
+    Returns:
+        The annotated statements and the names the module defines.
+    """
+    cached = _read_cache(path, key)
+    if cached:
+        statements, names = cached
+    else:
+        with open(path, 'r') as file:
+            source = file.read()
+
+        try:
+            statements = Parser(Lexer(source).get_tokens()).get_statements()
+        except LexerError as error:
+            raise LexerError(f'Module {path}\n{error}')
+        except ParserError as error:
+            raise ParserError(f'Module {path}\n{error}')
+
+        TypeInferrer(BUILTINS, closed=False).annotate(statements)
+
+        names = set()
+        _defined_names(statements, names)
+        _write_cache(path, key, statements, names)
+
+    _parsed[path] = (key, statements, names)
+    return statements, names
+
+class Module:
+    """Defines an imported module, which runs in its own environment the first
+    time a name it defines is used.
+
+    Attributes:
+        path: The module's absolute path.
+        statements: The module's statements.
+        exports: The names the module may define.
+        loader: The loader that imported the module.
+        environment: The module's environment, or None until it is loaded.
+    """
+    def __init__(self,
+                 path: str,
+                 statements: List[Statement],
+                 exports: Set[str],
+                 loader: ModuleLoader) -> None:
+        """Constructor.
+
+        Args:
+            path: The module's absolute path.
+            statements: The module's statements.
+            exports: The names the module may define.
+            loader: The loader that imported the module.
+        """
+        self.path = path
+        self.statements = statements
+        self.exports = exports
+        self.loader = loader
+        self.environment = None
+
+    def __str__(self) -> str:
+        return f'<module {self.path}>'
+
+    def load(self) -> Environment:
+        """Runs the module if it hasn't run yet.
+
+        Returns:
+            The module's environment.
+        """
+        if self.environment is None:
+            interpreter = self.loader.interpreter
+            interpreter._debug(f'Load: {self}')
+
+            self.environment = Environment(BUILTINS)
+
+            # Imports in the module are relative to its own directory.
+            line = interpreter.line
+            directory = self.loader.directory
+            self.loader.directory = os.path.dirname(self.path)
+            try:
+                interpreter._execute_block(self.statements, self.environment)
+            finally:
+                self.loader.directory = directory
+                interpreter.line = line
+
+        return self.environment
+
+    def get(self, name: Token) -> object:
+        """Gets the value of a variable the module defines.
+
+        Args:
+            name: An identifier token with a variable name.
+
+        Returns:
+            The variable's value.
+        """
+        return self.load().get(name)
+
+class ModuleLoader:
+    """Defines a loader for the modules one interpreter imports.
+
+    Attributes:
+        interpreter: The interpreter running the program.
+        directory: The directory of the module running now, searched first,
+            or None for the working directory.
+        search_path: Directories to search after that one.
+        modules: Imported modules by absolute path.
+    """
+    def __init__(self,
+                 interpreter: Interpreter,
+                 search_path: Optional[List[str]] = None) -> None:
+        """Constructor.
+
+        Args:
+            interpreter: The interpreter running the program.
+            search_path: Directories to search for modules. Defaults to the
+                directories in the `COFFEE_BEAN_PATH` environment variable.
+        """
+        if search_path is None:
+            variable = os.environ.get(PATH_VARIABLE, '')
+            search_path = [path for path in variable.split(os.pathsep) if path]
+
+        self.interpreter = interpreter
+        self.directory = None
+        self.search_path = search_path
+        self.modules = {}
+
+    def resolve(self, path: str) -> Optional[str]:
+        """Finds a module's source file.
+
+        Args:
+            path: The path in the import statement. `.cb` is added if it has no
+                extension.
+
+        Returns:
+            The absolute path, or None if there is no such file.
+        """
+        if not os.path.splitext(path)[1]:
+            path += EXTENSION
+
+        directories = [self.directory or os.getcwd()] + self.search_path
+        for directory in directories:
+            candidate = os.path.abspath(os.path.join(directory, path))
+            if os.path.isfile(candidate):
+                return candidate
+
+        return None
+
+    def module(self, path: str) -> Module:
+        """Gets a module, parsing it if this is the first import.
+
+        Args:
+            path: The path in the import statement.
+
+        Returns:
+            The module, which may not have been loaded yet.
+        """
+        resolved = self.resolve(path)
+        if resolved is None:
+            self.interpreter._error(f'Cannot find module "{path}".')
+
+        if resolved not in self.modules:
+            statements, exports = parse_module(resolved)
+            self.modules[resolved] = Module(resolved,
+                                            statements,
+                                            exports,
+                                            self)
+
+        return self.modules[resolved]
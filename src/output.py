@@ -0,0 +1,63 @@
+from __future__ import annotations
+import sys
+from typing import Optional, TextIO
+
+# The number of characters buffered before they are written out.
+BUFFER_SIZE = 1 << 16
+
+class Output:
+    """Defines the destination of echoed lines.
+
+    Lines are collected in a list and written with one call once they add up
+    to `size` characters, instead of one call per line. The buffer must be
+    flushed before anything else writes to the same file.
+
+    Attributes:
+        file: The file to write to, or None for whatever `sys.stdout` is when
+            the buffer is flushed.
+        buffered: If lines are buffered. Otherwise each line is written and
+            flushed right away.
+        size: The number of characters to buffer.
+        lines: Buffered lines.
+        length: The number of buffered characters.
+    """
+    def __init__(self,
+                 file: Optional[TextIO] = None,
+                 buffered: bool = True,
+                 size: int = BUFFER_SIZE) -> None:
+        """Constructor.
+
+        Args:
+            file: A file to write to instead of standard output.
+            buffered: If lines are buffered.
+            size: A number of characters to buffer.
+        """
+        self.file = file
+        self.buffered = buffered
+        self.size = size
+        self.lines = []
+        self.length = 0
+
+    def write_line(self, line: str) -> None:
+        """Writes a line.
+
+        Args:
+            line: The line, without a line break.
+        """
+        self.lines.append(line)
+        self.length += len(line) + 1
+        if self.length >= self.size or not self.buffered:
+            self.flush()
+
+    def flush(self) -> None:
+        """Writes out the buffered lines.
+        """
+        file = self.file or sys.stdout
+        if self.lines:
+            self.lines.append('')
+            text = '\n'.join(self.lines)
+            self.lines = []
+            self.length = 0
+            file.write(text)
+
+        file.flush()
@@ -0,0 +1,450 @@
+from __future__ import annotations
+import concurrent.futures
+import io
+import math
+import os
+import pickle
+from typing import Callable, Dict, Iterator, List, Optional, Set, Tuple
+from src.error import *
+from src.token import *
+from src.expression import *
+from src.statement import *
+from src.environment import *
+from src.language_object import *
+from src.coffee_bean_array import *
+from src.output import *
+from src.rope import *
+from src.limits import *
+
+# Arrays shorter than this are processed in this process, since sending them to
+# worker processes would take longer than the work.
+MIN_PARALLEL_SIZE = 64
+
+# The number of worker processes.
+WORKERS = os.cpu_count() or 1
+
+# The number of chunks per worker process, so workers that finish early take
+# more of the work.
+CHUNKS_PER_WORKER = 4
+
+# Values that can be copied to a worker process without changing behavior,
+# since nothing can change them.
+IMMUTABLE_TYPES = [type(None), bool, int, float, range] + STRING_TYPES
+
+# The pool of worker processes, created on first use.
+_executor = None
+
+# If this process is a worker, which runs everything itself.
+_in_worker = False
+
+def _names(node: object,
+           reads: Dict[str, Token],
+           writes: Dict[str, Token],
+           parameters: Set[str]) -> None:
+    """Collects the variables code reads and the variables it assigns.
+
+    Args:
+        node: A statement, expression or list of them.
+        reads: The names read so far, with a token for each.
+        writes: The names assigned so far, with a token for each.
+        parameters: The names of the parameters of nested functions so far.
+    """
+    if isinstance(node, list):
+        for item in node:
+            _names(item, reads, writes, parameters)
+        return
+    elif isinstance(node, Function):
+        writes.setdefault(node.name.symbol, node.name)
+        parameters.update(parameter.symbol for parameter in node.parameters)
+    elif isinstance(node, (Assignment, For)):
+        writes.setdefault(node.name.symbol, node.name)
+    elif isinstance(node, Index):
+        reads.setdefault(node.name.symbol, node.name)
+    elif isinstance(node, Literal) and \
+         node.value.token_type == TokenType.IDENTIFIER:
+        reads.setdefault(node.value.symbol, node.value)
+
+    if isinstance(node, (Expression, Statement)):
+        for child in vars(node).values():
+            if isinstance(child, (list, Expression, Statement)):
+                _names(child, reads, writes, parameters)
+
+def _resolve(environment: Environment, name: Token) -> Tuple[bool, object]:
+    """Looks up a variable without failing if it is undefined.
+
+    Args:
+        environment: The environment to look in.
+        name: An identifier token with a variable name.
+
+    Returns:
+        If the variable is defined, and its value.
+    """
+    try:
+        return True, environment.get(name)
+    except RuntimeError:
+        return False, None
+
+def _capture(interpreter: Interpreter,
+             function: CoffeeBeanFunction,
+             table: Dict[str, Tuple[str, object]]) -> None:
+    """Adds the variables a function uses from its closure to a table, along
+    with those of the functions it calls. Functions that change or use values
+    that can change would behave differently in another process, so they are
+    errors.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        function: A user-defined function.
+        table: Entries of `native` and a name, `function` and a declaration,
+            or `value` and a value, by variable name.
+    """
+    reads = {}
+    writes = {}
+    declaration = function.declaration
+    local = {parameter.symbol for parameter in declaration.parameters}
+    parameters = set(local)
+    _names(declaration.body, reads, writes, parameters)
+
+    # Parameters are always local, so only other assignments can change the
+    # closure.
+    for name, token in writes.items():
+        if name not in local and \
+           name in function.closure.values_for(token):
+            interpreter._error(f'Cannot run {function} in parallel, since ' \
+                               f'it assigns the variable `{name}`.')
+
+    for name, token in reads.items():
+        if name in writes or name in parameters:
+            continue
+
+        defined, value = _resolve(function.closure, token)
+        if not defined:
+            continue
+
+        if type(value) == CoffeeBeanNative:
+            entry = ('native', value.name)
+        elif type(value) == CoffeeBeanFunction:
+            entry = ('function', value.declaration)
+        elif type(value) in IMMUTABLE_TYPES:
+            if type(value) in [Rope, StringView]:
+                value = str(value)
+            entry = ('value', value)
+        else:
+            interpreter._error(f'Cannot run {function} in parallel, since ' \
+                               f'it uses `{name}`, which can change.')
+
+        if name in table:
+            if table[name] != entry:
+                interpreter._error(f'Cannot run {function} in parallel, ' \
+                                   f'since it uses two variables named ' \
+                                   f'`{name}`.')
+            continue
+
+        table[name] = entry
+        if type(value) == CoffeeBeanFunction:
+            _capture(interpreter, value, table)
+
+def _payload(interpreter: Interpreter, function: CoffeeBeanCallable) -> tuple:
+    """Collects what a worker process needs to call a function.
+
+    Args:
+        interpreter: The interpreter calling the function.
+        function: A built-in or user-defined function.
+
+    Returns:
+        The function as an entry like those in the table, the table of the
+        variables it uses, the interpreter's thresholds, limits and file root,
+        and the steps taken so far and the deadline under the limits.
+    """
+    table = {}
+    if type(function) == CoffeeBeanNative:
+        entry = ('native', function.name)
+    elif function.declaration.is_generator:
+        interpreter._error(
+            f'Cannot run generator function {function} in parallel.'
+        )
+    else:
+        entry = ('function', function.declaration)
+        _capture(interpreter, function, table)
+
+    budget = interpreter.budget
+    return (entry,
+            table,
+            interpreter.call_threshold,
+            interpreter.loop_threshold,
+            interpreter.limits,
+            interpreter.file_root,
+            (budget.used(), budget.deadline) if budget else None)
+
+def _rebuild(entry: Tuple[str, object],
+             environment: Environment) -> object:
+    """Rebuilds a captured value in a worker process.
+
+    Args:
+        entry: An entry from the table `_capture` fills.
+        environment: The environment to declare functions in.
+
+    Returns:
+        The value.
+    """
+    kind, value = entry
+    if kind == 'native':
+        return NATIVE_FUNCTIONS[value]
+    elif kind == 'function':
+        return CoffeeBeanFunction(value, environment)
+
+    return value
+
+def _worker(payload: tuple) -> Tuple[Interpreter, CoffeeBeanCallable]:
+    """Rebuilds a function in a worker process.
+
+    Args:
+        payload: What `_payload` collected.
+
+    Returns:
+        An interpreter buffering what the function echoes, and the function.
+        The interpreter's budget starts from the steps the program had taken
+        and ends at its deadline.
+    """
+    global _in_worker
+    from src.interpreter import Interpreter
+
+    _in_worker = True
+    entry, table, call_threshold, loop_threshold, limits, file_root, \
+        budget = payload
+    interpreter = Interpreter(call_threshold=call_threshold,
+                              loop_threshold=loop_threshold,
+                              output=Output(io.StringIO()),
+                              limits=limits,
+                              file_root=file_root)
+    if budget:
+        interpreter.budget = Budget(limits, *budget)
+    for name, value in table.items():
+        interpreter.globals.values[name] = _rebuild(value, interpreter.globals)
+
+    return interpreter, _rebuild(entry, interpreter.globals)
+
+def _steps(interpreter: Interpreter) -> int:
+    """Gets the steps a worker's interpreter has taken under its limits.
+
+    Args:
+        interpreter: The worker's interpreter.
+
+    Returns:
+        The number of steps, counting those the program took before.
+    """
+    return interpreter.budget.used() if interpreter.budget else 0
+
+def _finish_chunk(interpreter: Interpreter,
+                  value: object,
+                  error: Optional[Exception],
+                  start: int) -> Tuple[object, str, str, int]:
+    """Collects the result of a chunk in a worker process.
+
+    Args:
+        interpreter: The worker's interpreter.
+        value: The chunk's result.
+        error: The error the chunk stopped with, if any.
+        start: The steps taken when the chunk started.
+
+    Returns:
+        The result, the echoed text, the error message, if any, and the
+        number of steps the chunk took.
+    """
+    output = interpreter.output
+    output.flush()
+    return (value,
+            output.file.getvalue(),
+            str(error) if error else None,
+            _steps(interpreter) - start)
+
+def _map_chunk(payload: tuple,
+               items: List[object]) -> Tuple[List[object], str, str, int]:
+    """Calls a function on each item of a chunk in a worker process.
+
+    Args:
+        payload: What `_payload` collected.
+        items: The items.
+
+    Returns:
+        The results, the echoed text, the error message, if any, and the
+        number of steps taken.
+    """
+    interpreter, function = _worker(payload)
+    start = _steps(interpreter)
+    results = []
+    try:
+        for item in items:
+            results.append(interpreter._call(function, [item]))
+    except RuntimeError as error:
+        return _finish_chunk(interpreter, results, error, start)
+
+    return _finish_chunk(interpreter, results, None, start)
+
+def _reduce_chunk(payload: tuple,
+                  items: List[object]) -> Tuple[object, str, str]:
+    """Combines the items of a chunk with a function in a worker process.
+
+    Args:
+        payload: What `_payload` collected.
+        items: The items, at least one.
+
+    Returns:
+        The combined value, the echoed text, the error message, if any, and
+        the number of steps taken.
+    """
+    interpreter, function = _worker(payload)
+    start = _steps(interpreter)
+    value = items[0]
+    try:
+        for item in items[1:]:
+            value = interpreter._call(function, [value, item])
+    except RuntimeError as error:
+        return _finish_chunk(interpreter, value, error, start)
+
+    return _finish_chunk(interpreter, value, None, start)
+
+def _items(interpreter: Interpreter, values: object) -> List[object]:
+    """Gets the values to process, without going past the size limit.
+
+    Worker processes get copies of the values, so a function that changes an
+    array or map it is given would only change the original when the values
+    are processed in this process. To behave the same either way, only values
+    that can't change are allowed.
+
+    Args:
+        interpreter: The interpreter calling the function.
+        values: Anything a for loop can loop over.
+
+    Returns:
+        The values.
+    """
+    items = interpreter._iterate(values)
+    if interpreter.budget:
+        items = interpreter.budget.bound(items)
+    items = list(items)
+    interpreter._check_size(len(items))
+    for item in items:
+        if type(item) not in IMMUTABLE_TYPES:
+            interpreter._error('Can only run in parallel over null, booleans, '
+                               'numbers and strings.')
+    return items
+
+def _is_parallel(items: List[object]) -> bool:
+    """Checks if items are worth sending to worker processes.
+
+    Args:
+        items: The items.
+
+    Returns:
+        If there are enough items and worker processes.
+    """
+    return not _in_worker and WORKERS > 1 and len(items) >= MIN_PARALLEL_SIZE
+
+def _run_chunks(interpreter: Interpreter,
+                work: Callable,
+                payload: tuple,
+                items: List[object]) -> Iterator[object]:
+    """Splits items into chunks and runs them in the worker processes.
+
+    Args:
+        interpreter: The interpreter to write echoed lines to and report errors
+            from.
+        work: `_map_chunk` or `_reduce_chunk`.
+        payload: What `_payload` collected.
+        items: The items.
+
+    Returns:
+        The result of each chunk, in order. The steps each chunk took are
+        charged to the interpreter's budget, and waiting for a chunk stops at
+        its deadline.
+    """
+    global _executor
+
+    if _executor is None:
+        _executor = concurrent.futures.ProcessPoolExecutor(WORKERS)
+
+    size = math.ceil(len(items) / (WORKERS * CHUNKS_PER_WORKER))
+    futures = [_executor.submit(work, payload, items[start:start + size])
+               for start in range(0, len(items), size)]
+    budget = interpreter.budget
+    try:
+        for future in futures:
+            try:
+                timeout = budget.time_left() if budget else None
+                value, text, error, steps = future.result(timeout)
+            except concurrent.futures.TimeoutError:
+                # The workers stop at the same deadline on their own.
+                budget.time_out(interpreter)
+            except concurrent.futures.process.BrokenProcessPool:
+                _executor = None
+                interpreter._error('A worker process stopped.')
+            except (pickle.PicklingError, TypeError, AttributeError):
+                interpreter._error('Cannot send values to a worker process.')
+
+            if text:
+                # The text already ends in a line break.
+                interpreter.output.write_line(text[:-1])
+            if budget:
+                budget.charge(interpreter, steps)
+            if error:
+                raise RuntimeError(error)
+            yield value
+    finally:
+        for future in futures:
+            future.cancel()
+
+def parallel_map(interpreter: Interpreter,
+                 function: CoffeeBeanCallable,
+                 values: object) -> CoffeeBeanArray:
+    """Calls a function on each value, in chunks spread over worker
+    processes.
+
+    Args:
+        interpreter: The interpreter calling the function.
+        function: A function taking one argument.
+        values: Anything a for loop can loop over.
+
+    Returns:
+        The results, in order.
+    """
+    payload = _payload(interpreter, function)
+    items = _items(interpreter, values)
+    if not _is_parallel(items):
+        return CoffeeBeanArray([interpreter._call(function, [item])
+                                for item in items])
+
+    results = []
+    for chunk in _run_chunks(interpreter, _map_chunk, payload, items):
+        results.extend(chunk)
+
+    return CoffeeBeanArray(results)
+
+def parallel_reduce(interpreter: Interpreter,
+                    function: CoffeeBeanCallable,
+                    values: object,
+                    initial: object) -> object:
+    """Combines values with a function, in chunks spread over worker
+    processes. Each chunk is combined on its own, and then the results of the
+    chunks are combined in order, starting from the initial value, so the
+    function must be associative.
+
+    Args:
+        interpreter: The interpreter calling the function.
+        function: A function taking two arguments.
+        values: Anything a for loop can loop over.
+        initial: The value to start from.
+
+    Returns:
+        The combined value.
+    """
+    payload = _payload(interpreter, function)
+    items = _items(interpreter, values)
+    if _is_parallel(items):
+        items = list(_run_chunks(interpreter, _reduce_chunk, payload, items))
+
+    value = initial
+    for item in items:
+        value = interpreter._call(function, [value, item])
+
+    return value
@@ -12,6 +12,8 @@ class Parser:
         position: The current token index in the input tokens.
         token: The current token in the input tokens.
         statements: Output statements.
+        generator: If the function being parsed has a `yield` statement so
+            far, or None outside of functions.
     """
     def __init__(self, tokens: List[Token]) -> None:
         """Creates a parser.
@@ -23,6 +25,7 @@ class Parser:
         self.position = 0
         self.token = None if len(tokens) == 0 else tokens[0]
         self.statements = []
+        self.generator = None
 
     def _error(self, message: str) -> None:
         """Raises a parser error.
@@ -97,12 +100,34 @@ class Parser:
             self._eat() # Eat the right paranthesis.
             return Grouping(expression)
 
-        # An array.
+        # An array or a map.
         elif self._match([TokenType.LEFT_BRACE]):
+            keys = []
             values = []
             self._eat()
+
+            # An empty map.
+            if self._match([TokenType.COLON]):
+                self._eat()
+                if not self._match([TokenType.RIGHT_BRACE]):
+                    self._error("Expected '}' after ':'.")
+                self._eat()
+                return Map(keys, values)
+
+            is_map = False
             while not self._match([TokenType.RIGHT_BRACE]):
-                values.append(self._eat_expression())
+                value = self._eat_expression()
+                if not values and not keys:
+                    is_map = self._match([TokenType.COLON])
+
+                if is_map:
+                    if not self._match([TokenType.COLON]):
+                        self._error("Expected ':' after key.")
+                    self._eat()
+                    keys.append(value)
+                    value = self._eat_expression()
+                values.append(value)
+
                 if not self._match([TokenType.COMMA]):
                     break
                 self._eat()
@@ -111,7 +136,7 @@ class Parser:
                 self._error("Expected '}' after values.")
 
             self._eat() # Eat the right curly brace.
-            return Array(values)
+            return Map(keys, values) if is_map else Array(values)
 
         self._error('Expected expression.')
 
@@ -120,11 +145,22 @@ class Parser:
 
         while self._match([TokenType.LEFT_BRACKET]):
             self._eat()
-            index = self._eat_expression()
-            
             if not isinstance(expression, Literal):
                 self._error('Can only index arrays.')
-            expression = Index(expression.value, index)
+
+            index = None
+            if not self._match([TokenType.COLON]):
+                index = self._eat_expression()
+
+            if self._match([TokenType.COLON]):
+                self._eat()
+                end = None
+                if not self._match([TokenType.RIGHT_BRACKET]):
+                    end = self._eat_expression()
+                expression = Index(expression.value, index, end, True)
+            else:
+                expression = Index(expression.value, index)
+
             if not self._match([TokenType.RIGHT_BRACKET]):
                 self._error("Expected ']' after index.")
             self._eat()
@@ -135,14 +171,13 @@ class Parser:
         arguments = []
         if not self._match([TokenType.RIGHT_PARENTHESIS]):
             while True:
-                if self._match([TokenType.COMMA]):
-                    self._eat()
-                if self._match([TokenType.RIGHT_PARENTHESIS]):
-                    self._eat()
-                    break
-                    
                 arguments.append(self._eat_expression())
+                if not self._match([TokenType.COMMA]):
+                    break
+                self._eat()
 
+        if not self._match([TokenType.RIGHT_PARENTHESIS]):
+            self._error("Expected ')' after arguments.")
         right_parenthesis = self._eat()
         return Call(callee, right_parenthesis, arguments)
 
@@ -246,7 +281,7 @@ class Parser:
 
             if isinstance(expression, Literal):
                 return Assignment(expression.value, value)
-            elif isinstance(expression, Index):
+            elif isinstance(expression, Index) and not expression.is_slice:
                 return ArrayAssignment(expression, value)
 
             self._error('Invalid assignment target.')
@@ -289,11 +324,25 @@ class Parser:
 
         return If(condition, then, _else)
 
-    def _eat_while_statement(self) -> While:
+    def _eat_while_statement(self, keyword: Token) -> While:
         condition = self._eat_expression()
         body = self._eat_statement()
 
-        return While(condition, body)
+        return While(condition, body, keyword)
+
+    def _eat_for_statement(self, keyword: Token) -> For:
+        if not self._match([TokenType.IDENTIFIER]):
+            self._error('Expected loop variable name.')
+        name = self._eat()
+
+        if not self._match([TokenType.IN]):
+            self._error('Expected `in` after loop variable.')
+        self._eat() # Eat the in keyword.
+
+        iterable = self._eat_expression()
+        body = self._eat_statement()
+
+        return For(name, iterable, body, keyword)
 
     def _eat_function(self) -> Function:
         if not self._match([TokenType.IDENTIFIER]):
@@ -307,23 +356,30 @@ class Parser:
         parameters = []
         if not self._match([TokenType.RIGHT_PARENTHESIS]):
             while True:
-                if self._match([TokenType.COMMA]):
-                    self._eat()
-                    
-                if self._match([TokenType.RIGHT_PARENTHESIS]):
-                    self._eat()
-                    break
-                elif self._match([TokenType.IDENTIFIER]):
-                    parameters.append(self._eat())
-                else:
+                if not self._match([TokenType.IDENTIFIER]):
                     self._error('Expected parameter name.')
-                    
+                parameters.append(self._eat())
+
+                if not self._match([TokenType.COMMA]):
+                    break
+                self._eat()
+
+        if not self._match([TokenType.RIGHT_PARENTHESIS]):
+            self._error("Expected ')' after parameters.")
+        self._eat() # Eat the right parenthesis.
+
         if not self._match([TokenType.DO]):
             self._error('Expected `do` before function body.')
         self._eat() # Eat the do keyword.
 
+        # A yield in a nested function doesn't make this one a generator.
+        enclosing = self.generator
+        self.generator = False
         block = self._eat_block()
-        return Function(name, parameters, block.statements)
+        is_generator = self.generator
+        self.generator = enclosing
+
+        return Function(name, parameters, block.statements, is_generator)
 
     def _eat_return(self) -> Return:
         keyword = self._eat()
@@ -331,6 +387,24 @@ class Parser:
 
         return Return(keyword, value)
 
+    def _eat_yield(self) -> Yield:
+        if self.generator is None:
+            self._error('Cannot yield outside of a function.')
+        self.generator = True
+
+        keyword = self._eat()
+        value = self._eat_expression()
+
+        return Yield(keyword, value)
+
+    def _eat_import(self) -> Import:
+        keyword = self._eat()
+        if not self._match([TokenType.STRING]):
+            self._error('Expected module path after `import`.')
+        path = self._eat().symbol[1:-1]
+
+        return Import(keyword, path)
+
     def _eat_statement(self) -> Statement:
         if self._match([TokenType.ECHO]):
             self._eat()
@@ -345,8 +419,12 @@ class Parser:
             return self._eat_if_statement()
 
         elif self._match([TokenType.WHILE]):
-            self._eat()
-            return self._eat_while_statement()
+            keyword = self._eat()
+            return self._eat_while_statement(keyword)
+
+        elif self._match([TokenType.FOR]):
+            keyword = self._eat()
+            return self._eat_for_statement(keyword)
 
         elif self._match([TokenType.FUNCTION]):
             self._eat()
@@ -355,6 +433,12 @@ class Parser:
         elif self._match([TokenType.RETURN]):
             # self._eat()
             return self._eat_return()
+
+        elif self._match([TokenType.YIELD]):
+            return self._eat_yield()
+
+        elif self._match([TokenType.IMPORT]):
+            self._error('Imports must be at the top level.')
         
         return self._eat_expression_statement()
 
@@ -363,7 +447,10 @@ class Parser:
             if self.token.token_type == TokenType.EOF:
                 break
             
-            statement = self._eat_statement()
+            if self._match([TokenType.IMPORT]):
+                statement = self._eat_import()
+            else:
+                statement = self._eat_statement()
             self.statements.append(statement)
 
         return self.statements
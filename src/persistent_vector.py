@@ -0,0 +1,218 @@
+from __future__ import annotations
+from typing import Iterable, Iterator, List, Optional
+
+# Each node of the trie has up to 2 ** BITS children.
+BITS = 5
+WIDTH = 1 << BITS
+MASK = WIDTH - 1
+
+class PersistentVector:
+    """Defines an immutable vector that shares structure between versions.
+
+    Elements are stored in the leaves of a trie with 32 children per node, plus
+    a tail holding the last leaf so appending is cheap. Changing an element
+    copies only the nodes on the path to it, so each version takes O(log n)
+    time and memory and every older version stays valid.
+
+    Attributes:
+        length: The number of elements.
+        shift: The number of index bits below the root.
+        root: The root node, a list of child nodes or of elements.
+        tail: The last leaf, which is not in the trie yet.
+    """
+    __slots__ = ['length', 'shift', 'root', 'tail']
+
+    def __init__(self,
+                 length: int = 0,
+                 shift: int = BITS,
+                 root: Optional[list] = None,
+                 tail: Optional[list] = None) -> None:
+        """Constructor.
+
+        Args:
+            length: The number of elements.
+            shift: The number of index bits below the root.
+            root: The root node.
+            tail: The last leaf.
+        """
+        self.length = length
+        self.shift = shift
+        self.root = [] if root is None else root
+        self.tail = [] if tail is None else tail
+
+    @staticmethod
+    def from_values(values: Iterable[object]) -> PersistentVector:
+        """Builds a vector from elements in O(n).
+
+        Args:
+            values: The elements.
+
+        Returns:
+            A vector with the elements.
+        """
+        values = list(values)
+        length = len(values)
+        tail_offset = PersistentVector._tail_offset_for(length)
+
+        nodes = [values[i:i + WIDTH] for i in range(0, tail_offset, WIDTH)]
+        shift = BITS
+        while len(nodes) > WIDTH:
+            nodes = [nodes[i:i + WIDTH] for i in range(0, len(nodes), WIDTH)]
+            shift += BITS
+
+        return PersistentVector(length, shift, nodes, values[tail_offset:])
+
+    @staticmethod
+    def _tail_offset_for(length: int) -> int:
+        """Gets the index of the first element in the tail.
+
+        Args:
+            length: The number of elements.
+
+        Returns:
+            The index.
+        """
+        if length < WIDTH:
+            return 0
+
+        return ((length - 1) >> BITS) << BITS
+
+    def _leaf(self, index: int) -> list:
+        """Gets the leaf holding an element.
+
+        Args:
+            index: An index in range.
+
+        Returns:
+            The leaf.
+        """
+        if index >= PersistentVector._tail_offset_for(self.length):
+            return self.tail
+
+        node = self.root
+        for level in range(self.shift, 0, -BITS):
+            node = node[(index >> level) & MASK]
+
+        return node
+
+    def __getitem__(self, index: int) -> object:
+        return self._leaf(index)[index & MASK]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __iter__(self) -> Iterator[object]:
+        tail_offset = PersistentVector._tail_offset_for(self.length)
+        for index in range(0, tail_offset, WIDTH):
+            yield from self._leaf(index)
+
+        yield from self.tail
+
+    def _set(self, level: int, node: list, index: int, value: object) -> list:
+        """Copies the path to an element with the element changed.
+
+        Args:
+            level: The number of index bits below the node.
+            node: A node on the path.
+            index: The element's index.
+            value: The new element.
+
+        Returns:
+            The copied node.
+        """
+        node = list(node)
+        if level == 0:
+            node[index & MASK] = value
+        else:
+            child = (index >> level) & MASK
+            node[child] = self._set(level - BITS, node[child], index, value)
+
+        return node
+
+    def set(self, index: int, value: object) -> PersistentVector:
+        """Changes an element.
+
+        Args:
+            index: An index in range.
+            value: The new element.
+
+        Returns:
+            A new version with the element changed.
+        """
+        if index >= PersistentVector._tail_offset_for(self.length):
+            tail = list(self.tail)
+            tail[index & MASK] = value
+            return PersistentVector(self.length, self.shift, self.root, tail)
+
+        root = self._set(self.shift, self.root, index, value)
+        return PersistentVector(self.length, self.shift, root, self.tail)
+
+    def _new_path(self, level: int, node: list) -> list:
+        """Wraps a leaf in nodes down from a level.
+
+        Args:
+            level: The number of index bits below the top node.
+            node: A leaf.
+
+        Returns:
+            The top node.
+        """
+        if level == 0:
+            return node
+
+        return [self._new_path(level - BITS, node)]
+
+    def _push_tail(self, level: int, parent: list, tail: list) -> list:
+        """Copies the path to the end of the trie with a full tail added.
+
+        Args:
+            level: The number of index bits below the parent.
+            parent: A node on the path.
+            tail: The full tail.
+
+        Returns:
+            The copied node.
+        """
+        child = ((self.length - 1) >> level) & MASK
+        node = list(parent)
+        if level == BITS:
+            inserted = tail
+        elif child < len(parent):
+            inserted = self._push_tail(level - BITS, parent[child], tail)
+        else:
+            inserted = self._new_path(level - BITS, tail)
+
+        if child < len(node):
+            node[child] = inserted
+        else:
+            node.append(inserted)
+
+        return node
+
+    def append(self, value: object) -> PersistentVector:
+        """Adds an element to the end.
+
+        Args:
+            value: The new element.
+
+        Returns:
+            A new version with the element added.
+        """
+        tail_offset = PersistentVector._tail_offset_for(self.length)
+        if self.length - tail_offset < WIDTH:
+            return PersistentVector(self.length + 1,
+                                    self.shift,
+                                    self.root,
+                                    self.tail + [value])
+
+        shift = self.shift
+        if (self.length >> BITS) > (1 << shift):
+            root = [self.root, self._new_path(shift, self.tail)]
+            shift += BITS
+        else:
+            root = self._push_tail(shift, self.root, self.tail)
+
+        return PersistentVector(self.length + 1, shift, root, [value])
+
+    def tolist(self) -> List[object]:
+        return list(self)
@@ -0,0 +1,175 @@
+from __future__ import annotations
+import copy
+import io
+import threading
+from typing import Dict, FrozenSet, List, Optional, TextIO, Tuple
+from src.error import *
+from src.statement import *
+from src.environment import *
+from src.lexer import *
+from src.parser import *
+from src.type_inferrer import *
+from src.bounds_analyzer import *
+from src.interpreter import *
+from src.output import *
+from src.host import *
+from src.limits import *
+
+class Program:
+    """Defines a parsed program that can run many times, from any thread.
+
+    The parsed statements are never changed. The analysis passes annotate a
+    copy of them for each set of global names the host injects, since an
+    injected name can hold any value. Loops that tier up in one run stay
+    transpiled for later runs with the same names, while each run has its own
+    interpreter, globals, output and budget under the limits.
+
+    Attributes:
+        statements: The parsed statements.
+        call_threshold: The number of calls before a function tiers up.
+        loop_threshold: The number of iterations before a loop tiers up.
+        directory: The directory imports are relative to, or None for the
+            working directory.
+        limits: The limits on each run, or None.
+        file_root: The directory runs can open files in, or None.
+        variants: Annotated statements, transpiled loops and loop iteration
+            counts by the names of the injected globals.
+        lock: The lock held while a variant is created.
+    """
+    def __init__(self,
+                 statements: List[Statement],
+                 call_threshold: int = CALL_THRESHOLD,
+                 loop_threshold: int = LOOP_THRESHOLD,
+                 directory: Optional[str] = None,
+                 limits: Optional[Limits] = None,
+                 file_root: Optional[str] = None) -> None:
+        """Constructor.
+
+        Args:
+            statements: Parsed statements, which must not have been annotated.
+            call_threshold: A number of calls before a function tiers up.
+            loop_threshold: A number of iterations before a loop tiers up.
+            directory: A directory for imports to be relative to.
+            limits: Limits on the steps, time, call depth and value sizes of
+                each run.
+            file_root: A directory runs can open files in, if they have no
+                limits.
+        """
+        self.statements = statements
+        self.call_threshold = call_threshold
+        self.loop_threshold = loop_threshold
+        self.directory = directory
+        self.limits = limits or None
+        self.file_root = file_root
+        self.variants = {}
+        self.lock = threading.Lock()
+
+    def _interpreter(self, output: Output) -> Interpreter:
+        """Creates an interpreter for one run.
+
+        Args:
+            output: The buffer to write echoed lines to.
+
+        Returns:
+            The interpreter.
+        """
+        interpreter = Interpreter(call_threshold=self.call_threshold,
+                                  loop_threshold=self.loop_threshold,
+                                  output=output,
+                                  limits=self.limits,
+                                  file_root=self.file_root)
+        interpreter.loader.directory = self.directory
+        return interpreter
+
+    def _variant(self, names: FrozenSet[str]) -> Tuple[List[Statement],
+                                                       Dict, Dict]:
+        """Gets the program annotated for a set of injected globals.
+
+        Args:
+            names: The names of the injected globals.
+
+        Returns:
+            The annotated statements, and the transpiled loops and loop
+            iteration counts shared by the runs that use them.
+        """
+        variant = self.variants.get(names)
+        if variant:
+            return variant
+
+        with self.lock:
+            if names not in self.variants:
+                statements = copy.deepcopy(self.statements)
+                interpreter = self._interpreter(Output())
+                for name in names:
+                    interpreter.globals.values[name] = None
+                inferrer = TypeInferrer(interpreter.globals,
+                                        loader=interpreter.loader)
+                inferrer.annotate(statements)
+                BoundsAnalyzer(inferrer).annotate(statements)
+                self.variants[names] = (statements, {}, {})
+
+        return self.variants[names]
+
+    def run(self,
+            globals: Optional[Dict[str, object]] = None,
+            stdout: Optional[TextIO] = None) -> Optional[str]:
+        """Runs the program. A `return` outside of a function ends it early.
+
+        Args:
+            globals: Variables to define before the program runs. Python
+                lists, tuples and dicts are converted to arrays and maps.
+            stdout: A file to write echoed lines to. By default they are
+                captured and returned.
+
+        Returns:
+            The echoed lines, or None if they were written to `stdout`.
+        """
+        globals = globals or {}
+        statements, loops, back_edges = self._variant(frozenset(globals))
+
+        file = stdout or io.StringIO()
+        interpreter = self._interpreter(Output(file))
+        interpreter.loops = loops
+        interpreter.back_edges = back_edges
+        for name, value in globals.items():
+            interpreter.globals.values[name] = to_value(value)
+
+        try:
+            interpreter.interpret(statements)
+        except ReturnError:
+            pass
+
+        return None if stdout else file.getvalue()
+
+def compile(source: str,
+            call_threshold: int = CALL_THRESHOLD,
+            loop_threshold: int = LOOP_THRESHOLD,
+            directory: Optional[str] = None,
+            limits: Optional[Limits] = None,
+            file_root: Optional[str] = None) -> Program:
+    """Parses source code into a program that can run many times.
+
+    Args:
+        source: Source code.
+        call_threshold: A number of calls before a function tiers up.
+        loop_threshold: A number of iterations before a loop tiers up.
+        directory: A directory for imports to be relative to, instead of the
+            working directory.
+        limits: Limits on the steps, time, call depth and value sizes of each
+            run.
+        file_root: A directory runs can open files in, if they have no limits.
+
+    Returns:
+        The program.
+
+    Raises:
+        LexerError: The source code has an invalid token.
+        ParserError: The source code has a syntax error.
+    """
+    statements = Parser(Lexer(source).get_tokens()).get_statements()
+    return Program(statements,
+                   call_threshold,
+                   loop_threshold,
+                   directory,
+                   limits,
+                   file_root)
@@ -0,0 +1,248 @@
+from __future__ import annotations
+from typing import List, Union
+
+# Strings shorter than this are joined right away, since copying them is cheaper
+# than building a rope.
+ROPE_THRESHOLD = 64
+
+class LazyString:
+    """Defines a string whose characters are only copied out when read.
+
+    Subclasses build the flat string in `_flatten`. Comparing or hashing a lazy
+    string flattens it once, and the flat string is kept for later reads.
+
+    Attributes:
+        length: The number of characters.
+        flat: The flat string, or None if it hasn't been needed yet.
+    """
+    __slots__ = ['length', 'flat']
+
+    def _flatten(self) -> str:
+        """Copies the characters into one string.
+
+        Returns:
+            The string.
+        """
+        pass
+
+    def __str__(self) -> str:
+        if self.flat is None:
+            self.flat = self._flatten()
+
+        return self.flat
+
+    def __repr__(self) -> str:
+        return repr(str(self))
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __bool__(self) -> bool:
+        return self.length != 0
+
+    def __hash__(self) -> int:
+        return hash(str(self))
+
+    def __eq__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+        elif len(other) != self.length:
+            return False
+
+        return str(self) == str(other)
+
+    def __ne__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+
+        return not self == other
+
+    def __lt__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+
+        return str(self) < str(other)
+
+    def __le__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+
+        return str(self) <= str(other)
+
+    def __gt__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+
+        return str(self) > str(other)
+
+    def __ge__(self, other: object) -> bool:
+        if type(other) not in STRING_TYPES:
+            return NotImplemented
+
+        return str(self) >= str(other)
+
+class Rope(LazyString):
+    """Defines a string built by concatenation, joined only when it is read.
+
+    Adding a string to a rope appends it to a list of parts instead of copying
+    both strings, so building a string in a loop takes linear time. Ropes made
+    from the same rope share the list: the first to grow it appends in place,
+    and any other copies the parts it owns first.
+
+    Echoing, comparing, indexing or using a rope as a map key joins the parts
+    once, and the joined string is kept for later reads.
+
+    Attributes:
+        parts: The strings to join, possibly with more parts after this rope's.
+        count: The number of parts in this rope.
+    """
+    __slots__ = ['parts', 'count']
+
+    def __init__(self, parts: List[str], count: int, length: int) -> None:
+        """Constructor.
+
+        Args:
+            parts: The strings to join.
+            count: The number of parts in the rope.
+            length: The number of characters.
+        """
+        self.parts = parts
+        self.count = count
+        self.length = length
+        self.flat = None
+
+    def append(self, string: str) -> Rope:
+        """Adds a string to the end.
+
+        Args:
+            string: A string.
+
+        Returns:
+            A new rope, leaving this one unchanged.
+        """
+        parts = self.parts
+        if len(parts) != self.count:
+            parts = parts[:self.count]
+
+        parts.append(string)
+        return Rope(parts, self.count + 1, self.length + len(string))
+
+    def _flatten(self) -> str:
+        return ''.join(self.parts[:self.count])
+
+class StringView(LazyString):
+    """Defines a substring that shares the characters of another string.
+
+    Indexing and searching a view read the original string at an offset, so
+    walking through a long string with `substr` doesn't copy what is left of
+    it each time.
+
+    Attributes:
+        string: The original string.
+        start: The index of the first character in the view.
+        stop: The index after the last character in the view.
+    """
+    __slots__ = ['string', 'start', 'stop']
+
+    def __init__(self, string: str, start: int, stop: int) -> None:
+        """Constructor.
+
+        Args:
+            string: The original string.
+            start: The index of the first character in the view.
+            stop: The index after the last character in the view.
+        """
+        self.string = string
+        self.start = start
+        self.stop = stop
+        self.length = stop - start
+        self.flat = None
+
+    def _flatten(self) -> str:
+        return self.string[self.start:self.stop]
+
+STRING_TYPES = [str, Rope, StringView]
+
+# Substrings shorter than this are copied, so a small view doesn't keep a long
+# string alive.
+VIEW_THRESHOLD = 64
+
+def concatenate(left: Union[str, LazyString],
+                right: Union[str, LazyString]) -> Union[str, Rope]:
+    """Adds two strings without copying a long left side.
+
+    Args:
+        left: A string or lazy string.
+        right: A string or lazy string.
+
+    Returns:
+        The combined string, or a rope once it is long.
+    """
+    right = str(right)
+    if type(left) == Rope:
+        return left.append(right)
+
+    left = str(left)
+    length = len(left) + len(right)
+    if length < ROPE_THRESHOLD:
+        return left + right
+
+    return Rope([left, right], 2, length)
+
+def substring(string: Union[str, LazyString],
+              start: int,
+              stop: int) -> Union[str, StringView]:
+    """Gets a range of characters, sharing them with the string if it is long.
+
+    Args:
+        string: A string or lazy string.
+        start: The index of the first character, in range.
+        stop: The index after the last character, in range.
+
+    Returns:
+        The substring.
+    """
+    if type(string) == StringView:
+        start += string.start
+        stop += string.start
+        string = string.string
+    else:
+        string = str(string)
+
+    if stop - start < VIEW_THRESHOLD:
+        return string[start:stop]
+
+    return StringView(string, start, stop)
+
+def character(string: Union[str, LazyString], index: int) -> str:
+    """Gets one character of a string.
+
+    Args:
+        string: A string or lazy string.
+        index: An index in range.
+
+    Returns:
+        The character.
+    """
+    if type(string) == StringView:
+        return string.string[string.start + index]
+
+    return str(string)[index]
+
+def find(string: Union[str, LazyString],
+         target: Union[str, LazyString]) -> int:
+    """Finds the first occurrence of a substring.
+
+    Args:
+        string: The string to search.
+        target: The substring to find.
+
+    Returns:
+        The index of the substring, or -1 if it isn't found.
+    """
+    target = str(target)
+    if type(string) == StringView:
+        index = string.string.find(target, string.start, string.stop)
+        return index if index == -1 else index - string.start
+
+    return str(string).find(target)
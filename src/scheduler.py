@@ -0,0 +1,346 @@
+from __future__ import annotations
+import asyncio
+import collections
+import threading
+from typing import Callable, List, Optional
+from src.error import *
+from src.language_object import *
+from src.coffee_bean_task import *
+from src.coffee_bean_channel import *
+
+class Scheduler:
+    """Defines a scheduler for the tasks of one program.
+
+    Each task runs in its own thread, so it has its own call stack, but only one
+    task runs at a time. The running task keeps going until it sleeps, waits
+    for a task, receives from an empty channel or waits for a file, and then
+    the task that became ready first runs next. Timers run on an asyncio event
+    loop in a background thread, so tasks that sleep at the same time wake up
+    after the longest sleep instead of all of them added up.
+
+    Tasks are threads rather than coroutines, so a task that never waits is
+    never interrupted, and each unfinished task holds an OS thread.
+
+    Attributes:
+        lock: The lock held while tasks change state.
+        main: The task running the main program.
+        running: The task that may run now, or None if every task is waiting.
+        ready: The tasks that may run next, in order.
+        tasks: The spawned tasks, in the order they were spawned.
+        sleeping: The number of tasks waiting for a timer.
+        blocking: The tasks in a call that may block, like reading a file.
+        loop: The event loop running the timers, or None until a task sleeps.
+        thread: The thread running the event loop.
+        cancelled: If the program ended and the tasks are being unwound.
+    """
+    def __init__(self) -> None:
+        """Constructor.
+        """
+        self.lock = threading.Lock()
+        self.main = CoffeeBeanTask(None)
+        self.running = self.main
+        self.ready = collections.deque()
+        self.tasks = []
+        self.sleeping = 0
+        self.blocking = set()
+        self.loop = None
+        self.thread = None
+        self.cancelled = False
+
+    def _resume(self, task: CoffeeBeanTask) -> None:
+        """Makes a task ready to run. The lock must be held.
+
+        Args:
+            task: A waiting task.
+        """
+        if task.done:
+            return
+
+        if self.running is None:
+            self.running = task
+            task.event.set()
+        else:
+            self.ready.append(task)
+
+    def _next(self) -> None:
+        """Lets the next ready task run. The lock must be held.
+        """
+        if self.ready:
+            self.running = self.ready.popleft()
+            self.running.event.set()
+        else:
+            self.running = None
+
+    def _block(self, task: CoffeeBeanTask) -> None:
+        """Makes the running task wait until something resumes it. The lock
+        must be held, and is released.
+
+        Args:
+            task: The running task.
+        """
+        task.event.clear()
+        self._next()
+        self.lock.release()
+
+        task.event.wait()
+        if self.cancelled:
+            raise CancelledError()
+
+    def _check_deadlock(self, interpreter: Interpreter) -> None:
+        """Reports an error if the running task is about to wait for another
+        task, but no task could ever resume it. The lock must be held, and is
+        released if there is an error.
+
+        Args:
+            interpreter: The interpreter running the task.
+        """
+        if not self.ready and not self.sleeping and not self.blocking:
+            self.lock.release()
+            interpreter._error('All tasks are waiting.')
+
+    def _run(self,
+             task: CoffeeBeanTask,
+             interpreter: Interpreter,
+             arguments: List[object]) -> None:
+        """Runs a spawned task in its thread.
+
+        Args:
+            task: The task.
+            interpreter: The interpreter for the task.
+            arguments: The arguments to call the function with.
+        """
+        task.event.wait()
+        try:
+            if self.cancelled:
+                return
+
+            task.result = interpreter._call(task.function, arguments)
+        except CancelledError:
+            return
+        except Exception as error:
+            task.error = error
+
+        with self.lock:
+            task.done = True
+            for waiter in task.waiters:
+                self._resume(waiter)
+            if not self.cancelled:
+                self._next()
+
+    def spawn(self,
+              interpreter: Interpreter,
+              function: CoffeeBeanCallable,
+              arguments: List[object]) -> CoffeeBeanTask:
+        """Starts a task. It runs once the running task waits.
+
+        Args:
+            interpreter: The interpreter running the spawning task.
+            function: The function to call.
+            arguments: The arguments to call it with.
+
+        Returns:
+            The task.
+        """
+        task = CoffeeBeanTask(function)
+        context = interpreter._fork()
+        context.task = task
+        task.thread = threading.Thread(target=self._run,
+                                       args=(task, context, arguments),
+                                       daemon=True)
+        with self.lock:
+            self.tasks.append(task)
+            self.ready.append(task)
+
+        task.thread.start()
+        return task
+
+    def _wake(self, task: CoffeeBeanTask) -> None:
+        """Resumes a task when its timer runs out, on the event loop's thread.
+
+        Args:
+            task: A sleeping task.
+        """
+        with self.lock:
+            self.sleeping -= 1
+            if not self.cancelled:
+                self._resume(task)
+
+    def sleep(self, interpreter: Interpreter, seconds: float) -> None:
+        """Makes the running task wait for some time.
+
+        Args:
+            interpreter: The interpreter running the task.
+            seconds: The time to wait.
+        """
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(target=self.loop.run_forever,
+                                           daemon=True)
+            self.thread.start()
+
+        self.lock.acquire()
+        self.sleeping += 1
+        self.loop.call_soon_threadsafe(self.loop.call_later,
+                                       seconds,
+                                       self._wake,
+                                       interpreter.task)
+        self._block(interpreter.task)
+
+    def call_blocking(self, function: Callable, *arguments: object) -> object:
+        """Calls a Python function that may block, like reading a file, and
+        lets other tasks run until it returns. It runs outside of the turns,
+        so it must not use the interpreter.
+
+        Args:
+            function: The function.
+            arguments: The arguments to call it with.
+
+        Returns:
+            What the function returns.
+        """
+        self.lock.acquire()
+        task = self.running
+        if not self.ready and not self.sleeping and not self.blocking:
+            # No other task could run while the call blocks.
+            self.lock.release()
+            return function(*arguments)
+
+        self.blocking.add(task)
+        task.event.clear()
+        self._next()
+        self.lock.release()
+        try:
+            return function(*arguments)
+        finally:
+            with self.lock:
+                self.blocking.discard(task)
+                if not self.cancelled:
+                    self._resume(task)
+            task.event.wait()
+            if self.cancelled:
+                raise CancelledError()
+
+    def _join(self, interpreter: Interpreter, task: CoffeeBeanTask) -> None:
+        """Makes the running task wait until another task finishes.
+
+        Args:
+            interpreter: The interpreter running the waiting task.
+            task: The task to wait for.
+        """
+        self.lock.acquire()
+        if task.done:
+            self.lock.release()
+            return
+
+        self._check_deadlock(interpreter)
+        task.waiters.append(interpreter.task)
+        self._block(interpreter.task)
+
+    def wait(self, interpreter: Interpreter, task: CoffeeBeanTask) -> object:
+        """Waits for a task to finish.
+
+        Args:
+            interpreter: The interpreter running the waiting task.
+            task: The task to wait for.
+
+        Returns:
+            The task's return value. If the task failed, its error is raised
+            instead.
+        """
+        self._join(interpreter, task)
+        task.joined = True
+        if task.error:
+            raise task.error
+
+        return task.result
+
+    def send(self,
+             interpreter: Interpreter,
+             channel: CoffeeBeanChannel,
+             value: object) -> None:
+        """Sends a value through a channel without waiting.
+
+        Args:
+            interpreter: The interpreter running the sending task.
+            channel: The channel.
+            value: The value.
+        """
+        with self.lock:
+            if not channel.closed:
+                channel.items.append(value)
+                if channel.receivers:
+                    self._resume(channel.receivers.popleft())
+                return
+
+        interpreter._error('Channel is closed.')
+
+    def receive(self,
+                interpreter: Interpreter,
+                channel: CoffeeBeanChannel) -> object:
+        """Receives a value from a channel, waiting for one if it is empty.
+
+        Args:
+            interpreter: The interpreter running the receiving task.
+            channel: The channel.
+
+        Returns:
+            The first value sent and not received yet, or null if the channel
+            is closed and empty.
+        """
+        self.lock.acquire()
+        while not channel.items and not channel.closed:
+            self._check_deadlock(interpreter)
+            channel.receivers.append(interpreter.task)
+            self._block(interpreter.task)
+            self.lock.acquire()
+
+        value = channel.items.popleft() if channel.items else None
+        self.lock.release()
+        return value
+
+    def close(self, channel: CoffeeBeanChannel) -> None:
+        """Closes a channel, and resumes the tasks waiting for a value.
+
+        Args:
+            channel: The channel.
+        """
+        with self.lock:
+            channel.closed = True
+            while channel.receivers:
+                self._resume(channel.receivers.popleft())
+
+    def finish(self, interpreter: Interpreter) -> None:
+        """Waits for every spawned task to finish. The first error from a task
+        that nothing waited for is raised.
+
+        Args:
+            interpreter: The interpreter running the main program.
+        """
+        index = 0
+        while index < len(self.tasks):
+            task = self.tasks[index]
+            self._join(interpreter, task)
+            if task.error and not task.joined:
+                task.joined = True
+                raise task.error
+            index += 1
+
+    def stop(self) -> None:
+        """Unwinds the tasks that haven't finished and stops the timers.
+        """
+        with self.lock:
+            self.cancelled = True
+            for task in self.tasks:
+                task.done = True
+                task.event.set()
+
+        # A task still blocked in a call, like reading a pipe nothing writes
+        # to, is left to end with the process.
+        for task in self.tasks:
+            if task not in self.blocking:
+                task.thread.join()
+
+        if self.loop:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join()
+            self.loop.close()
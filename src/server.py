@@ -0,0 +1,211 @@
+from __future__ import annotations
+import collections
+import io
+import os
+import signal
+import socket
+import sys
+from typing import Dict, Optional, Tuple
+from src.error import *
+from src.interpreter import *
+from src.program import *
+from src.client import *
+
+# The number of parsed programs each worker keeps.
+PROGRAM_CACHE_SIZE = 256
+
+class Server:
+    """Defines a server that runs programs sent over a Unix socket.
+
+    The server forks worker processes that have already imported the
+    interpreter and its built-in functions, and they take turns accepting
+    connections. Each connection sends one request and gets back the program's
+    output and exit status. Workers keep the programs they have parsed, so
+    running a file again only parses it again once it changes. A worker that
+    dies is replaced.
+
+    Attributes:
+        path: The path of the socket.
+        jobs: The number of worker processes.
+        call_threshold: The number of calls before a function tiers up.
+        loop_threshold: The number of iterations before a loop tiers up.
+        limits: The limits on each request's run, or None.
+        file_root: The directory programs can open files in, or None.
+        programs: The programs a worker has parsed, least recently used first.
+        listener: The listening socket.
+        workers: The process IDs of the workers.
+    """
+    def __init__(self,
+                 path: str = SOCKET_PATH,
+                 jobs: int = 1,
+                 call_threshold: int = CALL_THRESHOLD,
+                 loop_threshold: int = LOOP_THRESHOLD,
+                 limits: Optional[Limits] = None,
+                 file_root: Optional[str] = None) -> None:
+        """Constructor.
+
+        Args:
+            path: A path for the socket.
+            jobs: A number of worker processes.
+            call_threshold: A number of calls before a function tiers up.
+            loop_threshold: A number of iterations before a loop tiers up.
+            limits: Limits on the steps, time, call depth and value sizes of
+                each request's run.
+            file_root: A directory programs can open files in, if they have no
+                limits.
+        """
+        self.path = path
+        self.jobs = jobs
+        self.call_threshold = call_threshold
+        self.loop_threshold = loop_threshold
+        self.limits = limits
+        self.file_root = file_root
+        self.programs = collections.OrderedDict()
+        self.listener = None
+        self.workers = set()
+
+    def _program(self, request: Dict[str, object]) -> Program:
+        """Gets the program for a request, parsing it if it isn't cached.
+
+        Args:
+            request: The request.
+
+        Returns:
+            The program.
+        """
+        if 'path' in request:
+            path = str(request['path'])
+            status = os.stat(path)
+            key = ('path', path, status.st_mtime_ns, status.st_size)
+            directory = os.path.dirname(path)
+        else:
+            source = str(request.get('source', ''))
+            directory = request.get('directory')
+            key = ('source', source, directory)
+
+        program = self.programs.get(key)
+        if program:
+            self.programs.move_to_end(key)
+            return program
+
+        if key[0] == 'path':
+            with open(path, 'r') as file:
+                source = file.read()
+
+        program = compile(source,
+                          self.call_threshold,
+                          self.loop_threshold,
+                          directory,
+                          self.limits,
+                          self.file_root)
+        self.programs[key] = program
+        if len(self.programs) > PROGRAM_CACHE_SIZE:
+            self.programs.popitem(last=False)
+
+        return program
+
+    def handle(self, request: Dict[str, object]) -> Dict[str, object]:
+        """Runs the program a request sends. Errors are reported the way
+        `coffee_bean.py` reports them, after the output. Python exceptions the
+        interpreter doesn't turn into runtime errors are reported too, so a
+        bad program never takes the worker down with it.
+
+        Args:
+            request: Either `path`, the absolute path of a source file, or
+                `source`, source code, with `directory` for its imports to be
+                relative to.
+
+        Returns:
+            The response, with the output as `output` and 0, or 1 after an
+            error, as `status`.
+        """
+        output = io.StringIO()
+        status = 0
+        try:
+            self._program(request).run(stdout=output)
+        except OSError:
+            output.write(f"Error: Cannot open file '{request.get('path')}'\n")
+            status = 1
+        except (LexerError, ParserError, RuntimeError) as error:
+            output.write(f'{error}\n')
+            status = 1
+        except Exception as error:
+            output.write(f'Error: {type(error).__name__}: {error}\n')
+            status = 1
+
+        return {'output': output.getvalue(), 'status': status}
+
+    def _work(self) -> None:
+        """Serves connections one at a time in a worker process.
+        """
+        while True:
+            connection, _ = self.listener.accept()
+            with connection, connection.makefile('rwb') as file:
+                request = read_message(file)
+                if request is None:
+                    continue
+
+                try:
+                    write_message(file, self.handle(request))
+                except OSError:
+                    # The client went away before reading the response.
+                    pass
+
+    def _spawn(self) -> None:
+        """Forks a worker process.
+        """
+        pid = os.fork()
+        if pid:
+            self.workers.add(pid)
+            return
+
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            self._work()
+        except KeyboardInterrupt:
+            pass
+        except BaseException:
+            code = 1
+        finally:
+            # Never return into the parent's code.
+            os._exit(code)
+
+    def serve_forever(self) -> None:
+        """Listens on the socket and keeps the workers running until the
+        server is interrupted or terminated.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+        self.listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.listener.bind(self.path)
+        self.listener.listen(128)
+
+        # Terminating the server unwinds it like an interrupt.
+        signal.signal(signal.SIGTERM, lambda signal_number, frame: sys.exit())
+        try:
+            for _ in range(self.jobs):
+                self._spawn()
+
+            while True:
+                pid, _ = os.wait()
+                if pid in self.workers:
+                    self.workers.remove(pid)
+                    self._spawn()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            for pid in self.workers:
+                try:
+                    os.kill(pid, signal.SIGTERM)
+                except OSError:
+                    pass
+            for pid in self.workers:
+                try:
+                    os.waitpid(pid, 0)
+                except OSError:
+                    pass
+
+            self.listener.close()
+            os.remove(self.path)
@@ -20,12 +20,21 @@ class StatementVisitor:
     def visit_while(self, _while: While):
         pass
 
+    def visit_for(self, _for: For):
+        pass
+
     def visit_function(self, function: Function):
         pass
 
     def visit_return(self, _return: Return):
         pass
 
+    def visit_yield(self, _yield: Yield):
+        pass
+
+    def visit_import(self, _import: Import):
+        pass
+
 class Statement:
     """Defines a statement base class.
     """
@@ -131,10 +140,18 @@ class If(Statement):
 class While(Statement):
     """Defines a container for a while statement.
 
+    Attributes:
+        condition: The loop condition.
+        body: The loop body.
+        keyword: The while keyword for error reporting.
     """
-    def __init__(self, condition: Expression, body: Statement) -> None:
+    def __init__(self,
+                 condition: Expression,
+                 body: Statement,
+                 keyword: Optional[Token] = None) -> None:
         self.condition = condition
         self.body = body
+        self.keyword = keyword
 
     def __str__(self) -> str:
         return f'while {self.condition}\n{self.body}'
@@ -142,6 +159,31 @@ class While(Statement):
     def accept(self, visitor: StatementVisitor):
         return visitor.visit_while(self)
 
+class For(Statement):
+    """Defines a container for a for statement.
+
+    Attributes:
+        name: The loop variable.
+        iterable: The array, map, string or range to loop over.
+        body: The loop body.
+        keyword: The for keyword for error reporting.
+    """
+    def __init__(self,
+                 name: Token,
+                 iterable: Expression,
+                 body: Statement,
+                 keyword: Token) -> None:
+        self.name = name
+        self.iterable = iterable
+        self.body = body
+        self.keyword = keyword
+
+    def __str__(self) -> str:
+        return f'for {self.name} in {self.iterable}\n{self.body}'
+
+    def accept(self, visitor: StatementVisitor):
+        return visitor.visit_for(self)
+
 class Function(Statement):
     """Defines a container for a function declaration statement.
     
@@ -149,14 +191,18 @@ class Function(Statement):
         name: The function identifier.
         parameters: The function's parameters.
         body: The function's body.
+        is_generator: If the body has a `yield` statement, so calls return a
+            lazy sequence instead of running the body.
     """
     def __init__(self,
                  name: Token,
                  parameters: List[Token],
-                 body: List[Statement]) -> None:
+                 body: List[Statement],
+                 is_generator: bool = False) -> None:
         self.name = name
         self.parameters = parameters
         self.body = body
+        self.is_generator = is_generator
 
     def __str__(self) -> str:
         return f'function {self.name}(' \
@@ -193,3 +239,59 @@ class Return(Statement):
 
     def accept(self, visitor: StatementVisitor):
         return visitor.visit_return(self)
+
+class Yield(Statement):
+    """Defines a container for a yield statement.
+
+    Attributes:
+        keyword: The yield keyword.
+        value: The value to produce.
+    """
+    def __init__(self, keyword: Token, value: Expression) -> None:
+        """Constructor.
+
+        Args:
+            keyword: A yield keyword.
+            value: A value to produce.
+        """
+        self.keyword = keyword
+        self.value = value
+
+    def __str__(self) -> str:
+        """Formats the yield statement as a string.
+
+        Returns:
+            The yielded value.
+        """
+        return f'yield {self.value}'
+
+    def accept(self, visitor: StatementVisitor):
+        return visitor.visit_yield(self)
+
+class Import(Statement):
+    """Defines a container for an import statement.
+
+    Attributes:
+        keyword: The import keyword for error reporting.
+        path: The module's path, without quotes.
+    """
+    def __init__(self, keyword: Token, path: str) -> None:
+        """Constructor.
+
+        Args:
+            keyword: An import keyword.
+            path: A module path.
+        """
+        self.keyword = keyword
+        self.path = path
+
+    def __str__(self) -> str:
+        """Formats the import statement as a string.
+
+        Returns:
+            The module path.
+        """
+        return f'import "{self.path}"'
+
+    def accept(self, visitor: StatementVisitor):
+        return visitor.visit_import(self)
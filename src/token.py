@@ -51,8 +51,10 @@ class TokenType(Enum):
     ELSE = auto()
     WHILE = auto()
     FOR = auto()
+    IN = auto()
     FUNCTION = auto()
     RETURN = auto()
+    YIELD = auto()
     DO = auto()
     END = auto()
     ECHO = auto()
@@ -0,0 +1,1314 @@
+from __future__ import annotations
+import re
+from typing import Callable, Dict, List, Optional, Union
+from src.error import *
+from src.token import *
+from src.expression import *
+from src.statement import *
+from src.environment import *
+from src.coffee_bean_array import *
+from src.coffee_bean_map import *
+from src.vector import *
+from src.rope import *
+
+# Returned by a transpiled function when its assumptions about the closure no
+# longer hold. The caller falls back to the tree-walk interpreter.
+FALLBACK = object()
+
+# The initial value of a local that is only conditionally assigned.
+UNDEFINED = object()
+
+# The status of a local in a compile-time scope.
+DEFINED = 'defined'
+MAYBE = 'maybe'
+
+NUMBER_KINDS = ['int', 'float', 'number']
+
+COMPARISON_TYPES = [
+    TokenType.EQUAL_EQUAL,
+    TokenType.BANG_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+]
+
+PYTHON_OPERATORS = {
+    TokenType.PLUS: '+',
+    TokenType.MINUS: '-',
+    TokenType.MULTIPLY: '*',
+    TokenType.DIVIDE: '/',
+    TokenType.EQUAL_EQUAL: '==',
+    TokenType.BANG_EQUAL: '!=',
+    TokenType.LESS: '<',
+    TokenType.LESS_EQUAL: '<=',
+    TokenType.GREATER: '>',
+    TokenType.GREATER_EQUAL: '>=',
+}
+
+# Values that can be indexed with `a[i]`.
+INDEXABLE_TYPES = [CoffeeBeanArray, CoffeeBeanMap] + STRING_TYPES
+
+# Values that are falsy for types with a known truthiness.
+TRUTHY_COMPARISONS = {
+    'int': '0',
+    'float': '0.0',
+    'string': "''",
+}
+
+SIMPLE_NAME = re.compile(r'^[A-Za-z_][A-Za-z_0-9]*$')
+TEMPORARY_NAME = re.compile(r'^_t[0-9]+$')
+
+def _values(environment: Environment, name: str) -> Optional[dict]:
+    """Finds the environment that has a variable, skipping read-only ones.
+
+    Args:
+        environment: The innermost environment to search.
+        name: A variable name.
+
+    Returns:
+        The values of the environment with the variable, or None.
+    """
+    while environment:
+        if name in environment.values and not environment.read_only:
+            return environment.values
+        environment = environment.enclosing
+
+    return None
+
+def _error(line: int, message: str) -> None:
+    """Raises a runtime error from transpiled code.
+
+    Args:
+        line: The line number to report.
+        message: An error message.
+    """
+    raise RuntimeError(f'Line {line}\nError: {message}')
+
+class _Scope:
+    """Defines a compile-time scope mirroring a runtime environment.
+
+    Attributes:
+        parent: The enclosing scope.
+        prefix: The prefix of the Python locals backing the scope's variables.
+        values: The Python name of a dictionary backing the scope's variables,
+            or None if they are Python locals.
+        names: Variable names and whether they are always or maybe defined.
+        maybe: Variables read while maybe defined.
+        start: The line index where the scope's code starts.
+        indent: The indentation level of the scope's code.
+    """
+    def __init__(self,
+                 parent: Optional[_Scope],
+                 prefix: str,
+                 start: int,
+                 indent: int,
+                 values: Optional[str] = None) -> None:
+        """Constructor.
+
+        Args:
+            parent: An enclosing scope.
+            prefix: A prefix for the scope's Python locals.
+            start: A line index where the scope's code starts.
+            indent: An indentation level.
+            values: The Python name of a dictionary backing the variables.
+        """
+        self.parent = parent
+        self.prefix = prefix
+        self.values = values
+        self.names = {}
+        self.maybe = set()
+        self.start = start
+        self.indent = indent
+
+    def variable(self, name: str) -> str:
+        """Gets the Python local backing a variable.
+
+        Args:
+            name: A variable name.
+
+        Returns:
+            The Python local's name.
+        """
+        if self.values:
+            return f'{self.values}[{name!r}]'
+
+        return f'{self.prefix}{name}'
+
+    def maybe_read(self, name: str, fallback: str) -> str:
+        """Gets Python source to read a variable that may not be defined.
+
+        Args:
+            name: A variable name.
+            fallback: Python source to read the variable from outer scopes.
+
+        Returns:
+            Python source for the variable's value.
+        """
+        variable = self.variable(name)
+        if self.values:
+            return f'({variable} if {name!r} in {self.values} ' \
+                f'else {fallback})'
+
+        self.maybe.add(name)
+        return f'({variable} if {variable} is not _UNDEFINED ' \
+            f'else {fallback})'
+
+class Transpiler(ExpressionVisitor, StatementVisitor):
+    """Defines a visitor to translate a function declaration into Python source.
+
+    Only a subset of the language is supported: arithmetic, comparisons,
+    logical operators, `if`, `while`, `for`, blocks, locals, arrays, calls,
+    `echo`, `return` and `yield`. Anything else raises a ``TranspilerError``.
+
+    Variables the function creates become Python locals, while variables that
+    already exist in the closure are read and written through the owning
+    environment's dictionary, exactly as the tree-walk interpreter would.
+
+    Attributes:
+        declaration: The function declaration to translate.
+        closure: The environment the function was declared in.
+        name: A description of the translated code.
+        first_line: The line number to report transpiler errors at.
+        lines: Output lines of Python source.
+        constants: Values referenced by the Python source.
+        stable: Python locals that are never reassigned.
+        fresh: Variables the function creates in its own environments.
+        builtins: Variables read from read-only environments, like built-in
+            functions, which must not be defined anywhere else when the code
+            runs.
+        kinds: Static types of temporaries and constants.
+        scope: The current compile-time scope.
+        indent: The current indentation level.
+        line: The line number of the last evaluated literal, if known.
+        metered: If the code counts steps and checks sizes against the
+            interpreter's budget.
+    """
+    def __init__(self,
+                 declaration: Function,
+                 closure: Environment,
+                 metered: bool = False) -> None:
+        """Constructor.
+
+        Args:
+            declaration: A function declaration.
+            closure: The environment the function was declared in.
+            metered: If the code runs under limits.
+        """
+        self.declaration = declaration
+        self.closure = closure
+        self.metered = metered
+        self.name = f'function {declaration.name}'
+        self.first_line = declaration.name.line
+        self._setup('_closure', closure)
+        self.constants['_closure'] = closure
+
+    def _setup(self, environment_code: str, environment: Environment) -> None:
+        """Resets the translation state.
+
+        Args:
+            environment_code: The Python name of the innermost environment
+                outside the translated code.
+            environment: That environment at translation time.
+        """
+        self.lines = []
+        self.constants = {}
+        self.stable = set()
+        self.fresh = set()
+        self.builtins = set()
+        self.kinds = {}
+        self.scope = None
+        self.indent = 1
+        self.line = None
+
+        self._environment_code = environment_code
+        self._count = 0
+        self._writes = 0
+        self._owners = {}
+        self._chain = []
+        self._read_only = []
+        while environment:
+            if environment.read_only:
+                self._read_only.append(environment.values)
+            else:
+                self._chain.append(environment.values)
+            environment = environment.enclosing
+
+    def _unsupported(self, message: str) -> None:
+        """Raises a transpiler error.
+
+        Args:
+            message: An error message.
+        """
+        raise TranspilerError(f'Line {self.first_line}\nError: {message}')
+
+    def _emit(self, line: str) -> None:
+        """Adds a line of Python source at the current indentation.
+
+        Args:
+            line: A line of Python source.
+        """
+        self.lines.append('    ' * self.indent + line)
+
+    def _name(self, prefix: str) -> str:
+        """Creates a unique Python name.
+
+        Args:
+            prefix: A prefix for the name.
+
+        Returns:
+            The new name.
+        """
+        self._count += 1
+        return f'{prefix}{self._count}'
+
+    def _constant(self, value: object, prefix: str = '_k') -> str:
+        """Adds a value to the constants referenced by the Python source.
+
+        Args:
+            value: A value.
+            prefix: A prefix for the constant's name.
+
+        Returns:
+            The constant's name.
+        """
+        name = self._name(prefix)
+        self.constants[name] = value
+        return name
+
+    def _line_code(self) -> str:
+        """Gets the Python source for the line number to report in errors.
+
+        Returns:
+            The static line number, or the interpreter's line if unknown.
+        """
+        if self.line is None:
+            return '_interpreter.line'
+
+        return str(self.line)
+
+    def _error_code(self, message: str) -> str:
+        """Gets the Python source to raise a runtime error.
+
+        Args:
+            message: An error message.
+
+        Returns:
+            A call to the error helper.
+        """
+        return f'_error({self._line_code()}, {message!r})'
+
+    def _is_safe(self, code: str) -> bool:
+        """Checks if evaluating Python source can be deferred or repeated.
+
+        Args:
+            code: Python source for an expression.
+
+        Returns:
+            If the source is a constant or a temporary.
+        """
+        return bool(TEMPORARY_NAME.match(code)) or \
+            code in self.constants or \
+            code in self.stable or \
+            code in ['None', 'True', 'False']
+
+    def _temporary(self, code: str) -> str:
+        """Stores the value of Python source in a temporary.
+
+        Args:
+            code: Python source for an expression.
+
+        Returns:
+            The temporary's name.
+        """
+        if self._is_safe(code):
+            return code
+
+        temporary = self._name('_t')
+        self._emit(f'{temporary} = {code}')
+        if code in self.kinds:
+            self.kinds[temporary] = self.kinds[code]
+
+        return temporary
+
+    def _atom(self, code: str) -> str:
+        """Stores compound Python source in a temporary so it can be reused.
+
+        Args:
+            code: Python source for an expression.
+
+        Returns:
+            A name or constant with the value of the source.
+        """
+        if SIMPLE_NAME.match(code) or self._is_safe(code):
+            return code
+
+        return self._temporary(code)
+
+    def _operands(self, expressions: List[Expression]) -> List[str]:
+        """Translates expressions that are evaluated left to right.
+
+        Earlier operands are stored in temporaries if evaluating a later operand
+        needs statements, so side effects and errors happen in order.
+
+        Args:
+            expressions: Expressions in evaluation order.
+
+        Returns:
+            Python source for each expression.
+        """
+        codes = []
+        for expression in expressions:
+            mark = len(self.lines)
+            writes = self._writes
+            code = self.evaluate(expression)
+            if len(self.lines) > mark:
+                self._materialize(codes, mark, self._writes != writes)
+
+            codes.append(code)
+
+        return codes
+
+    def _materialize(self,
+                     codes: List[str],
+                     mark: int,
+                     writes: bool = True) -> None:
+        """Stores earlier operands in temporaries before a line index.
+
+        Args:
+            codes: Python source for earlier operands. Updated in place.
+            mark: A line index to insert the temporaries at.
+            writes: If locals may be assigned after the line index.
+        """
+        for i, code in enumerate(codes):
+            if self._is_safe(code) or \
+               not writes and SIMPLE_NAME.match(code):
+                continue
+
+            temporary = self._name('_t')
+            self.lines.insert(mark,
+                              '    ' * self.indent + f'{temporary} = {code}')
+            mark += 1
+            if code in self.kinds:
+                self.kinds[temporary] = self.kinds[code]
+            codes[i] = temporary
+
+    def _number(self, code: str) -> str:
+        """Adds a runtime check that a value is a number.
+
+        Args:
+            code: Python source for an expression.
+
+        Returns:
+            A name or constant with the value of the source.
+        """
+        if self.kinds.get(code) in NUMBER_KINDS:
+            return code
+
+        code = self._atom(code)
+        self._emit(f'if {code}.__class__ is not int and ' \
+                   f'{code}.__class__ is not float:')
+        self._emit(f'    {self._error_code("Expected type int or float")}')
+        return code
+
+    def _boolean(self, code: str) -> str:
+        """Converts a value to a boolean with the interpreter's truthiness.
+
+        Args:
+            code: Python source for an expression.
+
+        Returns:
+            Python source for the boolean.
+        """
+        kind = self.kinds.get(code)
+        if kind == 'bool':
+            return code
+        elif kind in TRUTHY_COMPARISONS:
+            return f'({code} != {TRUTHY_COMPARISONS[kind]})'
+
+        return f'_interpreter._to_boolean({code})'
+
+    def _in_outer_scope(self, name: str, scope: Optional[_Scope]) -> bool:
+        """Checks if a variable may exist outside a scope.
+
+        Args:
+            name: A variable name.
+            scope: The scope enclosing the scope to check from.
+
+        Returns:
+            If an enclosing scope or the closure may have the variable.
+        """
+        while scope:
+            if name in scope.names:
+                return True
+            scope = scope.parent
+
+        return self._owner(name) is not None
+
+    def _owner(self, name: str) -> Optional[str]:
+        """Finds the closure environment that has a variable.
+
+        Args:
+            name: A variable name.
+
+        Returns:
+            The constant for the environment's values, or None.
+        """
+        if name in self._owners:
+            return self._owners[name]
+
+        owner = None
+        for values in self._chain:
+            if name in values:
+                owner = self._constant(values, '_o')
+                break
+
+        self._owners[name] = owner
+        return owner
+
+    def _builtin(self, name: str) -> Optional[str]:
+        """Finds the read-only environment that has a variable.
+
+        Args:
+            name: A variable name.
+
+        Returns:
+            The constant for the environment's values, or None.
+        """
+        for values in self._read_only:
+            if name in values:
+                self.builtins.add(name)
+                return self._constant(values, '_n')
+
+        return None
+
+    def _read(self, name: Token, scope: Optional[_Scope] = None) -> str:
+        """Translates a variable read.
+
+        Args:
+            name: An identifier token with a variable name.
+            scope: The scope to resolve the variable from.
+
+        Returns:
+            Python source for the variable's value.
+        """
+        symbol = name.symbol
+        while scope:
+            status = scope.names.get(symbol)
+            if status == DEFINED:
+                return scope.variable(symbol)
+            elif status == MAYBE:
+                fallback = self._read(name, scope.parent)
+                return scope.maybe_read(symbol, fallback)
+
+            scope = scope.parent
+
+        owner = self._owner(symbol)
+        if owner:
+            return f'{owner}[{symbol!r}]'
+
+        builtins = self._builtin(symbol)
+        if builtins:
+            return f'{builtins}[{symbol!r}]'
+
+        return f'{self._environment_code}.get({self._constant(name)})'
+
+    def _write(self, name: Token) -> str:
+        """Translates the target of a variable write.
+
+        Args:
+            name: An identifier token with a variable name.
+
+        Returns:
+            Python source for the assignment target.
+        """
+        symbol = name.symbol
+        scope = self.scope
+        while scope:
+            status = scope.names.get(symbol)
+            if status == DEFINED:
+                return scope.variable(symbol)
+            elif status == MAYBE:
+                if scope is not self.scope or \
+                   self._in_outer_scope(symbol, scope.parent):
+                    self._unsupported(f"Ambiguous scope for '{symbol}'.")
+
+                scope.names[symbol] = DEFINED
+                return scope.variable(symbol)
+
+            scope = scope.parent
+
+        owner = self._owner(symbol)
+        if owner:
+            return f'{owner}[{symbol!r}]'
+
+        self.scope.names[symbol] = DEFINED
+        self.fresh.add(symbol)
+        return self.scope.variable(symbol)
+
+    def _snapshot(self) -> List[tuple]:
+        """Copies the variable statuses of the current scopes.
+
+        Returns:
+            Each scope with a copy of its variable statuses.
+        """
+        snapshot = []
+        scope = self.scope
+        while scope:
+            snapshot.append((scope, dict(scope.names)))
+            scope = scope.parent
+
+        return snapshot
+
+    def _weaken(self, snapshot: List[tuple]) -> None:
+        """Marks variables defined since a snapshot as maybe defined.
+
+        Args:
+            snapshot: Scopes with earlier copies of their variable statuses.
+        """
+        for scope, names in snapshot:
+            for name, status in list(scope.names.items()):
+                if names.get(name) != DEFINED:
+                    scope.names[name] = MAYBE
+
+    def _enter(self, prefix: str, values: Optional[str] = None) -> _Scope:
+        """Enters a new scope.
+
+        Args:
+            prefix: A prefix for the scope's Python locals.
+            values: The Python name of a dictionary backing the variables.
+
+        Returns:
+            The new scope.
+        """
+        self.scope = _Scope(self.scope,
+                            prefix,
+                            len(self.lines),
+                            self.indent,
+                            values)
+        return self.scope
+
+    def _exit(self) -> None:
+        """Exits the current scope. Initializes locals that are read while maybe
+        defined.
+        """
+        scope = self.scope
+        for name in sorted(scope.maybe):
+            self.lines.insert(scope.start,
+                              '    ' * scope.indent +
+                              f'{scope.variable(name)} = _UNDEFINED')
+
+        self.scope = scope.parent
+
+    def _suite(self, statement: Statement) -> None:
+        """Translates a statement as the body of a Python compound statement.
+
+        Args:
+            statement: A statement.
+        """
+        self.indent += 1
+        mark = len(self.lines)
+        statement.accept(self)
+        if len(self.lines) == mark:
+            self._emit('pass')
+        self.indent -= 1
+
+    def _step(self, loop: Union[While, For]) -> None:
+        """Counts a loop iteration against the budget, inlining the countdown
+        of `Budget.step`.
+
+        Args:
+            loop: The while or for statement, whose line errors are reported at.
+        """
+        if self.metered:
+            self._emit('_b.countdown -= 1')
+            self._emit('if _b.countdown < 0:')
+            self._emit(f'    _interpreter.line = {loop.keyword.line}')
+            self._emit('    _b.check(_interpreter)')
+
+    def _branch(self, statement: Statement) -> None:
+        """Translates a statement that may or may not be executed.
+
+        Args:
+            statement: A statement.
+        """
+        snapshot = self._snapshot()
+        self._suite(statement)
+        self._weaken(snapshot)
+
+    def visit_literal(self, literal: Literal) -> str:
+        literal_type = literal.value.token_type
+        literal_symbol = literal.value.symbol
+        self.line = literal.value.line
+
+        if literal_type == TokenType.NULL:
+            return 'None'
+        elif literal_type == TokenType.TRUE:
+            return 'True'
+        elif literal_type == TokenType.FALSE:
+            return 'False'
+        elif literal_type in [TokenType.STRING, TokenType.CHARACTER]:
+            code = self._constant(str(literal_symbol[1:-1]))
+            self.kinds[code] = 'string'
+            return code
+        elif literal_type == TokenType.INTEGER:
+            code = self._constant(int(literal_symbol))
+            self.kinds[code] = 'int'
+            return code
+        elif literal_type == TokenType.FLOAT:
+            code = self._constant(float(literal_symbol))
+            self.kinds[code] = 'float'
+            return code
+        elif literal_type == TokenType.IDENTIFIER:
+            return self._read(literal.value, self.scope)
+
+        return 'None'
+
+    def visit_array(self, array: Array) -> str:
+        codes = self._operands(array.expressions)
+        code = self._temporary('_Array([' + ', '.join(codes) + '])')
+        self.kinds[code] = 'array'
+        return code
+
+    def visit_map(self, _map: Map) -> str:
+        codes = []
+        for key, value in zip(_map.keys, _map.values):
+            for expression in [key, value]:
+                mark = len(self.lines)
+                writes = self._writes
+                code = self.evaluate(expression)
+                if len(self.lines) > mark:
+                    self._materialize(codes, mark, self._writes != writes)
+
+                # Each key is checked before its value is evaluated.
+                if expression is key:
+                    if self.line is not None:
+                        self._emit(f'_interpreter.line = {self.line}')
+                    code = self._temporary(f'_interpreter._check_key({code})')
+                codes.append(code)
+
+        pairs = [f'{codes[i]}: {codes[i + 1]}' for i in range(0, len(codes), 2)]
+        code = self._temporary('_Map({' + ', '.join(pairs) + '})')
+        self.kinds[code] = 'map'
+        return code
+
+    def _may_be_zero(self, code: str) -> bool:
+        """Checks if a divisor can be zero.
+
+        Args:
+            code: Python source for the divisor.
+
+        Returns:
+            False if the source is a constant number other than zero.
+        """
+        value = self.constants.get(code)
+        return type(value) not in [int, float] or value == 0
+
+    def _check_divisor(self, code: str) -> None:
+        """Adds a runtime check that a number isn't zero, since dividing by it
+        would raise a Python error.
+
+        Args:
+            code: A name or constant with the divisor.
+        """
+        self._emit(f'if {code} == 0:')
+        self._emit(f'    {self._error_code("Cannot divide by zero.")}')
+
+    def visit_binary(self, binary: Binary) -> str:
+        operator_type = binary.operator.token_type
+        if operator_type not in PYTHON_OPERATORS:
+            return 'None'
+
+        left, right = self._operands([binary.left, binary.right])
+        operator = PYTHON_OPERATORS[operator_type]
+        if operator_type in [TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL]:
+            code = f'({left} {operator} {right})'
+            self.kinds[code] = 'bool'
+            return code
+
+        kinds = [self.kinds.get(left), self.kinds.get(right)]
+        if all(kind in NUMBER_KINDS for kind in kinds):
+            if operator_type == TokenType.DIVIDE and self._may_be_zero(right):
+                left = self._atom(left)
+                right = self._atom(right)
+                self._check_divisor(right)
+            code = f'({left} {operator} {right})'
+            self.kinds[code] = 'bool' if operator_type in COMPARISON_TYPES \
+                else 'number'
+            return code
+
+        # Both operands are evaluated before either is checked.
+        left = self._atom(left)
+        right = self._atom(right)
+        code = self._name('_t')
+        if operator_type not in COMPARISON_TYPES:
+            # Numbers take the fast path, and anything else is handled by the
+            # interpreter, which joins strings and applies operators to arrays.
+            checks = [f'({operand}.__class__ is int or ' \
+                      f'{operand}.__class__ is float)'
+                      for operand, kind in zip([left, right], kinds)
+                      if kind not in NUMBER_KINDS]
+            self._emit(f'if {" and ".join(checks)}:')
+            if operator_type == TokenType.DIVIDE and self._may_be_zero(right):
+                self.indent += 1
+                self._check_divisor(right)
+                self.indent -= 1
+            self._emit(f'    {code} = ({left} {operator} {right})')
+            self._emit('else:')
+            if self.line is not None:
+                self._emit(f'    _interpreter.line = {self.line}')
+            self._emit(f'    {code} = _interpreter._arithmetic(' \
+                       f'_TokenType.{operator_type.name}, {left}, {right})')
+            if not any(kind in [None, 'array', 'string'] for kind in kinds):
+                self.kinds[code] = 'number'
+            return code
+
+        vector = any(kind in [None, 'array'] for kind in kinds)
+        if vector:
+            self._emit(f'if {left}.__class__ is _Array or ' \
+                       f'{right}.__class__ is _Array:')
+            if self.line is not None:
+                self._emit(f'    _interpreter.line = {self.line}')
+            self._emit(f'    {code} = _vector_binary(_interpreter, ' \
+                       f'_TokenType.{operator_type.name}, {left}, {right})')
+            self._emit('else:')
+            self.indent += 1
+
+        self._emit(f'{code} = ({left} {operator} {right})')
+
+        if vector:
+            self.indent -= 1
+        else:
+            self.kinds[code] = 'bool'
+        return code
+
+    def visit_unary(self, unary: Unary) -> str:
+        operator_type = unary.operator.token_type
+        right = self.evaluate(unary.right)
+
+        if operator_type in [TokenType.PLUS, TokenType.MINUS]:
+            kind = self.kinds.get(right)
+            right = self._number(right)
+            code = f'({PYTHON_OPERATORS[operator_type]}{right})'
+            self.kinds[code] = kind if kind in NUMBER_KINDS else 'number'
+            return code
+        elif operator_type in [TokenType.BANG, TokenType.NOT]:
+            code = f'(not {self._boolean(right)})'
+            self.kinds[code] = 'bool'
+            return code
+
+        return 'None'
+
+    def visit_grouping(self, grouping: Grouping) -> str:
+        return self.evaluate(grouping.expression)
+
+    def visit_assignment(self, assignment: Assignment) -> str:
+        value = self.evaluate(assignment.value)
+        target = self._write(assignment.name)
+        self._emit(f'{target} = {value}')
+        self._writes += 1
+
+        return target
+
+    def visit_logical(self, logical: Logical) -> str:
+        operator_type = logical.operator.token_type
+        left = self.evaluate(logical.left)
+        code = self._name('_t')
+        self._emit(f'{code} = {left}')
+        if left in self.kinds:
+            self.kinds[code] = self.kinds[left]
+
+        if operator_type == TokenType.OR:
+            self._emit(f'if not {self._boolean(code)}:')
+        else:
+            self._emit(f'if {self._boolean(code)}:')
+
+        snapshot = self._snapshot()
+        self.indent += 1
+        right = self.evaluate(logical.right)
+        self._emit(f'{code} = {right}')
+        self.indent -= 1
+        self._weaken(snapshot)
+
+        if self.kinds.get(code) != 'bool' or self.kinds.get(right) != 'bool':
+            self.kinds.pop(code, None)
+        return code
+
+    def visit_call(self, call: Call) -> str:
+        codes = self._operands([call.callee] + call.arguments)
+        if self.line is not None:
+            self._emit(f'_interpreter.line = {self.line}')
+
+        # Built-in functions are called directly when the arity matches.
+        callee = self._atom(codes[0])
+        arguments = ', '.join(codes[1:])
+        code = self._name('_t')
+        self._emit(f'if {callee}.__class__ is _Native and ' \
+                   f'{callee}.argument_count == {len(codes) - 1}:')
+        self._emit(f'    {code} = {callee}.function(' \
+                   f'{", ".join(["_interpreter"] + codes[1:])})')
+        self._emit('else:')
+        self._emit(f'    {code} = _interpreter._call({callee}, [{arguments}])')
+        self.line = None
+        return code
+
+    def visit_index(self, index: Index) -> str:
+        if index.is_slice:
+            # The array is read before the start and end are evaluated.
+            codes = [self._read(index.name, self.scope)]
+            for expression in [index.index, index.end]:
+                mark = len(self.lines)
+                writes = self._writes
+                code = 'None' if expression is None \
+                    else self.evaluate(expression)
+                if len(self.lines) > mark:
+                    self._materialize(codes, mark, self._writes != writes)
+                codes.append(code)
+
+            if self.line is not None:
+                self._emit(f'_interpreter.line = {self.line}')
+            return self._temporary(f'_interpreter._slice({", ".join(codes)})')
+
+        array = self._atom(self._read(index.name, self.scope))
+        kind = self.kinds.get(array)
+        if not index.in_bounds and kind not in ['array', 'map', 'string']:
+            self._emit(f'if {array}.__class__ not in _INDEXABLE_TYPES:')
+            message = 'Can only index arrays, maps and strings.'
+            self._emit(f'    {self._error_code(message)}')
+
+        mark = len(self.lines)
+        writes = self._writes
+        value = self.evaluate(index.index)
+        if len(self.lines) > mark:
+            codes = [array]
+            self._materialize(codes, mark, self._writes != writes)
+            array = codes[0]
+
+        if index.in_bounds:
+            return f'{array}.values[{value}]'
+
+        value = self._atom(value)
+        if kind == 'array':
+            self._check_index(array, value)
+            return f'{array}.values[{value}]'
+
+        code = self._name('_t')
+        if kind != 'map':
+            self._emit(f'if {array}.__class__ is _Array:')
+            self.indent += 1
+            self._check_index(array, value)
+            self._emit(f'{code} = {array}.values[{value}]')
+            self.indent -= 1
+            self._emit('else:')
+            self.indent += 1
+
+        if self.line is not None:
+            self._emit(f'_interpreter.line = {self.line}')
+        getter = '_get_key' if kind == 'map' else '_index'
+        self._emit(f'{code} = _interpreter.{getter}({array}, {value})')
+        if kind != 'map':
+            self.indent -= 1
+
+        return code
+
+    def _check_index(self, array: str, value: str) -> None:
+        """Adds runtime checks that an array index is an int in range.
+
+        Args:
+            array: A name or constant holding an array.
+            value: A name or constant holding the index.
+        """
+        if self.kinds.get(value) != 'int':
+            self._emit(f'if {value}.__class__ is not int:')
+            self._emit(f'    {self._error_code("Can only index with type int.")}')
+            self._emit(f'elif not 0 <= {value} < len({array}.values):')
+        else:
+            self._emit(f'if not 0 <= {value} < len({array}.values):')
+        self._emit(f'    {self._error_code("Index out of range.")}')
+
+    def visit_array_assignment(self,
+                               array_assignment: ArrayAssignment) -> str:
+        value = self.evaluate(array_assignment.value)
+        array = self._read(array_assignment.index.name, self.scope)
+        codes = [value, array]
+
+        mark = len(self.lines)
+        writes = self._writes
+        index = self.evaluate(array_assignment.index.index)
+        if len(self.lines) > mark:
+            self._materialize(codes, mark, self._writes != writes)
+
+        # The value, the array and then the index are evaluated before
+        # storing, like the tree-walk interpreter.
+        if array_assignment.index.in_bounds:
+            value = self._atom(codes[0])
+            self._emit(f'{codes[1]}.set({index}, {value})')
+            return 'None'
+
+        value, array, index = [self._atom(code) for code in codes + [index]]
+        kind = self.kinds.get(array)
+        if kind != 'map':
+            if kind != 'array':
+                self._emit(f'if {array}.__class__ is not _Map:')
+                self.indent += 1
+                self._emit(f'if {array}.__class__ is not _Array:')
+                self._emit(f'    ' \
+                           f'{self._error_code("Can only index arrays and maps.")}')
+            self._check_index(array, index)
+            self._emit(f'{array}.set({index}, {value})')
+            if kind == 'array':
+                return 'None'
+
+            self.indent -= 1
+            self._emit('else:')
+            self.indent += 1
+
+        if self.line is not None:
+            self._emit(f'_interpreter.line = {self.line}')
+        self._emit(f'{array}.values[_interpreter._check_key({index})] = {value}')
+        if self.metered:
+            self._emit(f'_b.check_size(_interpreter, len({array}.values), ' \
+                       f'"entries")')
+        if kind != 'map':
+            self.indent -= 1
+
+        return 'None'
+
+    def evaluate(self, expression: Expression) -> str:
+        """Translates an expression.
+
+        Args:
+            expression: An expression.
+
+        Returns:
+            Python source for the expression's value.
+        """
+        code = expression.accept(self)
+        if code is None:
+            self._unsupported('Unsupported expression.')
+
+        # Types inferred for variables hold everywhere, so they can be
+        # remembered for the variable's Python name too.
+        if expression.static_type and code not in self.kinds:
+            self.kinds[code] = expression.static_type
+
+        return code
+
+    def visit_expression(self, expression: ExpressionStatement) -> None:
+        code = self.evaluate(expression.expression)
+        if not SIMPLE_NAME.match(code) and not self._is_safe(code):
+            self._emit(code)
+
+    def visit_echo(self, echo: Echo) -> None:
+        value = self.evaluate(echo.expression)
+        self._emit(f'_interpreter._echo({value})')
+
+    def visit_block(self, block: Block) -> None:
+        self._enter(self._name('v') + '_')
+        for statement in block.statements:
+            statement.accept(self)
+        self._exit()
+
+    def visit_if(self, _if: If) -> None:
+        condition = self._boolean(self.evaluate(_if.condition))
+        self._emit(f'if {condition}:')
+
+        snapshot = self._snapshot()
+        self._suite(_if.then)
+        then = self._snapshot()
+        for scope, names in snapshot:
+            scope.names = dict(names)
+
+        if _if._else:
+            self._emit('else:')
+            self._suite(_if._else)
+
+        # A variable is only defined after the if statement if both branches
+        # define it.
+        for (scope, names), (_, then_names) in zip(snapshot, then):
+            for name in set(then_names) | set(scope.names):
+                if names.get(name) == DEFINED:
+                    continue
+                elif _if._else and then_names.get(name) == DEFINED and \
+                     scope.names.get(name) == DEFINED:
+                    scope.names[name] = DEFINED
+                else:
+                    scope.names[name] = MAYBE
+
+    def _emit_while(self, _while: While) -> None:
+        """Translates a while statement.
+
+        Args:
+            _while: A while statement.
+        """
+        header = len(self.lines)
+        self._emit('while True:')
+        self.indent += 1
+        condition = self.evaluate(_while.condition)
+        if len(self.lines) == header + 1:
+            self.lines[header] = '    ' * (self.indent - 1) + \
+                f'while {condition}:'
+        else:
+            self._emit(f'if not {condition}:')
+            self._emit('    break')
+        self._step(_while)
+        self.indent -= 1
+
+        self._branch(_while.body)
+
+    def visit_while(self, _while: While) -> None:
+        # Variables defined by one iteration may be read by the next, so
+        # translate the loop once to find them and then mark them as maybe
+        # defined for the real translation.
+        snapshot = self._snapshot()
+        mark = len(self.lines)
+        indent = self.indent
+        line = self.line
+        self._emit_while(_while)
+        del self.lines[mark:]
+        self.indent = indent
+        self.line = line
+        self._weaken(snapshot)
+
+        snapshot = self._snapshot()
+        self._emit_while(_while)
+        self._weaken(snapshot)
+
+    def _emit_for(self, _for: For, iterator: str) -> None:
+        """Translates a for statement.
+
+        Args:
+            _for: A for statement.
+            iterator: Python source for the iterator to loop over.
+        """
+        self._emit(f'for {self._write(_for.name)} in {iterator}:')
+        self.indent += 1
+        self._step(_for)
+        self.indent -= 1
+        self._branch(_for.body)
+
+    def _translate_for(self, _for: For, iterator: str) -> None:
+        """Translates a for statement twice, like a while statement.
+
+        Args:
+            _for: A for statement.
+            iterator: Python source for the iterator to loop over.
+        """
+        snapshot = self._snapshot()
+        mark = len(self.lines)
+        indent = self.indent
+        line = self.line
+        self._emit_for(_for, iterator)
+        del self.lines[mark:]
+        self.indent = indent
+        self.line = line
+        self._weaken(snapshot)
+
+        # The loop variable is only defined after the loop if it ran at least
+        # once.
+        snapshot = self._snapshot()
+        self._emit_for(_for, iterator)
+        self._weaken(snapshot)
+
+    def visit_for(self, _for: For) -> None:
+        iterable = self._atom(self.evaluate(_for.iterable))
+        if self.line is not None:
+            self._emit(f'_interpreter.line = {self.line}')
+        self._translate_for(_for, f'_interpreter._iterate({iterable})')
+
+    def visit_function(self, function: Function) -> None:
+        self._unsupported('Cannot transpile nested functions.')
+
+    def visit_return(self, _return: Return) -> None:
+        value = self.evaluate(_return.value)
+        self._emit(f'return {value}')
+
+    def visit_yield(self, _yield: Yield) -> None:
+        value = self.evaluate(_yield.value)
+        self._emit(f'yield {value}')
+
+    def transpile(self) -> str:
+        """Translates the function declaration.
+
+        Returns:
+            Python source defining a factory that creates the function.
+        """
+        self._enter('v_')
+        parameters = []
+        for i, parameter in enumerate(self.declaration.parameters):
+            argument = f'_a{i}'
+            parameters.append(argument)
+            self.scope.names[parameter.symbol] = DEFINED
+            self._emit(f'{self.scope.variable(parameter.symbol)} = {argument}')
+
+        for statement in self.declaration.body:
+            statement.accept(self)
+        self._emit('return None')
+        self._exit()
+
+        # A generator function becomes a Python generator. The guards still
+        # run when it is called, and the body once the first value is needed.
+        if self.declaration.is_generator:
+            self.lines = ['    def _generator():'] + \
+                ['    ' + line for line in self.lines] + \
+                ['    return _generator()']
+
+        # Variables the function creates must not exist in the closure when
+        # it is called, or the tree-walk interpreter would assign the closure.
+        # Neither may variables that shadow the built-in functions it reads.
+        guards = []
+        for values in self._chain:
+            constant = self._constant(values, '_c')
+            guards += [f'{name!r} in {constant}'
+                       for name in sorted(self.fresh | self.builtins)]
+        self._guard(guards)
+
+        return self._source(['_interpreter'] + parameters)
+
+    def _guard(self, conditions: List[str]) -> None:
+        """Adds a check at the start of the translated code that falls back to
+        the tree-walk interpreter.
+
+        Args:
+            conditions: Python source for conditions that each need a fallback.
+        """
+        if conditions:
+            self.lines.insert(0, f'        return _FALLBACK')
+            self.lines.insert(0, f'    if {" or ".join(conditions)}:')
+
+    def _source(self, parameters: List[str]) -> str:
+        """Wraps the translated lines in a Python function.
+
+        Args:
+            parameters: The Python function's parameters.
+
+        Returns:
+            Python source defining a factory that creates the function.
+        """
+        constants = ', '.join(self.constants)
+        source = [
+            f'def _factory({constants}):',
+            f'  def _function({", ".join(parameters)}):',
+        ]
+        if self.metered:
+            source.append('      _b = _interpreter.budget')
+        source += ['  ' + line for line in self.lines]
+        source.append('  return _function')
+        return '\n'.join(source) + '\n'
+
+    def compile(self) -> Callable:
+        """Translates and compiles the code.
+
+        Returns:
+            A Python function taking the interpreter and the arguments.
+        """
+        # Imported here since the language objects import the transpiler.
+        from src.language_object import CoffeeBeanNative
+
+        source = self.transpile()
+        namespace = {
+            '_error': _error,
+            '_values': _values,
+            '_UNDEFINED': UNDEFINED,
+            '_FALLBACK': FALLBACK,
+            '_ReturnError': ReturnError,
+            '_Array': CoffeeBeanArray,
+            '_Map': CoffeeBeanMap,
+            '_vector_binary': vector_binary,
+            '_TokenType': TokenType,
+            '_INDEXABLE_TYPES': INDEXABLE_TYPES,
+            '_Native': CoffeeBeanNative,
+        }
+        try:
+            code = compile(source, f'<{self.name}>', 'exec')
+        except SyntaxError:
+            self._unsupported('Cannot compile the generated source.')
+
+        exec(code, namespace)
+        return namespace['_factory'](*self.constants.values())
+
+class LoopTranspiler(Transpiler):
+    """Defines a visitor to translate a hot while or for loop into Python
+    source.
+
+    The loop runs in the environment it was entered from, so variables it
+    creates outside of blocks are stored in that environment. Variables are
+    resolved again each time the loop is entered, and the translated code falls
+    back to the tree-walk interpreter if they no longer resolve the same way.
+
+    A for loop takes the iterator the tree-walk interpreter was using as an
+    argument, so it carries on from the next element. A loop that yields
+    becomes a Python generator, which returns ``_FALLBACK`` instead.
+
+    Attributes:
+        loop: The while or for statement to translate.
+        environment: The environment the loop was entered from.
+    """
+    def __init__(self,
+                 loop: Union[While, For],
+                 environment: Environment,
+                 metered: bool = False) -> None:
+        """Constructor.
+
+        Args:
+            loop: A while or for statement.
+            environment: The environment the loop was entered from.
+            metered: If the code runs under limits.
+        """
+        self.loop = loop
+        self.environment = environment
+        self.metered = metered
+        keyword = 'for' if type(loop) == For else 'while'
+        self.name = f'{keyword} loop at line {loop.keyword.line}'
+        self.first_line = loop.keyword.line
+        self._setup('_environment', environment)
+
+    def _owner(self, name: str) -> Optional[str]:
+        if name in self._owners:
+            return self._owners[name]
+
+        owner = None
+        if any(name in values for values in self._chain):
+            owner = self._name('_o')
+            self.stable.add(owner)
+
+        self._owners[name] = owner
+        return owner
+
+    def visit_return(self, _return: Return) -> None:
+        value = self.evaluate(_return.value)
+        self._emit(f'raise _ReturnError({value})')
+
+    def transpile(self) -> str:
+        """Translates the loop.
+
+        Returns:
+            Python source defining a factory that creates the loop's function.
+        """
+        self._enter('v_', '_e')
+        parameters = ['_interpreter', '_environment']
+        if isinstance(self.loop, For):
+            self._translate_for(self.loop, '_iterator')
+            parameters.append('_iterator')
+        else:
+            self.loop.accept(self)
+        self._emit('return None')
+        self.scope = None
+
+        # Variables that existed when the loop was translated must still exist,
+        # and variables it creates must not.
+        conditions = []
+        for name, owner in self._owners.items():
+            if owner:
+                conditions.append(f'{owner} is None')
+        conditions += [f'_values(_environment, {name!r}) is not None'
+                       for name in sorted(self.fresh | self.builtins)]
+        self._guard(conditions)
+
+        resolve = [f'    _e = _environment.values']
+        for name, owner in self._owners.items():
+            if owner:
+                resolve.append(f'    {owner} = _values(_environment, {name!r})')
+        self.lines[0:0] = resolve
+
+        return self._source(parameters)
@@ -0,0 +1,453 @@
+from __future__ import annotations
+from typing import Dict, List, Optional, Set
+from src.error import *
+from src.token import *
+from src.expression import *
+from src.statement import *
+from src.environment import *
+
+ANY = 'any'
+
+NUMBER_TYPES = ['int', 'float', 'number']
+
+LITERAL_TYPES = {
+    TokenType.NULL: 'null',
+    TokenType.TRUE: 'bool',
+    TokenType.FALSE: 'bool',
+    TokenType.STRING: 'string',
+    TokenType.CHARACTER: 'string',
+    TokenType.INTEGER: 'int',
+    TokenType.FLOAT: 'float',
+}
+
+COMPARISON_TYPES = [
+    TokenType.EQUAL_EQUAL,
+    TokenType.BANG_EQUAL,
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+]
+
+def static_type(types: Set[str]) -> Optional[str]:
+    """Converts a set of possible types into a static type.
+
+    Args:
+        types: The possible types of a value.
+
+    Returns:
+        `int`, `float`, `number`, `bool`, `string`, `array`, `map` or
+        `sequence` if the value always has that type, or None.
+    """
+    if not types or ANY in types:
+        return None
+    elif len(types) == 1:
+        return next(iter(types))
+    elif types <= {'int', 'float'}:
+        return 'number'
+
+    return None
+
+class TypeInferrer(ExpressionVisitor, StatementVisitor):
+    """Defines a flow-insensitive type inference pass.
+
+    Each variable name gets the union of the types of every value assigned to
+    it anywhere in the program, which is repeated until nothing changes.
+    Expressions are then annotated with their static type, and arithmetic whose
+    operands are always numbers is marked so the executor can skip its checks.
+
+    Parameters get the types of the arguments at each call site, unless the
+    function is used as a value, in which case they can be anything.
+
+    Names an imported module defines can have any type, since the program may
+    read them before assigning its own variable with the same name. Without a
+    loader to find those names, a program with imports is treated as open.
+
+    Attributes:
+        closed: If the statements are the whole program. Otherwise every
+            variable can have any type, since unseen code may assign it.
+        loader: The loader for the modules the program imports, or None.
+        external: Variables defined before the program runs or by imported
+            modules.
+        variables: Variable names and their possible types.
+        functions: Function names and their declarations.
+        arguments: Function declarations and the possible types of each
+            parameter.
+        returns: Function declarations and their possible return types.
+        escaped: Function names used as values.
+        changed: If any possible types changed in the current pass.
+    """
+    def __init__(self,
+                 environment: Optional[Environment] = None,
+                 closed: bool = True,
+                 loader: Optional[ModuleLoader] = None) -> None:
+        """Constructor.
+
+        Args:
+            environment: The environment the program runs in.
+            closed: If the statements are the whole program.
+            loader: The loader for the modules the program imports.
+        """
+        self.closed = closed
+        self.loader = loader
+        self.external = set()
+        while environment:
+            self.external.update(environment.values)
+            environment = environment.enclosing
+
+        self.variables = {}
+        self.functions = {}
+        self.arguments = {}
+        self.returns = {}
+        self.escaped = set()
+        self.changed = False
+
+        self._function = None
+
+    def _add(self, name: str, types: Set[str]) -> None:
+        """Adds possible types to a variable.
+
+        Args:
+            name: A variable name.
+            types: Possible types.
+        """
+        variable = self.variables.setdefault(name, set())
+        if not types <= variable:
+            variable.update(types)
+            self.changed = True
+
+    def _lookup(self, name: str) -> Set[str]:
+        """Gets the possible types of a variable.
+
+        Args:
+            name: A variable name.
+
+        Returns:
+            The possible types.
+        """
+        if not self.closed or name in self.external:
+            return {ANY}
+
+        return self.variables.get(name, set())
+
+    def _is_known_function(self, name: str) -> bool:
+        """Checks if every call through a name is visible to the pass.
+
+        Args:
+            name: A variable name.
+
+        Returns:
+            If the name is only bound to functions and never used as a value.
+        """
+        return self.closed and \
+            name in self.functions and \
+            name not in self.external and \
+            name not in self.escaped and \
+            self.variables.get(name) == {'function'}
+
+    def _numbers(self, types: Set[str]) -> Set[str]:
+        """Gets the number types a checked number operand can have.
+
+        Args:
+            types: The possible types of the operand.
+
+        Returns:
+            `int`, `float` or both.
+        """
+        numbers = types & {'int', 'float'}
+        if not numbers or not types <= {'int', 'float'}:
+            return {'int', 'float'}
+
+        return numbers
+
+    def _always_returns(self, statements: List[Statement]) -> bool:
+        """Checks if statements always end in a return statement.
+
+        Args:
+            statements: Statements.
+
+        Returns:
+            If the last statement returns on every path.
+        """
+        if not statements:
+            return False
+
+        last = statements[-1]
+        if isinstance(last, Return):
+            return True
+        elif isinstance(last, Block):
+            return self._always_returns(last.statements)
+        elif isinstance(last, If) and last._else:
+            return self._always_returns([last.then]) and \
+                self._always_returns([last._else])
+
+        return False
+
+    def infer(self, expression: Expression) -> Set[str]:
+        """Infers and annotates the possible types of an expression.
+
+        Args:
+            expression: An expression.
+
+        Returns:
+            The possible types.
+        """
+        types = expression.accept(self)
+        expression.static_type = static_type(types)
+
+        return types
+
+    def visit_literal(self, literal: Literal) -> Set[str]:
+        literal_type = literal.value.token_type
+        if literal_type == TokenType.IDENTIFIER:
+            self.escaped.add(literal.value.symbol)
+            return set(self._lookup(literal.value.symbol))
+
+        return {LITERAL_TYPES[literal_type]}
+
+    def visit_array(self, array: Array) -> Set[str]:
+        for expression in array.expressions:
+            self.infer(expression)
+
+        return {'array'}
+
+    def visit_map(self, _map: Map) -> Set[str]:
+        for key, value in zip(_map.keys, _map.values):
+            self.infer(key)
+            self.infer(value)
+
+        return {'map'}
+
+    def visit_binary(self, binary: Binary) -> Set[str]:
+        operator_type = binary.operator.token_type
+        left = self.infer(binary.left)
+        right = self.infer(binary.right)
+
+        if operator_type in [TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL]:
+            return {'bool'}
+
+        # Other operators apply to each element if an operand is an array.
+        vector = {'array'} if {'array', ANY} & (left | right) else set()
+        if operator_type in COMPARISON_TYPES:
+            return {'bool'} | vector
+
+        binary.numeric = static_type(left) in NUMBER_TYPES and \
+            static_type(right) in NUMBER_TYPES
+
+        # Otherwise an arithmetic result is always a number, since the operands
+        # are checked first, except that `+` also joins strings.
+        if operator_type == TokenType.DIVIDE:
+            return {'float'} | vector
+
+        types = set(vector)
+        if operator_type == TokenType.PLUS and \
+           {'string', ANY} & left and {'string', ANY} & right:
+            types.add('string')
+
+        # A string operand can't give a number.
+        if left == {'string'} or right == {'string'}:
+            return types
+
+        for left_type in self._numbers(left):
+            for right_type in self._numbers(right):
+                if left_type == 'int' and right_type == 'int':
+                    types.add('int')
+                else:
+                    types.add('float')
+
+        return types
+
+    def visit_unary(self, unary: Unary) -> Set[str]:
+        operator_type = unary.operator.token_type
+        right = self.infer(unary.right)
+
+        if operator_type in [TokenType.PLUS, TokenType.MINUS]:
+            unary.numeric = static_type(right) in NUMBER_TYPES
+            return self._numbers(right)
+
+        return {'bool'}
+
+    def visit_grouping(self, grouping: Grouping) -> Set[str]:
+        return self.infer(grouping.expression)
+
+    def visit_assignment(self, assignment: Assignment) -> Set[str]:
+        types = self.infer(assignment.value)
+        self._add(assignment.name.symbol, types)
+
+        return types
+
+    def visit_logical(self, logical: Logical) -> Set[str]:
+        return self.infer(logical.left) | self.infer(logical.right)
+
+    def visit_call(self, call: Call) -> Set[str]:
+        name = None
+        if isinstance(call.callee, Literal) and \
+           call.callee.value.token_type == TokenType.IDENTIFIER:
+            name = call.callee.value.symbol
+            call.callee.static_type = static_type(self._lookup(name))
+        else:
+            self.infer(call.callee)
+
+        arguments = [self.infer(argument) for argument in call.arguments]
+
+        if name not in self.functions:
+            return {ANY}
+
+        types = set()
+        for declaration in self.functions[name]:
+            if len(declaration.parameters) != len(arguments):
+                continue
+
+            for parameter, argument in zip(self.arguments[declaration],
+                                           arguments):
+                if not argument <= parameter:
+                    parameter.update(argument)
+                    self.changed = True
+
+            # Calling a generator function only creates its sequence.
+            if declaration.is_generator:
+                types.add('sequence')
+                continue
+
+            types |= self.returns[declaration]
+            if not self._always_returns(declaration.body):
+                types.add('null')
+
+        if not self._is_known_function(name):
+            return {ANY}
+
+        return types
+
+    def visit_index(self, index: Index) -> Set[str]:
+        if index.is_slice:
+            for expression in [index.index, index.end]:
+                if expression:
+                    self.infer(expression)
+
+            # Slicing a string gives a string.
+            types = self._lookup(index.name.symbol) & {'array', 'string', ANY}
+            if not types or ANY in types:
+                return {'array', 'string'}
+            return types
+
+        self.infer(index.index)
+
+        return {ANY}
+
+    def visit_array_assignment(self,
+                               array_assignment: ArrayAssignment) -> Set[str]:
+        self.infer(array_assignment.value)
+        self.infer(array_assignment.index.index)
+
+        return {'null'}
+
+    def visit_expression(self, expression: ExpressionStatement) -> None:
+        self.infer(expression.expression)
+
+    def visit_echo(self, echo: Echo) -> None:
+        self.infer(echo.expression)
+
+    def visit_block(self, block: Block) -> None:
+        for statement in block.statements:
+            statement.accept(self)
+
+    def visit_if(self, _if: If) -> None:
+        self.infer(_if.condition)
+        _if.then.accept(self)
+        if _if._else:
+            _if._else.accept(self)
+
+    def visit_while(self, _while: While) -> None:
+        self.infer(_while.condition)
+        _while.body.accept(self)
+
+    def is_builtin_call(self, expression: Expression, name: str) -> bool:
+        """Checks if an expression calls a built-in function that the program
+        never reassigns.
+
+        Args:
+            expression: An expression.
+            name: The built-in function's name.
+
+        Returns:
+            If the expression is a call to the built-in function.
+        """
+        return isinstance(expression, Call) and \
+            isinstance(expression.callee, Literal) and \
+            expression.callee.value.symbol == name and \
+            name in self.external and name not in self.variables
+
+    def visit_for(self, _for: For) -> None:
+        iterable = self.infer(_for.iterable)
+        if self.is_builtin_call(_for.iterable, 'range'):
+            types = {'int'}
+        elif iterable == {'string'}:
+            types = {'string'}
+        else:
+            types = {ANY}
+
+        self._add(_for.name.symbol, types)
+        _for.body.accept(self)
+
+    def visit_function(self, function: Function) -> None:
+        self._add(function.name.symbol, {'function'})
+        declarations = self.functions.setdefault(function.name.symbol, [])
+        if function not in declarations:
+            declarations.append(function)
+            self.arguments[function] = [set() for _ in function.parameters]
+            self.returns[function] = set()
+
+        enclosing = self._function
+        self._function = function
+        for statement in function.body:
+            statement.accept(self)
+        self._function = enclosing
+
+    def visit_return(self, _return: Return) -> None:
+        types = self.infer(_return.value)
+        if self._function and not types <= self.returns[self._function]:
+            self.returns[self._function].update(types)
+            self.changed = True
+
+    def visit_yield(self, _yield: Yield) -> None:
+        self.infer(_yield.value)
+
+    def visit_import(self, _import: Import) -> None:
+        exports = None
+        if self.loader:
+            # Errors are left for the import statement to report when it runs.
+            try:
+                exports = self.loader.module(_import.path).exports
+            except (LexerError, ParserError, RuntimeError):
+                pass
+
+        if exports is None:
+            if self.closed:
+                self.closed = False
+                self.changed = True
+        elif not exports <= self.external:
+            self.external.update(exports)
+            self.changed = True
+
+    def _bind_parameters(self) -> None:
+        """Adds the possible types of arguments to parameters.
+        """
+        for name, declarations in self.functions.items():
+            known = self._is_known_function(name)
+            for declaration in declarations:
+                for parameter, types in zip(declaration.parameters,
+                                            self.arguments[declaration]):
+                    self._add(parameter.symbol, types if known else {ANY})
+
+    def annotate(self, statements: List[Statement]) -> None:
+        """Infers types until they stop changing and annotates expressions.
+
+        Args:
+            statements: The program's statements.
+        """
+        self.changed = True
+        while self.changed:
+            self.changed = False
+            for statement in statements:
+                statement.accept(self)
+            self._bind_parameters()
@@ -0,0 +1,249 @@
+from __future__ import annotations
+import array
+import operator
+from typing import Callable, Dict, List, Optional, Union
+from src.token import *
+from src.coffee_bean_array import *
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# Binary operators applied to each element of arrays.
+VECTOR_OPERATORS = {
+    TokenType.PLUS: operator.add,
+    TokenType.MINUS: operator.sub,
+    TokenType.MULTIPLY: operator.mul,
+    TokenType.DIVIDE: operator.truediv,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+}
+
+COMPARISON_OPERATORS = [
+    TokenType.LESS,
+    TokenType.LESS_EQUAL,
+    TokenType.GREATER,
+    TokenType.GREATER_EQUAL,
+]
+
+# NumPy stores ints in 64 bits, while Coffee Bean ints never overflow.
+INT_LIMIT = 2 ** 63
+
+# Ints below this size convert to floats exactly.
+FLOAT_LIMIT = 2 ** 53
+
+REDUCTIONS = ['sum', 'min', 'max', 'mean']
+
+Number = Union[int, float]
+
+def _check_numbers(interpreter: Interpreter, value: object) -> None:
+    """Checks that a value is a number or an array of numbers.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        value: An operand.
+    """
+    if type(value) == CoffeeBeanArray:
+        if type_code(value.values):
+            return
+
+        for element in value.values:
+            if type(element) not in [int, float]:
+                interpreter._error('Expected type int or float')
+    elif type(value) not in [int, float]:
+        interpreter._error('Expected type int or float')
+
+def _to_numpy(value: object) -> Optional[object]:
+    """Converts an operand to NumPy without copying.
+
+    Args:
+        value: A number or an array of numbers.
+
+    Returns:
+        A NumPy array or scalar, or None if the array is stored in a list.
+    """
+    if type(value) != CoffeeBeanArray:
+        return value
+
+    code = type_code(value.values)
+    if code is None:
+        return None
+    elif code == 'q':
+        return numpy.frombuffer(value.values, dtype=numpy.int64)
+
+    return numpy.frombuffer(value.values, dtype=numpy.float64)
+
+def _magnitude(value: object) -> Optional[int]:
+    """Gets the largest absolute value of an int operand.
+
+    Args:
+        value: A NumPy array or a scalar.
+
+    Returns:
+        The largest absolute value, or None if the operand holds floats.
+    """
+    if type(value) == int:
+        return abs(value)
+    elif type(value) == float or value.dtype != numpy.int64:
+        return None
+    elif len(value) == 0:
+        return 0
+
+    return max(abs(int(value.min())), abs(int(value.max())))
+
+def _is_exact(operator_type: TokenType, left: object, right: object) -> bool:
+    """Checks if NumPy gives the same result as Python for an operation.
+
+    Args:
+        operator_type: The operator.
+        left: The left NumPy operand.
+        right: The right NumPy operand.
+
+    Returns:
+        If no int can overflow or be rounded and nothing is divided by zero.
+    """
+    left_size = _magnitude(left)
+    right_size = _magnitude(right)
+
+    if operator_type == TokenType.DIVIDE:
+        if (right == 0).any() if type(right) not in [int, float] \
+           else right == 0:
+            return False
+    elif left_size is not None and right_size is not None:
+        if operator_type in COMPARISON_OPERATORS:
+            return True
+        elif operator_type == TokenType.MULTIPLY:
+            return left_size * right_size < INT_LIMIT
+
+        return left_size + right_size < INT_LIMIT
+
+    return all(size is None or size < FLOAT_LIMIT
+               for size in [left_size, right_size])
+
+def _from_numpy(result: object) -> CoffeeBeanArray:
+    """Converts a NumPy result to an array.
+
+    Args:
+        result: A NumPy array.
+
+    Returns:
+        An array with the same elements.
+    """
+    if result.dtype == numpy.bool_:
+        return CoffeeBeanArray(result.tolist())
+
+    values = array.array('q' if result.dtype == numpy.int64 else 'd')
+    values.frombytes(result.tobytes())
+    return CoffeeBeanArray(values)
+
+def vector_binary(interpreter: Interpreter,
+                  operator_type: TokenType,
+                  left: object,
+                  right: object) -> CoffeeBeanArray:
+    """Applies a binary operator to each element of arrays.
+
+    An array and a number apply the operator between the number and every
+    element. Two arrays apply it between elements at the same index.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        operator_type: An arithmetic or ordering operator.
+        left: An array or number.
+        right: An array or number.
+
+    Returns:
+        An array of the results.
+    """
+    _check_numbers(interpreter, left)
+    _check_numbers(interpreter, right)
+    if type(left) == CoffeeBeanArray and type(right) == CoffeeBeanArray and \
+       len(left.values) != len(right.values):
+        interpreter._error('Array lengths must match.')
+
+    function = VECTOR_OPERATORS[operator_type]
+    if numpy:
+        left_array = _to_numpy(left)
+        right_array = _to_numpy(right)
+        if left_array is not None and right_array is not None and \
+           _is_exact(operator_type, left_array, right_array):
+            return _from_numpy(function(left_array, right_array))
+
+    try:
+        if type(left) != CoffeeBeanArray:
+            return CoffeeBeanArray([function(left, element)
+                                    for element in right.values])
+        elif type(right) != CoffeeBeanArray:
+            return CoffeeBeanArray([function(element, right)
+                                    for element in left.values])
+
+        return CoffeeBeanArray(list(map(function, left.values, right.values)))
+    except ZeroDivisionError:
+        interpreter._error('Cannot divide by zero.')
+
+def _sum(values: List[Number]) -> Number:
+    """Adds numbers in order, like a loop would.
+
+    Args:
+        values: Numbers.
+
+    Returns:
+        The total.
+    """
+    total = 0
+    for value in values:
+        total = total + value
+
+    return total
+
+def vector_reduce(interpreter: Interpreter,
+                  name: str,
+                  value: object) -> Number:
+    """Reduces an array of numbers to one number.
+
+    Args:
+        interpreter: The interpreter to report errors from.
+        name: `sum`, `min`, `max` or `mean`.
+        value: An array of numbers.
+
+    Returns:
+        The result.
+    """
+    if type(value) != CoffeeBeanArray:
+        interpreter._error(f'Can only get the {name} of arrays.')
+
+    _check_numbers(interpreter, value)
+    values = value.values
+    if not values and name != 'sum':
+        interpreter._error(f'Cannot get the {name} of an empty array.')
+
+    numbers = _to_numpy(value) if numpy else None
+    if numbers is None or not len(numbers):
+        if name == 'min':
+            return min(values)
+        elif name == 'max':
+            return max(values)
+
+        total = _sum(values)
+        return total if name == 'sum' else total / len(values)
+
+    if numbers.dtype == numpy.int64:
+        if name == 'min':
+            return int(numbers.min())
+        elif name == 'max':
+            return int(numbers.max())
+        elif _magnitude(numbers) * len(numbers) < INT_LIMIT:
+            total = int(numbers.sum())
+        else:
+            total = sum(values)
+    elif name in ['min', 'max']:
+        # NumPy handles NaN and signed zeros differently than Python.
+        return min(values) if name == 'min' else max(values)
+    else:
+        # A cumulative sum adds in order, unlike `sum`, which rounds
+        # differently.
+        total = float(numpy.cumsum(numbers)[-1])
+
+    return total if name == 'sum' else total / len(values)
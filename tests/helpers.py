@@ -0,0 +1,69 @@
+import contextlib
+import io
+from typing import Optional
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.type_inferrer import *
+from src.bounds_analyzer import *
+
+def run(source: str,
+        threshold: int = 10 ** 9,
+        annotate: bool = False,
+        directory: Optional[str] = None,
+        **options: object) -> str:
+    """Runs source code and captures its output.
+
+    Args:
+        source: Source code.
+        threshold: The number of calls or iterations before functions and
+            loops are transpiled.
+        annotate: If the analysis passes run first, the way `coffee_bean.py`
+            runs a file.
+        directory: The directory to import modules from, if not the current
+            one.
+        options: Other arguments for the interpreter, like `limits`.
+
+    Returns:
+        The echoed output, or the runtime error message.
+    """
+    output = io.StringIO()
+    try:
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter(call_threshold=threshold,
+                                  loop_threshold=threshold,
+                                  **options)
+        if directory is not None:
+            interpreter.loader.directory = directory
+        if annotate:
+            inferrer = TypeInferrer(interpreter.globals,
+                                    loader=interpreter.loader)
+            inferrer.annotate(statements)
+            BoundsAnalyzer(inferrer).annotate(statements)
+        with contextlib.redirect_stdout(output):
+            interpreter.interpret(statements)
+    except RuntimeError as error:
+        output.write(f'{error}\n')
+
+    return output.getvalue()
+
+class OutputTestCase(unittest.TestCase):
+    """Defines a test case that checks what programs echo.
+    """
+    def assertOutput(self,
+                     source: str,
+                     expected: str,
+                     **options: object) -> None:
+        """Checks the output in the tree walker and with everything
+        transpiled.
+
+        Args:
+            source: Source code.
+            expected: The echoed output, or the runtime error message.
+            options: Other arguments for `run`.
+        """
+        self.assertEqual(run(source, **options), expected)
+        self.assertEqual(run(source, 1, **options), expected)
@@ -0,0 +1,135 @@
+import io
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.output import *
+from src.batch import *
+
+def run(source: str,
+        records: str,
+        threshold: int = 10 ** 9,
+        jobs: int = 1) -> str:
+    """Runs source code once per record and captures its output.
+
+    Args:
+        source: Source code.
+        records: JSON records, one per line.
+        threshold: The number of calls or iterations before functions and
+            loops are transpiled.
+        jobs: The number of worker processes, or 1 to run in this process.
+
+    Returns:
+        The echoed output, followed by the error messages.
+    """
+    output = io.StringIO()
+    errors = io.StringIO()
+    statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+    interpreter = Interpreter(call_threshold=threshold,
+                              loop_threshold=threshold,
+                              output=Output(output))
+    annotate(statements, interpreter)
+    runner = BatchRunner(statements, interpreter)
+    runner.start()
+
+    lines = io.StringIO(records.strip() + '\n')
+    if jobs > 1:
+        runner.run_parallel(lines, errors, jobs)
+    else:
+        runner.run(lines, errors)
+
+    return output.getvalue() + errors.getvalue()
+
+class TestBatch(unittest.TestCase):
+    def assertOutput(self, source: str, records: str, expected: str) -> None:
+        """Checks the output in the tree walker and with everything transpiled.
+        """
+        self.assertEqual(run(source, records), expected)
+        self.assertEqual(run(source, records, 1), expected)
+
+    def test_records(self) -> None:
+        """Test that each record is converted and bound to `record`.
+        """
+        self.assertOutput('''
+echo record["name"]
+echo record["tags"]
+echo record["size"] * 2
+''', '''
+{"name": "ada", "tags": ["a", "b"], "size": 1.5}
+{"name": "alan", "tags": [], "size": 2}
+''', 'ada\n{a, b}\n3.0\nalan\n{}\n4\n')
+
+    def test_fresh_environment(self) -> None:
+        """Test that variables don't carry over from one record to the next.
+        """
+        self.assertOutput('''
+total = 0
+for x in record do
+    total = total + x
+end
+function seen() do return total end
+echo seen()
+''', '''
+[1, 2, 3]
+[10]
+''', '6\n10\n')
+
+    def test_shadowed_builtins(self) -> None:
+        """Test that a record that reuses the name of a built-in function
+        doesn't change it for the next record.
+        """
+        source = '''
+echo sum(record) + max(record)
+sum = 0
+function max(a) do return 0 end
+echo sum + max(record)
+'''
+        records = '[1, 2]\n[3]'
+        expected = '5\n0\n6\n0\n'
+        self.assertOutput(source, records, expected)
+        self.assertEqual(run(source, records, jobs=2), expected)
+
+    def test_return(self) -> None:
+        """Test that a top-level return ends a record and echoes its value.
+        """
+        self.assertOutput('''
+if record < 0 return null
+if record > 10 return "big"
+echo record
+''', '''
+-1
+5
+20
+''', '5\nbig\n')
+
+    def test_errors(self) -> None:
+        """Test that bad records are reported and skipped.
+        """
+        self.assertOutput('''
+echo record + 1
+''', '''
+1
+oops
+
+"a"
+2
+''', '2\n3\nRecord 2\nError: Invalid JSON.\n' \
+     'Record 4\nLine 1\nError: Expected type int or float\n')
+
+    def test_parallel(self) -> None:
+        """Test that worker processes give the same output in order.
+        """
+        source = '''
+function square(x) do return x * x end
+if record == 3 echo undefined
+echo square(record)
+'''
+        records = '\n'.join(str(i) for i in range(1000))
+        expected = run(source, records)
+        self.assertEqual(run(source, records, jobs=2), expected)
+        self.assertEqual(run(source, records, 1, jobs=2), expected)
+
+if __name__ == '__main__':
+    unittest.main()
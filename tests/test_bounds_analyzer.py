@@ -0,0 +1,125 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.type_inferrer import *
+from src.bounds_analyzer import *
+from helpers import *
+
+def annotate(source: str) -> List[Statement]:
+    """Parses source code and marks array accesses that are in range.
+
+    Args:
+        source: Source code.
+
+    Returns:
+        The annotated statements.
+    """
+    statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+    inferrer = TypeInferrer(Interpreter().globals)
+    inferrer.annotate(statements)
+    BoundsAnalyzer(inferrer).annotate(statements)
+
+    return statements
+
+class TestBoundsAnalyzer(unittest.TestCase):
+    def test_scan(self) -> None:
+        """Test accesses in a loop over an array.
+        """
+        statements = annotate('''
+        a = {1, 2, 3}
+        i = 0
+        while i < len(a) and a[i] > 0 do
+            a[i] = a[i] * 2
+            i = i + 1
+            echo a[i]
+        end
+        ''')
+        loop = statements[2]
+        body = loop.body.statements
+        self.assertTrue(loop.condition.right.left.in_bounds)
+        self.assertTrue(body[0].expression.index.in_bounds)
+        self.assertTrue(body[0].expression.value.left.in_bounds)
+        self.assertFalse(body[2].expression.in_bounds)
+
+    def test_unproven(self) -> None:
+        """Test accesses that may be out of range.
+        """
+        statements = annotate('''
+        a = {1, 2, 3}
+        i = 0
+        function f() do a = {} end
+        while i < len(a) do
+            f()
+            echo a[i]
+            i = i + 1
+        end
+        j = 0 - 1
+        while j < len(a) do
+            echo a[j]
+            j = j + 1
+        end
+        ''')
+        self.assertFalse(statements[3].body.statements[1].expression.in_bounds)
+        self.assertFalse(statements[5].body.statements[0].expression.in_bounds)
+
+    def test_range(self) -> None:
+        """Test accesses in a for loop over the indices of an array.
+        """
+        statements = annotate('''
+        a = {1, 2, 3}
+        for i in range(0, len(a)) do
+            a[i] = a[i] * 2
+        end
+        for i in range(0, len(a)) do
+            push(a, 0)
+            echo a[i]
+        end
+        ''')
+        body = statements[1].body.statements
+        self.assertTrue(body[0].expression.index.in_bounds)
+        self.assertTrue(body[0].expression.value.left.in_bounds)
+        self.assertFalse(statements[2].body.statements[1].expression.in_bounds)
+
+    def test_yield(self) -> None:
+        """Test that other code may run while a generator is paused.
+        """
+        statements = annotate('''
+        function f() do
+            a = {1, 2, 3}
+            i = 0
+            while i < len(a) do
+                yield a[i]
+                yield a[i]
+                i = i + 1
+            end
+        end
+        ''')
+        body = statements[0].body[2].body.statements
+        self.assertTrue(body[0].value.in_bounds)
+        self.assertFalse(body[1].value.in_bounds)
+
+    def test_bounds_checks(self) -> None:
+        """Test that out of range indices are errors.
+        """
+        source = '''
+        a = {1, 2, 3}
+        i = 0
+        while i < len(a) do
+            a[i] = a[i] + a[i]
+            i = i + 1
+        end
+        echo a
+        echo a[0 - 1]
+        '''
+        self.assertEqual(run(source, annotate=True),
+                         '{2, 4, 6}\nLine 8\nError: Index out of range.\n')
+        self.assertEqual(run(source, 1, annotate=True),
+                         run(source, annotate=True))
+        self.assertEqual(run('a = {1}\na[1] = 2', annotate=True),
+                         'Line 2\nError: Index out of range.\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.coffee_bean_array import *
+from helpers import *
+
+class TestCoffeeBeanArray(unittest.TestCase):
+    def test_storage(self) -> None:
+        """Test that only ints or only floats are stored compactly.
+        """
+        self.assertEqual(CoffeeBeanArray([1, 2]).values.typecode, 'q')
+        self.assertEqual(CoffeeBeanArray([1.5]).values.typecode, 'd')
+        self.assertEqual(type(CoffeeBeanArray([1, 2.5]).values), list)
+        self.assertEqual(type(CoffeeBeanArray([True]).values), list)
+        self.assertEqual(type(CoffeeBeanArray([2 ** 64]).values), list)
+        self.assertEqual(type(CoffeeBeanArray([]).values), list)
+
+    def test_set(self) -> None:
+        """Test storing elements that do not fit the buffer.
+        """
+        numbers = CoffeeBeanArray([1, 2, 3])
+        numbers.set(0, 4)
+        self.assertEqual(numbers.values.typecode, 'q')
+
+        numbers.set(1, 2.5)
+        self.assertEqual(numbers.values, [4, 2.5, 3])
+        self.assertEqual(type(numbers.values[0]), int)
+
+        numbers = CoffeeBeanArray([1.5])
+        numbers.set(0, 1)
+        self.assertEqual(type(numbers.values[0]), int)
+
+        numbers = CoffeeBeanArray([1])
+        numbers.set(0, 2 ** 64)
+        self.assertEqual(numbers.values, [2 ** 64])
+
+    def test_equality(self) -> None:
+        """Test comparing arrays with different storage.
+        """
+        self.assertEqual(CoffeeBeanArray([1, 2]), CoffeeBeanArray([1, 2]))
+        self.assertEqual(CoffeeBeanArray([1, 2]), CoffeeBeanArray([1.0, 2.0]))
+        self.assertEqual(CoffeeBeanArray([CoffeeBeanArray([1])]),
+                         CoffeeBeanArray([CoffeeBeanArray([1])]))
+        self.assertNotEqual(CoffeeBeanArray([1]), [1])
+        self.assertEqual(repr(CoffeeBeanArray([CoffeeBeanArray([1]), 'a'])),
+                         "[[1], 'a']")
+
+    def test_slice(self) -> None:
+        """Test that slices share elements until either array changes.
+        """
+        for values in [[1, 2, 3, 4], [1, 'a', 3.5, True]]:
+            numbers = CoffeeBeanArray(values)
+            view = numbers.slice(1, 3)
+            self.assertEqual(list(view), values[1:3])
+            self.assertTrue(view.shared)
+
+            numbers.set(1, 5)
+            self.assertEqual(list(view), values[1:3])
+            self.assertEqual(list(numbers.slice(0, 2)), [values[0], 5])
+
+            view.set(0, 6)
+            self.assertEqual(list(view), [6, values[2]])
+            self.assertEqual(list(numbers), [values[0], 5] + values[2:])
+
+    def test_slice_syntax(self) -> None:
+        """Test slicing arrays in source code.
+        """
+        self.assertEqual(run('''
+        a = {1, 2, 3, 4, 5}
+        b = a[1:4]
+        b[0] = 0
+        echo b
+        echo a[:2]
+        echo a[3:]
+        echo b[1:]
+        echo a[3:2]
+        '''), '{0, 3, 4}\n{1, 2}\n{4, 5}\n{3, 4}\n' \
+             'Line 8\nError: Index out of range.\n')
+
+    def test_snapshot(self) -> None:
+        """Test that snapshots change independently of the original.
+        """
+        self.assertEqual(run('''
+        a = {1, 2, 3}
+        b = snapshot(a)
+        c = snapshot(b)
+        a[0] = 4
+        b[1] = "b"
+        echo a
+        echo b
+        echo c
+        '''), '{4, 2, 3}\n{1, b, 3}\n{1, 2, 3}\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.coffee_bean_map import *
+from helpers import *
+
+class TestCoffeeBeanMap(OutputTestCase):
+    def test_literal(self) -> None:
+        """Test parsing map literals.
+        """
+        statements = Parser(Lexer('m = {"a": 1, 2: {:}}').get_tokens()) \
+            .get_statements()
+        _map = statements[0].expression.value
+        self.assertIsInstance(_map, Map)
+        self.assertEqual(len(_map.keys), 2)
+        self.assertIsInstance(_map.values[1], Map)
+
+    def test_get_and_set(self) -> None:
+        """Test reading and writing keys.
+        """
+        self.assertOutput('''
+        m = {"a": 1}
+        m["b"] = m["a"] + 1
+        echo m
+        echo len(m)
+        echo {:}
+        ''', '{a: 1, b: 2}\n2\n{:}\n')
+
+    def test_builtins(self) -> None:
+        """Test membership and iteration.
+        """
+        self.assertOutput('''
+        m = {"a": 1, "b": 2, "c": 3}
+        echo has(m, "a")
+        echo remove(m, "a")
+        echo has(m, "a")
+        echo keys(m)
+        echo values(m)
+        ''', 'true\n1\nfalse\n{b, c}\n{2, 3}\n')
+
+    def test_errors(self) -> None:
+        """Test missing and invalid keys.
+        """
+        self.assertOutput('m = {:}\necho m["a"]',
+                          'Line 2\nError: Key not found.\n')
+        self.assertOutput('m = {:}\nm[{1}] = 1',
+                          'Line 2\nError: Map keys must be null, booleans, ' \
+                          'numbers or strings.\n')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+import os
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from helpers import *
+
+class TestFile(OutputTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'data.txt')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def assertOutput(self, source: str, expected: str) -> None:
+        """Checks the output with and without transpiling.
+        """
+        source = source.replace('PATH', self.path)
+        super().assertOutput(source, expected, file_root=self.directory.name)
+
+    def test_write(self) -> None:
+        """Test writing and appending to files.
+        """
+        self.assertOutput('''
+        f = open("PATH", "w")
+        for i in range(0, 3) do
+            write_line(f, "line " + str(i))
+        end
+        write(f, {1, 2})
+        close(f)
+        f = open("PATH", "a")
+        write(f, "!")
+        close(f)
+        ''', '')
+        with open(self.path) as file:
+            self.assertEqual(file.read(), 'line 0\nline 1\nline 2\n{1, 2}!')
+
+    def test_read(self) -> None:
+        """Test reading lines and chunks.
+        """
+        with open(self.path, 'w') as file:
+            file.write('ab\ncd\r\nef\n\ngh')
+
+        self.assertOutput('''
+        for line in lines("PATH") do
+            echo "[" + line + "]"
+        end
+        f = open("PATH", "r")
+        echo read(f, 1)
+        echo collect(take(lines(f), 1))
+        echo read(f, 3)
+        echo collect(lines(f))
+        echo len(read(f, 10))
+        close(f)
+        ''', '[ab]\n[cd]\n[ef]\n[]\n[gh]\na\n{b}\ncd\n\n{ef, , gh}\n0\n')
+
+    def test_errors(self) -> None:
+        """Test invalid files and modes.
+        """
+        self.assertOutput('f = open("PATH", "x")',
+                          'Line 1\nError: File mode must be "r", "w" or '
+                          '"a".\n')
+        self.assertOutput('f = open("PATH", "r")',
+                          f'Line 1\nError: Cannot open file "{self.path}".\n')
+        self.assertOutput('''
+        f = open("PATH", "w")
+        echo read(f, 1)
+        ''', 'Line 2\nError: File is not open for reading.\n')
+        self.assertOutput('''
+        f = open("PATH", "w")
+        close(f)
+        write(f, 1)
+        ''', 'Line 3\nError: File is closed.\n')
+        self.assertOutput('echo lines(1)', 'Line 1\nError: Expected type file\n')
+
+    def test_access(self) -> None:
+        """Test that files can only be opened under the file root, not at all
+        without one or with limits, and that module sources and caches are
+        protected.
+        """
+        root = os.path.realpath(self.directory.name)
+        self.assertOutput('''
+        f = open("data.txt", "w")
+        write(f, "relative")
+        close(f)
+        echo collect(lines("PATH"))
+        ''', '{relative}\n')
+        self.assertOutput('f = open("../outside.txt", "w")',
+                          'Line 1\nError: Cannot open file "../outside.txt" ' \
+                          f'outside of {root}.\n')
+        self.assertOutput('f = open("/etc/passwd", "r")',
+                          'Line 1\nError: Cannot open file "/etc/passwd" ' \
+                          f'outside of {root}.\n')
+        self.assertOutput('f = open("lib/__cbcache__/a.cbc", "w")',
+                          'Line 1\nError: Cannot open file ' \
+                          '"lib/__cbcache__/a.cbc".\n')
+        self.assertOutput('f = open("a.cb", "a")',
+                          'Line 1\nError: Cannot open file "a.cb".\n')
+
+        source = 'f = open("data.txt", "r")'
+        self.assertEqual(run(source, file_root=None),
+                         'Line 1\nError: File access is disabled.\n')
+        self.assertEqual(run(source, file_root=root, limits=Limits(steps=100)),
+                         'Line 1\nError: File access is disabled.\n')
+
+    @unittest.skipUnless(hasattr(os, 'mkfifo'), 'Pipes are not supported')
+    def test_pipe(self) -> None:
+        """Test that a task waiting to open or read a file lets other tasks
+        run, so it can read what they write.
+        """
+        os.mkfifo(self.path)
+        source = '''
+        function reader() do
+            f = open("PATH", "r")
+            for line in lines(f) do echo "got " + line end
+            close(f)
+        end
+        function writer() do
+            echo "writing"
+            f = open("PATH", "w")
+            write_line(f, "hello")
+            close(f)
+        end
+        tasks = {spawn(reader, {}), spawn(writer, {})}
+        for task in tasks do wait(task) end
+        '''
+        outputs = []
+        thread = threading.Thread(target=lambda: outputs.append(run(
+            source.replace('PATH', self.path),
+            file_root=self.directory.name
+        )), daemon=True)
+        thread.start()
+        thread.join(10)
+        self.assertEqual(outputs, ['writing\ngot hello\n'])
+
+if __name__ == '__main__':
+    unittest.main()
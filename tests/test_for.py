@@ -0,0 +1,97 @@
+import contextlib
+import io
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from helpers import *
+
+class TestFor(OutputTestCase):
+    def test_range(self) -> None:
+        """Test looping over a range of ints.
+        """
+        self.assertOutput('''
+        total = 0
+        for i in range(0, 5) do
+            total = total + i
+        end
+        echo total
+        echo i
+        for j in range(3, 3) do
+            echo j
+        end
+        ''', '10\n4\n')
+
+    def test_collections(self) -> None:
+        """Test looping over arrays, the keys of maps and strings.
+        """
+        self.assertOutput('''
+        for x in {1, 2.5, "a"} do
+            echo x
+        end
+        ages = {"ada": 36, "alan": 41}
+        for name in ages do
+            echo ages[name]
+        end
+        for c in "hi" do
+            echo c
+        end
+        ''', '1\n2.5\na\n36\n41\nh\ni\n')
+
+    def test_growing_array(self) -> None:
+        """Test that a loop sees elements added while it runs.
+        """
+        self.assertOutput('''
+        a = {1}
+        for x in a do
+            if x < 4 push(a, x + 1)
+        end
+        echo a
+        ''', '{1, 2, 3, 4}\n')
+
+    def test_function(self) -> None:
+        """Test a loop inside a function.
+        """
+        self.assertOutput('''
+        function total(a) do
+            sum = 0
+            for x in a do
+                sum = sum + x
+            end
+            return sum
+        end
+        echo total({1, 2, 3})
+        echo total({4})
+        ''', '6\n4\n')
+
+    def test_tier_up(self) -> None:
+        """Test that a loop is transpiled in the middle of running.
+        """
+        source = '''
+        total = 0
+        for i in range(0, 10) do
+            total = total + i
+        end
+        echo total
+        '''
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter(loop_threshold=3)
+        with contextlib.redirect_stdout(io.StringIO()):
+            interpreter.interpret(statements)
+        self.assertIsNotNone(interpreter.loops[statements[1]])
+        self.assertEqual(interpreter.globals.values['total'], 45)
+        self.assertEqual(run(source, 3), '45\n')
+
+    def test_errors(self) -> None:
+        """Test looping over values that aren't collections.
+        """
+        self.assertOutput('for x in 5 do echo x end',
+                          'Line 1\nError: Can only loop over arrays, maps, '
+                          'strings, ranges and sequences.\n')
+        self.assertOutput('for x in range(0, 1.5) do echo x end',
+                          'Line 1\nError: Expected type int\n')
+
+if __name__ == '__main__':
+    unittest.main()
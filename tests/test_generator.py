@@ -0,0 +1,161 @@
+import contextlib
+import io
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from helpers import *
+
+class TestGenerator(OutputTestCase):
+    def test_parse(self) -> None:
+        """Test that functions with a yield are generators.
+        """
+        statements = Parser(Lexer('''
+        function f() do
+            function g() do yield 1 end
+            return g
+        end
+        function h() do
+            if true yield 1
+        end
+        '''.strip()).get_tokens()).get_statements()
+        self.assertFalse(statements[0].is_generator)
+        self.assertTrue(statements[0].body[0].is_generator)
+        self.assertTrue(statements[1].is_generator)
+
+        with self.assertRaises(ParserError):
+            Parser(Lexer('yield 1').get_tokens()).get_statements()
+
+    def test_generator(self) -> None:
+        """Test that a generator's body runs as values are needed.
+        """
+        self.assertOutput('''
+        function count(n) do
+            i = 0
+            while i < n do
+                echo "making " + str(i)
+                yield i
+                i = i + 1
+            end
+            return 0
+            yield n
+        end
+        values = count(2)
+        echo values
+        for x in values do
+            echo x
+        end
+        for x in values do
+            echo x
+        end
+        echo i
+        ''', '<sequence>\nmaking 0\n0\nmaking 1\n1\n'
+             "Line 19\nError: Undefined variable 'i'.\n")
+
+    def test_nested(self) -> None:
+        """Test yields in blocks, branches and loops, and generators that
+        loop over other generators.
+        """
+        self.assertOutput('''
+        function chunks(values, size) do
+            chunk = {}
+            for x in values do
+                push(chunk, x)
+                if len(chunk) == size do
+                    yield chunk
+                    chunk = {}
+                end
+            end
+            if len(chunk) > 0 yield chunk
+        end
+        function flatten(arrays) do
+            for a in arrays do
+                for x in a do yield x end
+            end
+        end
+        for c in chunks({1, 2, 3, 4, 5}, 2) do echo c end
+        echo collect(flatten(chunks({1, 2, 3}, 2)))
+        function tree(depth) do
+            if depth > 0 do
+                for x in tree(depth - 1) do yield x end
+                yield depth
+                for x in tree(depth - 1) do yield x end
+            end
+        end
+        echo collect(tree(3))
+        ''', '{1, 2}\n{3, 4}\n{5}\n{1, 2, 3}\n{1, 2, 1, 3, 1, 2, 1}\n')
+
+    def test_loop_tier_up(self) -> None:
+        """Test that hot loops in a running generator tier up in the middle.
+        """
+        source = '''
+        function evens(a) do
+            i = 0
+            while i < len(a) do
+                if a[i] - floor(a[i] / 2) * 2 == 0 yield a[i]
+                i = i + 1
+            end
+            last = "done"
+            for x in a do
+                yield x + 100
+            end
+            yield last
+        end
+        for x in evens({1, 2, 3, 4, 5, 6, 7, 8}) do
+            echo x
+        end
+        '''
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter(loop_threshold=3)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            interpreter.interpret(statements)
+        body = statements[0].body
+        self.assertIsNotNone(interpreter.loops[body[1]])
+        self.assertIsNotNone(interpreter.loops[body[3]])
+        self.assertEqual(output.getvalue(), run(source))
+        self.assertEqual(output.getvalue(),
+                         ''.join(f'{x}\n' for x in [2, 4, 6, 8] +
+                                 list(range(101, 109)) + ['done']))
+
+    def test_pipeline(self) -> None:
+        """Test lazy map, filter and take over an endless generator.
+        """
+        self.assertOutput('''
+        function naturals() do
+            n = 0
+            while true do
+                yield n
+                n = n + 1
+            end
+        end
+        function odd(x) do return x - floor(x / 2) * 2 == 1 end
+        function square(x) do return x * x end
+        function add(a, b) do return a + b end
+        evens = map(filter(naturals(), odd), square)
+        echo collect(take(evens, 4))
+        echo collect(take(evens, 2))
+        echo reduce(take(naturals(), 101), add, 0)
+        echo reduce({"a", "b"}, add, "")
+        echo collect(map("ab", upper))
+        ''', '{1, 9, 25, 49}\n{81, 121}\n5050\nab\n{A, B}\n')
+
+    def test_errors(self) -> None:
+        """Test invalid arguments to sequence functions.
+        """
+        self.assertOutput('echo map(1, str)',
+                          'Line 1\nError: Can only loop over arrays, maps, '
+                          'strings, ranges and sequences.\n')
+        self.assertOutput('echo map({1}, 2)',
+                          'Line 1\nError: Expected a function taking 1 '
+                          'argument.\n')
+        self.assertOutput('echo reduce({1}, str, 0)',
+                          'Line 1\nError: Expected a function taking 2 '
+                          'arguments.\n')
+        self.assertOutput('echo take({1}, 0 - 1)',
+                          'Line 1\nError: Expected a non-negative int.\n')
+
+if __name__ == '__main__':
+    unittest.main()
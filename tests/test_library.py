@@ -0,0 +1,143 @@
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.library import *
+from helpers import *
+
+class TestLibrary(OutputTestCase):
+    def test_registry(self) -> None:
+        """Test that registered functions are in the globals.
+        """
+        @native('test_add', 2)
+        def add(interpreter: Interpreter, left: object, right: object) -> int:
+            return left + right
+
+        try:
+            self.assertIs(NATIVE_FUNCTIONS['test_add'].function, add)
+            self.assertOutput('echo test_add(1, 2)', '3\n')
+            self.assertOutput('echo test_add(1)', 'Line 1\nError: ' \
+                              'Expected 2 arguments but got 1.\n')
+        finally:
+            del NATIVE_FUNCTIONS['test_add']
+
+    def test_shadowing(self) -> None:
+        """Test that parameters and variables named like built-in functions
+        only hide them where they are defined.
+        """
+        self.assertOutput('''
+        function pick(max, a) do
+            keys = a
+            i = 0
+            while i < 3 do i = i + 1 end
+            return max + len(keys)
+        end
+        echo pick(1, {1, 2})
+        echo pick(2, {1})
+        echo max({1, 3, 2})
+        echo keys({"a": 1})
+        x = 1
+        function f(x) do return x end
+        echo f(2)
+        echo x
+        ''', '3\n3\n3\n{a}\n2\n1\n')
+        self.assertOutput('''
+        function size(a) do return len(a) end
+        echo size({1, 2})
+        echo size({1})
+        len = 5
+        echo len
+        echo size({1})
+        ''', '2\n1\n5\nLine 1\nError: Can only call functions.\n')
+
+    def test_arrays(self) -> None:
+        """Test adding and removing elements.
+        """
+        self.assertOutput('''
+        a = {}
+        i = 0
+        while i < 3 do
+            push(a, i * i)
+            i = i + 1
+        end
+        echo a
+        echo pop(a)
+        echo a
+        ''', '{0, 1, 4}\n4\n{0, 1}\n')
+        self.assertOutput('echo pop({})',
+                          'Line 1\nError: Cannot pop from an empty array.\n')
+
+    def test_append_storage(self) -> None:
+        """Test that appending keeps ints compact and copies shared elements.
+        """
+        array = CoffeeBeanArray([])
+        array.append(1)
+        self.assertEqual(type_code(array.values), 'q')
+
+        view = array.slice(0, 1)
+        array.append(2.5)
+        self.assertEqual(list(view), [1])
+        self.assertEqual(list(array), [1, 2.5])
+
+        snapshot = array.snapshot()
+        snapshot.append(3)
+        self.assertEqual(array.pop(), 2.5)
+        self.assertEqual(list(snapshot), [1, 2.5, 3])
+
+    def test_math_and_conversions(self) -> None:
+        """Test the math and conversion functions.
+        """
+        self.assertOutput('''
+        echo sqrt(16) + floor(2.7) + abs(-1)
+        echo int("42") + int(3.9) + float("0.5")
+        echo str({1, "a"}) + str(null)
+        ''', '7.0\n45.5\n{1, a}null\n')
+        self.assertOutput('echo int("x")',
+                          'Line 1\nError: Cannot convert "x" to int.\n')
+        self.assertOutput('echo sqrt(-1)', 'Line 1\nError: Cannot get the ' \
+                          'square root of a negative number.\n')
+
+    def test_sort(self) -> None:
+        """Test sorting with and without a key or comparator.
+        """
+        self.assertOutput('''
+        function negate(x) do return -x end
+        function by_length(a, b) do return len(a) - len(b) end
+        a = {3, 1, 2}
+        sort(a)
+        echo a
+        sort_by(a, negate)
+        echo a
+        words = {"ccc", "a", "bb", "d"}
+        sort_by(words, by_length)
+        echo words
+        reverse(words)
+        echo words
+        ''', '{1, 2, 3}\n{3, 2, 1}\n{a, d, bb, ccc}\n{ccc, bb, d, a}\n')
+        self.assertOutput('a = {1, "a"}\nsort(a)',
+                          'Line 2\nError: Can only sort numbers or strings.\n')
+
+    def test_sort_keeps_views(self) -> None:
+        """Test that sorting an array doesn't change its slices.
+        """
+        self.assertOutput('''
+        a = {3, 1, 2}
+        b = a[0:2]
+        sort(a)
+        echo a
+        echo b
+        ''', '{1, 2, 3}\n{3, 1}\n')
+
+    def test_binary_search(self) -> None:
+        """Test finding elements of sorted arrays.
+        """
+        self.assertOutput('''
+        a = {1, 3, 5, 7}
+        echo bsearch(a, 5)
+        echo bsearch(a, 4)
+        echo bsearch(a, 8)
+        echo bsearch({"a", "b"}, "b")
+        echo bsearch(a, "a")
+        ''', '2\n-1\n-1\n1\nLine 6\nError: Can only search arrays of ' \
+            'numbers or strings.\n')
@@ -0,0 +1,144 @@
+import time
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.limits import *
+from src.program import compile
+from helpers import *
+
+class TestLimits(OutputTestCase):
+    def assertOutput(self, source: str, limits: Limits, expected: str) -> None:
+        """Checks the output with and without transpiling.
+        """
+        super().assertOutput(source, expected, annotate=True, limits=limits)
+
+    def test_steps(self) -> None:
+        """Test that loop iterations and calls are counted exactly, and that a
+        loop that never ends is stopped.
+        """
+        source = '''
+function f(x) do return x end
+total = 0
+for i in range(0, 10) do
+    j = 0
+    while j < 10 do
+        total = total + f(j)
+        j = j + 1
+    end
+end
+echo total
+'''
+        # 10 outer iterations, 100 inner iterations and 100 calls.
+        self.assertOutput(source, Limits(steps=210), '450\n')
+        self.assertOutput(source, Limits(steps=209),
+                          'Line 6\nError: Exceeded the limit of 209 steps.\n')
+        self.assertOutput('''
+i = 0
+while true do
+    i = i + 1
+end
+''', Limits(steps=100000), 'Line 2\nError: Exceeded the limit of 100000 ' \
+                           'steps.\n')
+
+    def test_time(self) -> None:
+        """Test that a run is stopped after its time limit, and that a sleep
+        past it fails right away.
+        """
+        start = time.perf_counter()
+        self.assertOutput('''
+function spin() do
+    while true do end
+end
+spin()
+''', Limits(time=0.2), 'Line 2\nError: Exceeded the time limit of 0.2 ' \
+                       'seconds.\n')
+        self.assertOutput('''
+echo "before"
+sleep(10)
+''', Limits(time=1), 'before\nLine 2\nError: Exceeded the time limit of 1 ' \
+                     'seconds.\n')
+        self.assertLess(time.perf_counter() - start, 5)
+
+    def test_depth(self) -> None:
+        """Test that nested calls are limited, and that calls that return
+        don't count.
+        """
+        source = '''
+function down(n) do
+    if n == 0 return 0
+    return down(n - 1) + 1
+end
+echo down(20)
+echo down(20)
+'''
+        self.assertOutput(source, Limits(depth=21), '20\n20\n')
+        self.assertOutput(source, Limits(depth=20),
+                          'Line 3\nError: Exceeded the maximum call depth of ' \
+                          '20.\n')
+        self.assertOutput('''
+function forever(n) do return forever(n + 1) end
+forever(0)
+''', Limits(steps=10 ** 9), 'Line 1\nError: Exceeded the maximum call ' \
+                            'depth.\n')
+
+    def test_size(self) -> None:
+        """Test that arrays, maps and strings can't grow past the size limit.
+        """
+        self.assertOutput('''
+a = {}
+for i in range(0, 100) do push(a, i) end
+echo len(a)
+push(a, 100)
+''', Limits(size=100), '100\nLine 4\nError: Exceeded the size limit of 100 ' \
+                       'elements.\n')
+        self.assertOutput('''
+m = {:}
+for i in range(0, 1000) do m[i] = i end
+''', Limits(size=100), 'Line 2\nError: Exceeded the size limit of 100 ' \
+                       'entries.\n')
+        self.assertOutput('''
+s = "ab"
+while true do s = s + s end
+''', Limits(size=1000), 'Line 2\nError: Exceeded the size limit of 1000 ' \
+                        'characters.\n')
+        self.assertOutput('''
+echo len(collect(range(0, 100)))
+echo collect(range(0, 10000000000))
+''', Limits(size=100), '100\nLine 2\nError: Exceeded the size limit of 100 ' \
+                       'elements.\n')
+        self.assertOutput('''
+s = replace("aaaaaaaaaa", "a", "aaaaaaaaaa")
+echo len(s)
+echo replace(s, "a", s)
+''', Limits(size=1000), '100\nLine 3\nError: Exceeded the size limit of ' \
+                        '1000 characters.\n')
+        self.assertOutput('''
+a = {}
+for i in range(0, 100) do push(a, 1000 + i) end
+echo len(str(a))
+echo str({a, a})
+''', Limits(size=1000), '600\nLine 4\nError: Exceeded the size limit of ' \
+                        '1000 characters.\n')
+
+    def test_program(self) -> None:
+        """Test that each run of a program has its own budget.
+        """
+        program = compile('''
+i = 0
+while i < n do
+    i = i + 1
+end
+echo i
+''', loop_threshold=10, limits=Limits(steps=100))
+        for _ in range(3):
+            self.assertEqual(program.run({'n': 100}), '100\n')
+        with self.assertRaises(RuntimeError) as context:
+            program.run({'n': 101})
+        self.assertEqual(str(context.exception),
+                         'Line 3\nError: Exceeded the limit of 100 steps.')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,183 @@
+import json
+import os
+import tempfile
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.type_inferrer import *
+from src.module import *
+import src.module
+from helpers import *
+
+class TestModule(OutputTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.write('lib/shapes.cb', '''
+echo "loading shapes"
+PI = 3
+count = 0
+function area(r) do return PI * r * r end
+function bump() do
+    count = count + 1
+    return count
+end
+''')
+        self.write('lib/unused.cb', '''
+echo "loading unused"
+function unused() do return 0 end
+''')
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, path: str, source: str) -> str:
+        """Writes a module into the temporary directory.
+
+        Returns:
+            The module's absolute path.
+        """
+        path = os.path.join(self.directory.name, path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(source.strip() + '\n')
+
+        return path
+
+    def assertOutput(self, source: str, expected: str) -> None:
+        """Checks the output with and without transpiling.
+        """
+        super().assertOutput(source,
+                             expected,
+                             annotate=True,
+                             directory=self.directory.name)
+
+    def test_lazy(self) -> None:
+        """Test that modules only run once a name from them is used.
+        """
+        self.assertOutput('''
+        import "lib/shapes"
+        import "lib/unused.cb"
+        echo "start"
+        echo area(2)
+        echo area(3)
+        ''', 'start\nloading shapes\n12\n27\n')
+
+    def test_environment(self) -> None:
+        """Test that each module has its own variables.
+        """
+        self.assertOutput('''
+        import "lib/shapes"
+        echo bump()
+        echo count
+        count = 10
+        echo bump()
+        echo count
+        PI = 0
+        echo area(1)
+        ''', 'loading shapes\n1\n1\n2\n10\n3\n')
+
+    def test_nested(self) -> None:
+        """Test imports relative to the importing module and the search path.
+        """
+        self.write('lib/circle.cb', '''
+import "shapes"
+function circle(r) do return area(r) + 1 end
+''')
+        self.write('other/tools.cb', 'function double(x) do return x * 2 end')
+        source = '''
+        import "lib/circle"
+        import "tools"
+        echo double(circle(1))
+        '''
+        self.assertEqual(run(source,
+                             annotate=True,
+                             directory=self.directory.name),
+                         'Line 2\nError: Cannot find module "tools".\n')
+
+        os.environ[PATH_VARIABLE] = os.path.join(self.directory.name, 'other')
+        try:
+            self.assertOutput(source, 'loading shapes\n8\n')
+        finally:
+            del os.environ[PATH_VARIABLE]
+
+    def test_errors(self) -> None:
+        """Test imports that aren't at the top level and undefined names.
+        """
+        with self.assertRaises(ParserError):
+            Parser(Lexer('if true import "x"').get_tokens()).get_statements()
+
+        self.assertOutput('''
+        import "lib/unused"
+        echo missing
+        ''', "Line 2\nError: Undefined variable 'missing'.\n")
+
+    def test_cache(self) -> None:
+        """Test that modules are parsed once per process and cached on disk.
+        """
+        path = self.write('lib/cached.cb', 'x = 1 + 2')
+        statements, names = parse_module(path)
+        self.assertIs(parse_module(path)[0], statements)
+        self.assertEqual(names, {'x'})
+        self.assertEqual(statements[0].expression.static_type, 'int')
+        self.assertTrue(os.path.isfile(os.path.join(
+            self.directory.name, 'lib', CACHE_DIRECTORY, 'cached.cbc'
+        )))
+
+        # A new process reads the cache file instead of parsing.
+        del src.module._parsed[path]
+        cached, names = parse_module(path)
+        self.assertIsNot(cached, statements)
+        self.assertEqual(str(cached[0]), str(statements[0]))
+
+        # Changing the source makes the cache out of date.
+        self.write('lib/cached.cb', 'y = "a"')
+        self.assertEqual(parse_module(path)[1], {'y'})
+
+    def test_cache_is_not_code(self) -> None:
+        """Test that a cache file can't make the loader run code, and that
+        invalid cache files are parsed again.
+        """
+        path = self.write('lib/planted.cb', 'x = 1')
+        cache_path = os.path.join(self.directory.name, 'lib', CACHE_DIRECTORY,
+                                  'planted.cbc')
+        marker = os.path.join(self.directory.name, 'ran')
+        os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+        with open(cache_path, 'w') as file:
+            file.write(f"cos\nsystem\n(S'touch {marker}'\ntR.")
+        self.assertEqual(parse_module(path)[1], {'x'})
+        self.assertFalse(os.path.exists(marker))
+
+        # A cache file naming something other than a statement is ignored.
+        del src.module._parsed[path]
+        status = os.stat(path)
+        with open(cache_path, 'w') as file:
+            json.dump({'version': CACHE_VERSION,
+                       'key': [status.st_mtime_ns, status.st_size],
+                       'statements': [{'node': 'Environment', 'fields': {}}],
+                       'names': ['y']}, file)
+        self.assertEqual(parse_module(path)[1], {'x'})
+
+    def test_type_inference(self) -> None:
+        """Test that imported names can have any type.
+        """
+        source = '''
+        import "lib/shapes"
+        echo PI + 1
+        PI = 1
+        '''
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter()
+        interpreter.loader.directory = self.directory.name
+        TypeInferrer(interpreter.globals,
+                     loader=interpreter.loader).annotate(statements)
+        self.assertFalse(statements[1].expression.numeric)
+
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        TypeInferrer(interpreter.globals).annotate(statements)
+        self.assertFalse(statements[1].expression.numeric)
+
+if __name__ == '__main__':
+    unittest.main()
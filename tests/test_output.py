@@ -0,0 +1,96 @@
+import contextlib
+import io
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.output import *
+
+class CountingFile(io.StringIO):
+    """Defines a file that counts its writes.
+    """
+    def __init__(self) -> None:
+        super().__init__()
+        self.writes = 0
+
+    def write(self, text: str) -> int:
+        self.writes += 1
+        return super().write(text)
+
+def run(source: str, output: Output) -> None:
+    """Runs source code, writing echoed lines to an output buffer.
+
+    Args:
+        source: Source code.
+        output: The buffer.
+    """
+    statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+    Interpreter(output=output).interpret(statements)
+
+class TestOutput(unittest.TestCase):
+    def test_buffering(self) -> None:
+        """Test that lines are written in chunks.
+        """
+        file = CountingFile()
+        output = Output(file, size=10)
+        output.write_line('abc')
+        output.write_line('def')
+        self.assertEqual(file.writes, 0)
+        output.write_line('ghi')
+        self.assertEqual(file.writes, 1)
+        self.assertEqual(file.getvalue(), 'abc\ndef\nghi\n')
+
+        output.flush()
+        self.assertEqual(file.writes, 1)
+
+        file = CountingFile()
+        output = Output(file, buffered=False)
+        output.write_line('abc')
+        self.assertEqual(file.getvalue(), 'abc\n')
+
+    def test_standard_output(self) -> None:
+        """Test that the buffer writes to the standard output it is flushed
+        to.
+        """
+        output = Output()
+        output.write_line('abc')
+        stdout = io.StringIO()
+        with contextlib.redirect_stdout(stdout):
+            output.flush()
+        self.assertEqual(stdout.getvalue(), 'abc\n')
+
+    def test_interpreter(self) -> None:
+        """Test that echoed lines are flushed by `flush()`, at the end and
+        before errors.
+        """
+        file = CountingFile()
+        run('''
+        i = 0
+        while i < 3 do
+            echo {i, "a"}
+            i = i + 1
+        end
+        ''', Output(file))
+        self.assertEqual(file.writes, 1)
+        self.assertEqual(file.getvalue(), '{0, a}\n{1, a}\n{2, a}\n')
+
+        file = CountingFile()
+        run('''
+        echo 1
+        flush()
+        echo 2
+        ''', Output(file))
+        self.assertEqual(file.writes, 2)
+
+        file = io.StringIO()
+        with self.assertRaises(RuntimeError):
+            run('''
+            echo 1
+            echo x
+            ''', Output(file))
+        self.assertEqual(file.getvalue(), '1\n')
+
+if __name__ == '__main__':
+    unittest.main()
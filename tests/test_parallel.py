@@ -0,0 +1,157 @@
+import time
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.limits import *
+import src.parallel
+from helpers import *
+
+class TestParallel(OutputTestCase):
+    def setUp(self) -> None:
+        # Use worker processes even on one core, and for short arrays.
+        self.workers = src.parallel.WORKERS
+        self.size = src.parallel.MIN_PARALLEL_SIZE
+        src.parallel.WORKERS = 2
+        src.parallel.MIN_PARALLEL_SIZE = 4
+
+    def tearDown(self) -> None:
+        src.parallel.WORKERS = self.workers
+        src.parallel.MIN_PARALLEL_SIZE = self.size
+
+    def assertOutput(self, source: str, expected: str) -> None:
+        """Checks the output with and without transpiling, with worker
+        processes and without.
+        """
+        super().assertOutput(source, expected, annotate=True)
+        src.parallel.WORKERS = 1
+        self.assertEqual(run(source, annotate=True), expected)
+        src.parallel.WORKERS = 2
+
+    def test_pmap(self) -> None:
+        """Test that results come back in order, using captured values and
+        functions.
+        """
+        self.assertOutput('''
+OFFSET = 100
+function square(x) do return x * x end
+function shift(x) do return square(x) + OFFSET end
+echo pmap(range(0, 40), shift)
+echo pmap({"a", "b", "c", "d", "e"}, upper)
+''', '{' + ', '.join(str(i * i + 100) for i in range(40)) + '}\n' \
+     '{A, B, C, D, E}\n')
+        self.assertOutput('''
+x = 10
+function double(x) do
+    max = x * 2
+    return max
+end
+echo pmap({1, 2, 3}, double)
+echo x
+echo max({1, 2})
+''', '{2, 4, 6}\n10\n2\n')
+
+    def test_preduce(self) -> None:
+        """Test that chunks are combined in order.
+        """
+        self.assertOutput('''
+function add(a, b) do return a + b end
+function concat(a, b) do return a + b end
+echo preduce(range(1, 101), add, 0)
+echo preduce(split("a,b,c,d,e,f,g,h,i,j", ","), concat, ">")
+echo preduce({}, add, 7)
+''', '5050\n>abcdefghij\n7\n')
+
+    def test_echo(self) -> None:
+        """Test that lines echoed in workers come out in order.
+        """
+        self.assertOutput('''
+function show(x) do
+    echo x
+    return x
+end
+echo pmap(range(0, 8), show)
+''', '0\n1\n2\n3\n4\n5\n6\n7\n{0, 1, 2, 3, 4, 5, 6, 7}\n')
+
+    def test_errors(self) -> None:
+        """Test that errors in workers are reported, and that functions that
+        use or change mutable state are refused.
+        """
+        self.assertOutput('''
+function check(x) do
+    if x == 6 return x + "a"
+    return x
+end
+echo pmap(range(0, 8), check)
+''', 'Line 2\nError: Expected type int or float\n')
+        self.assertOutput('''
+seen = {}
+function remember(x) do
+    push(seen, x)
+    return x
+end
+echo pmap(range(0, 8), remember)
+''', 'Line 6\nError: Cannot run <function remember> in parallel, since it ' \
+     'uses `seen`, which can change.\n')
+        self.assertOutput('''
+count = 0
+function counter(x) do
+    count = count + 1
+    return count
+end
+echo pmap(range(0, 8), counter)
+''', 'Line 6\nError: Cannot run <function counter> in parallel, since it ' \
+     'assigns the variable `count`.\n')
+        self.assertOutput('''
+function mark(a) do
+    push(a, 1)
+    return len(a)
+end
+arrays = {{}, {}}
+echo pmap(arrays, mark)
+''', 'Line 6\nError: Can only run in parallel over null, booleans, numbers ' \
+     'and strings.\n')
+        self.assertOutput('''
+function numbers(x) do yield x end
+echo pmap(range(0, 8), numbers)
+''', 'Line 2\nError: Cannot run generator function <function numbers> in ' \
+     'parallel.\n')
+
+    def test_limits(self) -> None:
+        """Test that steps taken in workers count against the program's step
+        limit, and that workers stop at its deadline.
+        """
+        source = '''
+function work(x) do
+    i = 0
+    while i < 1000 do i = i + 1 end
+    return 1
+end
+echo len(pmap(range(0, 64), work))
+'''
+        for workers in [1, 2]:
+            src.parallel.WORKERS = workers
+            self.assertEqual(run(source,
+                                 annotate=True,
+                                 limits=Limits(steps=70000)), '64\n')
+            self.assertTrue(run(source,
+                                annotate=True,
+                                limits=Limits(steps=30000)).endswith(
+                'Error: Exceeded the limit of 30000 steps.\n'
+            ))
+
+        start = time.perf_counter()
+        self.assertTrue(run('''
+function spin(x) do
+    while true do end
+end
+echo pmap(range(0, 64), spin)
+''', annotate=True, limits=Limits(time=0.5)).endswith(
+            'Error: Exceeded the time limit of 0.5 seconds.\n'
+        ))
+        self.assertLess(time.perf_counter() - start, 3)
+
+if __name__ == '__main__':
+    unittest.main()
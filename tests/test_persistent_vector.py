@@ -0,0 +1,42 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.persistent_vector import *
+
+class TestPersistentVector(unittest.TestCase):
+    def test_build(self) -> None:
+        """Test building vectors of sizes around node boundaries.
+        """
+        for length in [0, 1, 32, 33, 1024, 1056, 1057, 40000]:
+            values = list(range(length))
+            built = PersistentVector.from_values(values)
+            appended = PersistentVector()
+            for value in values:
+                appended = appended.append(value)
+
+            self.assertEqual(list(built), values)
+            self.assertEqual(list(appended), values)
+            self.assertEqual(len(appended), length)
+            self.assertEqual(built.root, appended.root)
+            self.assertTrue(all(built[i] == i for i in range(0, length, 7)))
+
+    def test_versions(self) -> None:
+        """Test that changing an element keeps older versions.
+        """
+        values = list(range(2000))
+        versions = [PersistentVector.from_values(values)]
+        for index in [0, 999, 1999, 5]:
+            versions.append(versions[-1].set(index, -index))
+
+        self.assertEqual(list(versions[0]), values)
+        self.assertEqual(versions[2][0], 0)
+        self.assertEqual(versions[2][999], -999)
+        self.assertEqual(versions[3][1999], -1999)
+        self.assertEqual(versions[3][5], 5)
+        self.assertEqual(versions[4][5], -5)
+
+        # Unchanged leaves are shared.
+        self.assertIs(versions[1].root[-1], versions[0].root[-1])
+
+if __name__ == '__main__':
+    unittest.main()
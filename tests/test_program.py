@@ -0,0 +1,208 @@
+import concurrent.futures
+import io
+import os
+import tempfile
+import threading
+import unittest
+import sys
+sys.path.append('../src')
+from src.interpreter import *
+from src.program import *
+
+class TestProgram(unittest.TestCase):
+    def assertRuns(self,
+                   source: str,
+                   globals: dict,
+                   expected: str) -> None:
+        """Checks the output in the tree walker and with everything transpiled.
+        """
+        for threshold in [10 ** 9, 1]:
+            program = compile(source.strip(), threshold, threshold)
+            self.assertEqual(program.run(globals), expected)
+            self.assertEqual(program.run(globals), expected)
+
+    def test_run(self) -> None:
+        """Test that a program runs and its output is captured.
+        """
+        self.assertRuns('''
+function square(x) do return x * x end
+echo square(4)
+''', {}, '16\n')
+
+    def test_globals(self) -> None:
+        """Test that host values are converted and bound as globals.
+        """
+        self.assertRuns('''
+total = offset
+for x in values do
+    total = total + x
+end
+echo total
+echo user["name"]
+''', {
+            'offset': 100,
+            'values': [1, 2, 3],
+            'user': {'name': 'ada'},
+        }, '106\nada\n')
+
+    def test_changing_globals(self) -> None:
+        """Test that runs with different globals don't share variables.
+        """
+        program = compile('''
+if has_name echo name
+count = count + 1
+echo count
+'''.strip(), 1, 1)
+        self.assertEqual(program.run({'has_name': False, 'count': 1}), '2\n')
+        self.assertEqual(program.run({'has_name': True,
+                                      'name': 'ada',
+                                      'count': 5}), 'ada\n6\n')
+        self.assertEqual(program.run({'has_name': False, 'count': 1}), '2\n')
+
+    def test_stdout(self) -> None:
+        """Test that output can go to a file instead.
+        """
+        file = io.StringIO()
+        self.assertIsNone(compile('echo "hi"').run(stdout=file))
+        self.assertEqual(file.getvalue(), 'hi\n')
+
+    def test_return(self) -> None:
+        """Test that a top-level return ends a run.
+        """
+        self.assertRuns('''
+echo 1
+if stop return null
+echo 2
+''', {'stop': True}, '1\n')
+
+    def test_error(self) -> None:
+        """Test that runtime errors are raised after the output is written.
+        """
+        file = io.StringIO()
+        with self.assertRaises(RuntimeError) as context:
+            compile('echo 1\necho x').run(stdout=file)
+        self.assertEqual(str(context.exception),
+                         "Line 2\nError: Undefined variable 'x'.")
+        self.assertEqual(file.getvalue(), '1\n')
+
+        with self.assertRaises(ParserError):
+            compile('echo (')
+
+    def test_shared_loops(self) -> None:
+        """Test that loops stay transpiled from one run to the next.
+        """
+        program = compile('''
+total = 0
+i = 0
+while i < n do
+    total = total + i
+    i = i + 1
+end
+echo total
+'''.strip(), loop_threshold=20)
+        for n in range(10):
+            self.assertEqual(program.run({'n': n}), f'{n * (n - 1) // 2}\n')
+        statements, loops, back_edges = program.variants[frozenset(['n'])]
+        self.assertIsNotNone(loops[statements[2]])
+
+    def test_threads(self) -> None:
+        """Test that threads can run one program at the same time.
+        """
+        program = compile('''
+function add(a, b) do return a + b end
+total = 0
+for i in range(0, n) do
+    total = add(total, i)
+end
+echo total
+'''.strip(), 5, 5)
+        results = {}
+
+        def work(n: int) -> None:
+            results[n] = [program.run({'n': n}) for _ in range(20)]
+
+        threads = [threading.Thread(target=work, args=(n,))
+                   for n in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        for n in range(8):
+            self.assertEqual(results[n], [f'{n * (n - 1) // 2}\n'] * 20)
+
+    def test_stress(self) -> None:
+        """Test that runs on a thread pool keep their variables, output and
+        errors apart under load.
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            with open(os.path.join(directory, 'util.cb'), 'w') as file:
+                file.write('''
+calls = 0
+function label(id) do
+    calls = calls + 1
+    return "task " + str(id)
+end
+''')
+
+            program = compile('''
+import "util"
+function scale(x) do return x * factor end
+function evens(n) do
+    for i in range(0, n) do
+        if i - floor(i / 2) * 2 == 0 yield i
+    end
+end
+counts = {:}
+total = 0
+for x in evens(n) do
+    total = total + scale(x)
+    counts[x] = str(x)
+end
+text = ""
+i = 0
+numbers = keys(counts)
+while i < len(numbers) do
+    text = text + counts[numbers[i]]
+    i = i + 1
+end
+echo label(id)
+echo total
+echo text
+echo calls
+if fail echo missing
+'''.strip(), 3, 7, directory)
+
+            def expected(id: int) -> str:
+                n = id % 17 + 5
+                evens = range(0, n, 2)
+                return f'task {id}\n{sum(evens) * id}\n' \
+                       f'{"".join(map(str, evens))}\n1\n'
+
+            def work(id: int) -> str:
+                globals = {'id': id,
+                           'n': id % 17 + 5,
+                           'factor': id,
+                           'fail': id % 5 == 0}
+                file = io.StringIO()
+                try:
+                    program.run(globals, file)
+                except RuntimeError as error:
+                    file.write(f'{error}\n')
+                return file.getvalue()
+
+            interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+            try:
+                with concurrent.futures.ThreadPoolExecutor(16) as executor:
+                    results = list(executor.map(work, range(400)))
+            finally:
+                sys.setswitchinterval(interval)
+
+        for id, result in enumerate(results):
+            error = "Line 25\nError: Undefined variable 'missing'.\n" \
+                    if id % 5 == 0 else ''
+            self.assertEqual(result, expected(id) + error)
+
+if __name__ == '__main__':
+    unittest.main()
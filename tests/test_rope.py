@@ -0,0 +1,73 @@
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.rope import *
+from helpers import *
+
+class TestRope(OutputTestCase):
+    def test_concatenate(self) -> None:
+        """Test that short strings are joined and long ones become ropes.
+        """
+        self.assertEqual(concatenate('ab', 'cd'), 'abcd')
+
+        long = 'a' * ROPE_THRESHOLD
+        rope = concatenate(long, 'b')
+        self.assertIsInstance(rope, Rope)
+        self.assertEqual(len(rope), ROPE_THRESHOLD + 1)
+        self.assertIsNone(rope.flat)
+        self.assertEqual(str(rope), long + 'b')
+
+    def test_shared_parts(self) -> None:
+        """Test that ropes grown from the same rope don't see each other.
+        """
+        rope = concatenate('a' * ROPE_THRESHOLD, 'b')
+        first = rope.append('c')
+        second = rope.append('d')
+        third = first.append('e')
+        self.assertIs(first.parts, third.parts)
+        self.assertIsNot(first.parts, second.parts)
+        self.assertEqual(str(rope)[-1], 'b')
+        self.assertEqual(str(first)[-2:], 'bc')
+        self.assertEqual(str(second)[-2:], 'bd')
+        self.assertEqual(str(third)[-3:], 'bce')
+
+    def test_compare(self) -> None:
+        """Test comparing ropes with strings.
+        """
+        long = 'a' * ROPE_THRESHOLD
+        rope = concatenate(long, 'b')
+        self.assertTrue(rope == long + 'b')
+        self.assertTrue(long + 'b' == rope)
+        self.assertTrue(rope != long)
+        self.assertTrue(rope < long + 'c')
+        self.assertFalse(rope == 1)
+        self.assertEqual({long + 'b': 1}[rope], 1)
+
+    def test_build_in_loop(self) -> None:
+        """Test building a long string in a loop.
+        """
+        self.assertOutput('''
+        s = ""
+        i = 0
+        while i < 100 do
+            s = s + "ab"
+            i = i + 1
+        end
+        t = s + "!"
+        echo t == s + "!"
+        echo s + "?" == t
+        m = {t: 1}
+        echo m[s + "!"]
+        if s do
+            echo "truthy"
+        end
+        ''', 'true\nfalse\n1\ntruthy\n')
+
+    def test_errors(self) -> None:
+        """Test adding a string to a number.
+        """
+        self.assertOutput('echo "a" + "b"', 'ab\n')
+        self.assertOutput('echo "a" + 1',
+                          'Line 1\nError: Expected type int or float\n')
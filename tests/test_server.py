@@ -0,0 +1,104 @@
+import multiprocessing
+import os
+import tempfile
+import time
+import unittest
+import sys
+sys.path.append('../src')
+from src.interpreter import *
+from src.server import *
+from src.client import *
+
+class TestServer(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.server = Server(os.path.join(self.directory.name, 'test.sock'))
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def write(self, name: str, source: str) -> str:
+        """Writes a source file into the temporary directory.
+
+        Returns:
+            The file's absolute path.
+        """
+        path = os.path.join(self.directory.name, name)
+        with open(path, 'w') as file:
+            file.write(source.strip())
+        return path
+
+    def test_source(self) -> None:
+        """Test that source code runs and errors set the status.
+        """
+        self.assertEqual(self.server.handle({'source': 'echo 1 + 2'}),
+                         {'output': '3\n', 'status': 0})
+        self.assertEqual(self.server.handle({'source': 'echo 1\necho x'}),
+                         {'output': "1\nLine 2\nError: Undefined variable " \
+                                    "'x'.\n",
+                          'status': 1})
+        self.assertEqual(self.server.handle({'source': 'echo ('})['status'], 1)
+        source = 'echo 1\necho "a" < 1'
+        self.assertEqual(self.server.handle({'source': source}),
+                         {'output': "1\nError: TypeError: '<' not supported " \
+                                    "between instances of 'str' and 'int'\n",
+                          'status': 1})
+
+    def test_path(self) -> None:
+        """Test that files are cached until they change, and that imports are
+        relative to them.
+        """
+        self.write('lib.cb', 'function twice(x) do return x * 2 end')
+        path = self.write('main.cb', 'import "lib"\necho twice(21)')
+        self.assertEqual(self.server.handle({'path': path}),
+                         {'output': '42\n', 'status': 0})
+        program = self.server._program({'path': path})
+        self.assertIs(self.server._program({'path': path}), program)
+
+        self.write('main.cb', 'import "lib"\necho twice(2) + 100')
+        os.utime(path, ns=(0, 0))
+        self.assertEqual(self.server.handle({'path': path}),
+                         {'output': '104\n', 'status': 0})
+
+        missing = os.path.join(self.directory.name, 'missing.cb')
+        self.assertEqual(self.server.handle({'path': missing}),
+                         {'output': f"Error: Cannot open file '{missing}'\n",
+                          'status': 1})
+
+    def test_serve(self) -> None:
+        """Test that worker processes answer requests over the socket.
+        """
+        path = self.write('main.cb', 'echo "hi"')
+        self.server.jobs = 1
+        process = multiprocessing.get_context('fork').Process(
+            target=self.server.serve_forever
+        )
+        process.start()
+        try:
+            for _ in range(100):
+                if os.path.exists(self.server.path):
+                    break
+                time.sleep(0.05)
+
+            for _ in range(10):
+                self.assertEqual(run({'path': path}, self.server.path),
+                                 {'output': 'hi\n', 'status': 0})
+            self.assertEqual(run({'source': 'echo x'}, self.server.path),
+                             {'output': "Line 1\nError: Undefined variable " \
+                                        "'x'.\n",
+                              'status': 1})
+
+            # A Python exception is reported, and the only worker keeps
+            # answering.
+            self.assertEqual(run({'source': 'echo "a" < 1'},
+                                 self.server.path)['status'], 1)
+            self.assertEqual(run({'path': path}, self.server.path),
+                             {'output': 'hi\n', 'status': 0})
+        finally:
+            process.terminate()
+            process.join()
+
+        self.assertFalse(os.path.exists(self.server.path))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,62 @@
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.rope import *
+from helpers import *
+
+class TestStringBuiltins(OutputTestCase):
+    def test_index_and_slice(self) -> None:
+        """Test reading characters and ranges of strings.
+        """
+        self.assertOutput('''
+        s = "hello, world"
+        echo len(s)
+        echo s[0] + s[7]
+        echo s[:5]
+        echo substr(s, 7, 12)
+        ''', '12\nhw\nhello\nworld\n')
+        self.assertOutput('s = "abc"\necho s[3]',
+                          'Line 2\nError: Index out of range.\n')
+        self.assertOutput('s = "abc"\necho substr(s, 2, 1)',
+                          'Line 2\nError: Index out of range.\n')
+
+    def test_search_and_split(self) -> None:
+        """Test finding, splitting and joining.
+        """
+        self.assertOutput('''
+        s = "a,b,,c"
+        echo find(s, ",,")
+        echo find(s, "x")
+        parts = split(s, ",")
+        echo parts
+        echo join(parts, "-")
+        echo split("abc", "")
+        ''', '3\n-1\n{a, b, , c}\na-b--c\n{a, b, c}\n')
+        self.assertOutput('echo join({1, 2}, ",")',
+                          'Line 1\nError: Can only join arrays of strings.\n')
+
+    def test_upper_and_replace(self) -> None:
+        """Test building changed copies of strings.
+        """
+        self.assertOutput('''
+        echo upper("abc")
+        echo replace("hello", "l", "L")
+        echo upper(1)
+        ''', 'ABC\nheLLo\nLine 3\nError: Expected type string\n')
+
+    def test_views(self) -> None:
+        """Test that long substrings share the original string.
+        """
+        string = 'x' * VIEW_THRESHOLD + 'needle' + 'y' * VIEW_THRESHOLD
+        view = substring(string, 1, len(string) - 1)
+        self.assertIsInstance(view, StringView)
+        self.assertIs(view.string, string)
+        self.assertEqual(find(view, 'needle'), VIEW_THRESHOLD - 1)
+        self.assertEqual(character(view, 0), 'x')
+
+        inner = substring(view, VIEW_THRESHOLD - 1, len(view))
+        self.assertIs(inner.string, string)
+        self.assertEqual(inner, 'needle' + 'y' * (VIEW_THRESHOLD - 1))
+        self.assertEqual(substring(view, 0, 3), 'xxx')
@@ -0,0 +1,152 @@
+import time
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from helpers import *
+
+class TestTask(OutputTestCase):
+    def assertOutput(self, source: str, expected: str) -> None:
+        """Checks the output with and without transpiling, after the analysis
+        passes.
+        """
+        super().assertOutput(source, expected, annotate=True)
+
+    def test_spawn(self) -> None:
+        """Test that tasks run when the main program waits, in the order they
+        were spawned, and return their values.
+        """
+        self.assertOutput('''
+function work(name, n) do
+    echo name + " started"
+    sleep(0)
+    echo name + " finished"
+    return n * 2
+end
+a = spawn(work, {"a", 1})
+b = spawn(work, {"b", 2})
+echo "spawned"
+echo wait(b) + wait(a)
+echo wait(a)
+''', 'spawned\na started\nb started\na finished\nb finished\n6\n2\n')
+
+    def test_overlapping_sleeps(self) -> None:
+        """Test that tasks sleeping at the same time wait once.
+        """
+        source = '''
+function nap(n) do
+    sleep(0.2)
+    return n
+end
+tasks = {}
+for i in range(0, 20) do
+    push(tasks, spawn(nap, {i}))
+end
+total = 0
+for task in tasks do
+    total = total + wait(task)
+end
+echo total
+'''
+        start = time.perf_counter()
+        self.assertOutput(source, '190\n')
+        self.assertLess(time.perf_counter() - start, 2)
+
+    def test_finish(self) -> None:
+        """Test that the program waits for tasks nothing waited for.
+        """
+        self.assertOutput('''
+function later() do
+    sleep(0.01)
+    echo "later"
+end
+spawn(later, {})
+echo "main"
+''', 'main\nlater\n')
+
+    def test_channel(self) -> None:
+        """Test that values go through a channel in order, and that receiving
+        from a closed, empty channel gives null.
+        """
+        self.assertOutput('''
+function produce(c, n) do
+    for i in range(0, n) do
+        send(c, i * i)
+        if i == 2 sleep(0.01)
+    end
+    close(c)
+end
+function consume(c, results) do
+    x = receive(c)
+    while x != null do
+        push(results, x)
+        x = receive(c)
+    end
+    return len(results)
+end
+c = channel()
+results = {}
+consumer = spawn(consume, {c, results})
+spawn(produce, {c, 5})
+echo wait(consumer)
+echo results
+''', '5\n{0, 1, 4, 9, 16}\n')
+
+    def test_errors(self) -> None:
+        """Test that a task's error is raised where it is waited for, or at
+        the end of the program if nothing waits for it.
+        """
+        self.assertOutput('''
+function fail() do
+    return 1 + "a"
+end
+t = spawn(fail, {})
+echo "before"
+wait(t)
+echo "after"
+''', 'before\nLine 2\nError: Expected type int or float\n')
+        self.assertOutput('''
+function fail() do
+    return 1 + "a"
+end
+spawn(fail, {})
+echo "end"
+''', 'end\nLine 2\nError: Expected type int or float\n')
+        self.assertOutput('''
+c = channel()
+close(c)
+send(c, 1)
+''', 'Line 3\nError: Channel is closed.\n')
+        self.assertOutput('''
+function f(a, b) do return a end
+spawn(f, {1})
+''', 'Line 2\nError: Expected a function taking 1 argument.\n')
+
+    def test_deadlock(self) -> None:
+        """Test that waiting when no task could ever resume is an error.
+        """
+        self.assertOutput('''
+c = channel()
+echo "waiting"
+receive(c)
+''', 'waiting\nLine 3\nError: All tasks are waiting.\n')
+
+    def test_cancel(self) -> None:
+        """Test that tasks still sleeping when the program fails are stopped.
+        """
+        start = time.perf_counter()
+        self.assertOutput('''
+function slow() do
+    sleep(10)
+    echo "never"
+end
+spawn(slow, {})
+sleep(0)
+echo missing
+''', "Line 7\nError: Undefined variable 'missing'.\n")
+        self.assertLess(time.perf_counter() - start, 5)
+
+if __name__ == '__main__':
+    unittest.main()
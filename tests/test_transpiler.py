@@ -0,0 +1,165 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.transpiler import *
+from helpers import *
+
+class TestTranspiler(unittest.TestCase):
+    def assertSameOutput(self, source: str) -> None:
+        """Checks that transpiled functions behave like interpreted ones.
+        """
+        self.assertEqual(run(source, 1), run(source, 10 ** 9))
+
+    def test_recursion(self) -> None:
+        """Test a recursive function.
+        """
+        source = '''
+        function fib(n) do
+            if n < 2 return n
+            return fib(n - 1) + fib(n - 2)
+        end
+        echo fib(15)
+        '''
+        self.assertEqual(run(source, 1), '610\n')
+        self.assertSameOutput(source)
+
+    def test_closure_variables(self) -> None:
+        """Test assigning variables that exist in the closure.
+        """
+        self.assertSameOutput('''
+        count = 0
+        n = 5
+        function add(n) do
+            count = count + n
+            if count > 3 flag = true
+            return count
+        end
+        add(1)
+        add(2)
+        add(3)
+        echo count
+        echo n
+        ''')
+
+    def test_block_scope(self) -> None:
+        """Test variables that only exist inside a block.
+        """
+        self.assertSameOutput('''
+        function f(a) do
+            i = 0
+            while i < 3 do
+                if i > 0 echo last
+                last = a[i]
+                i = i + 1
+            end
+            return last
+        end
+        last = "outer"
+        echo f({1, 2, 3})
+        ''')
+
+    def test_runtime_errors(self) -> None:
+        """Test runtime error messages and line numbers.
+        """
+        self.assertSameOutput('''
+        function f(a, i) do
+            return a[i] + 1
+        end
+        echo f({1, 2}, 1)
+        echo f({true}, 0)
+        ''')
+        self.assertSameOutput('''
+        function f(a, i) do
+            return a[i]
+        end
+        echo f({1, 2}, 2)
+        ''')
+
+    def test_division_by_zero(self) -> None:
+        """Test that dividing by zero is a runtime error in every tier, with
+        and without known number types.
+        """
+        source = '''
+        function ratio(a, b) do
+            return a / b
+        end
+        echo ratio(1, 2)
+        echo ratio(3, 4) + 10 / 2
+        echo ratio(1.5, 0.0)
+        '''
+        expected = '0.5\n5.75\nLine 2\nError: Cannot divide by zero.\n'
+        for threshold in [1, 10 ** 9]:
+            self.assertEqual(run(source, threshold), expected)
+            self.assertEqual(run(source, threshold, annotate=True), expected)
+
+        source = '''
+        i = 0
+        total = 0
+        while i < 5 do
+            total = total + 6 / (3 - i)
+            i = i + 1
+        end
+        '''
+        expected = 'Line 4\nError: Cannot divide by zero.\n'
+        for threshold in [1, 10 ** 9]:
+            self.assertEqual(run(source, threshold), expected)
+            self.assertEqual(run(source, threshold, annotate=True), expected)
+
+    def test_compile_threshold(self) -> None:
+        """Test that functions are transpiled after the call threshold.
+        """
+        source = '''
+        function f(n) do return n end
+        f(1)
+        '''
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter()
+        interpreter.interpret(statements[:1])
+        function = interpreter.globals.values['f']
+        for i in range(interpreter.call_threshold):
+            self.assertEqual(function.call(interpreter, [i]), i)
+        self.assertIsNotNone(function.compiled)
+
+    def test_loop_tier_up(self) -> None:
+        """Test that hot loops are transpiled in the middle of running.
+        """
+        source = '''
+        i = 0
+        total = 0
+        last = 0
+        while i < 10 do
+            total = total + i
+            if i > 7 last = i
+            i = i + 1
+        end
+        echo total
+        echo last
+        '''
+        self.assertSameOutput(source)
+
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        interpreter = Interpreter(loop_threshold=3)
+        interpreter.interpret(statements[:4])
+        loop = statements[3]
+        self.assertIsNotNone(interpreter.loops[loop])
+        self.assertEqual(interpreter.globals.values['total'], 45)
+        self.assertEqual(interpreter.globals.values['last'], 9)
+
+    def test_unsupported(self) -> None:
+        """Test that unsupported functions are not transpiled.
+        """
+        source = '''
+        function f() do
+            function g() do return 1 end
+            return g()
+        end
+        '''
+        statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+        with self.assertRaises(TranspilerError):
+            Transpiler(statements[0], Environment()).compile()
+
+if __name__ == '__main__':
+    unittest.main()
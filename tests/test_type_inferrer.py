@@ -0,0 +1,100 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+from src.type_inferrer import *
+
+def annotate(source: str, closed: bool = True) -> List[Statement]:
+    """Parses source code and annotates it with inferred types.
+
+    Args:
+        source: Source code.
+        closed: If the source code is the whole program.
+
+    Returns:
+        The annotated statements.
+    """
+    statements = Parser(Lexer(source.strip()).get_tokens()).get_statements()
+    TypeInferrer(Interpreter().globals, closed).annotate(statements)
+
+    return statements
+
+class TestTypeInferrer(unittest.TestCase):
+    def test_counter(self) -> None:
+        """Test a variable that is only assigned numbers.
+        """
+        statements = annotate('''
+        i = 0
+        i = i + 1.5
+        ''')
+        increment = statements[1].expression.value
+        self.assertTrue(increment.numeric)
+        self.assertEqual(increment.static_type, 'float')
+        self.assertEqual(increment.left.static_type, 'number')
+
+    def test_mixed_types(self) -> None:
+        """Test a variable that is assigned different types.
+        """
+        statements = annotate('''
+        x = 1
+        x = "one"
+        echo x + 1
+        ''')
+        self.assertFalse(statements[2].expression.numeric)
+        self.assertIsNone(statements[2].expression.left.static_type)
+
+    def test_string_concatenation(self) -> None:
+        """Test that adding strings gives a string.
+        """
+        statements = annotate('''
+        s = "a"
+        s = s + "b"
+        ''')
+        concatenation = statements[1].expression.value
+        self.assertFalse(concatenation.numeric)
+        self.assertEqual(concatenation.static_type, 'string')
+
+    def test_parameters(self) -> None:
+        """Test parameters that get the types of their arguments.
+        """
+        statements = annotate('''
+        function square(n) do return n * n end
+        echo square(2) + square(3)
+        ''')
+        self.assertTrue(statements[0].body[0].value.numeric)
+        self.assertTrue(statements[1].expression.numeric)
+
+    def test_escaped_function(self) -> None:
+        """Test parameters of a function used as a value.
+        """
+        statements = annotate('''
+        function square(n) do return n * n end
+        f = square
+        echo square(2)
+        ''')
+        self.assertFalse(statements[0].body[0].value.numeric)
+
+    def test_for(self) -> None:
+        """Test loop variables bound by for loops.
+        """
+        statements = annotate('''
+        for i in range(0, 10) do echo i * 2 end
+        for x in {1, 2} do echo x * 2 end
+        ''')
+        self.assertTrue(statements[0].body.statements[0].expression.numeric)
+        self.assertFalse(statements[1].body.statements[0].expression.numeric)
+
+    def test_open_program(self) -> None:
+        """Test that variables can have any type in an open program.
+        """
+        statements = annotate('''
+        i = 0
+        echo i + (1 + 2)
+        ''', closed=False)
+        self.assertFalse(statements[1].expression.numeric)
+        self.assertTrue(statements[1].expression.right.expression.numeric)
+
+if __name__ == '__main__':
+    unittest.main()
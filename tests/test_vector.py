@@ -0,0 +1,115 @@
+import unittest
+import sys
+sys.path.append('../src')
+from src.lexer import *
+from src.parser import *
+from src.interpreter import *
+import src.vector
+from helpers import *
+
+class TestVector(OutputTestCase):
+    def assertOutput(self, source: str, expected: str) -> None:
+        """Checks the output with and without NumPy and transpiling.
+        """
+        numpy = src.vector.numpy
+        try:
+            for module in [numpy, None]:
+                src.vector.numpy = module
+                super().assertOutput(source, expected)
+        finally:
+            src.vector.numpy = numpy
+
+    def test_arithmetic(self) -> None:
+        """Test arithmetic between arrays and numbers.
+        """
+        self.assertOutput('''
+        a = {1, 2, 3}
+        echo a + {0.5, 0.5, 0.5}
+        echo a * 2
+        echo 1 - a
+        echo a / 2
+        echo {9223372036854775807} + 1
+        ''', '{1.5, 2.5, 3.5}\n{2, 4, 6}\n{0, -1, -2}\n{0.5, 1.0, 1.5}\n' \
+             '{9223372036854775808}\n')
+
+    def test_comparisons(self) -> None:
+        """Test comparisons that give arrays of booleans.
+        """
+        self.assertOutput('''
+        a = {1, 2, 3}
+        echo a < 2
+        echo a >= {3, 2, 1}
+        echo a == {1, 2, 3}
+        ''', '{true, false, false}\n{false, true, true}\ntrue\n')
+
+    def test_reductions(self) -> None:
+        """Test reducing arrays to numbers.
+        """
+        self.assertOutput('''
+        a = {3, 1, 2}
+        echo sum(a)
+        echo min(a)
+        echo max(a)
+        echo mean(a)
+        echo sum({0.1, 0.2, 0.3})
+        echo sum({})
+        ''', '6\n1\n3\n2.0\n0.6000000000000001\n0\n')
+
+    def test_errors(self) -> None:
+        """Test arrays that cannot be combined.
+        """
+        self.assertOutput('echo {1, 2} + {1}',
+                          'Line 1\nError: Array lengths must match.\n')
+        self.assertOutput('echo {1, "a"} * 2',
+                          'Line 1\nError: Expected type int or float\n')
+        self.assertOutput('echo min({})',
+                          'Line 1\nError: Cannot get the min of an empty ' \
+                          'array.\n')
+        self.assertOutput('echo {1, 2} / 0',
+                          'Line 1\nError: Cannot divide by zero.\n')
+        self.assertOutput('echo {1.5, 2.5} / {1.0, 0.0}',
+                          'Line 1\nError: Cannot divide by zero.\n')
+
+    @unittest.skipUnless(src.vector.numpy, 'NumPy is not installed')
+    def test_numpy(self) -> None:
+        """Test that arrays of numbers are computed with NumPy without
+        copying, and only when the results are exact.
+        """
+        numpy = src.vector.numpy
+        interpreter = Interpreter()
+        ints = CoffeeBeanArray([1, 2, 3])
+        floats = CoffeeBeanArray([0.5, 1.5, 2.5])
+        self.assertIsInstance(src.vector._to_numpy(ints), numpy.ndarray)
+        self.assertIsNone(src.vector._to_numpy(CoffeeBeanArray([1, 'a'])))
+
+        for operator_type, left, right in [
+            (TokenType.PLUS, ints, floats),
+            (TokenType.MULTIPLY, ints, 3),
+            (TokenType.DIVIDE, 1, floats),
+            (TokenType.LESS, floats, ints),
+        ]:
+            self.assertTrue(src.vector._is_exact(operator_type,
+                                                 src.vector._to_numpy(left),
+                                                 src.vector._to_numpy(right)))
+            result = vector_binary(interpreter, operator_type, left, right)
+            try:
+                src.vector.numpy = None
+                expected = vector_binary(interpreter,
+                                         operator_type,
+                                         left,
+                                         right)
+            finally:
+                src.vector.numpy = numpy
+            self.assertEqual(str(result), str(expected))
+
+        self.assertFalse(src.vector._is_exact(TokenType.DIVIDE,
+                                              src.vector._to_numpy(ints),
+                                              0))
+        self.assertFalse(src.vector._is_exact(
+            TokenType.MULTIPLY,
+            src.vector._to_numpy(CoffeeBeanArray([2 ** 62])),
+            2
+        ))
+
+if __name__ == '__main__':
+    unittest.main()